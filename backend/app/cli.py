@@ -0,0 +1,180 @@
+"""
+Comandos de administración por línea de comandos.
+
+Uso:
+    python -m app.cli import-users usuarios.csv
+    python -m app.cli import-users usuarios.ndjson --workers 8 --report reporte.json
+    python -m app.cli explain-products
+    python -m app.cli check-pagination
+    python -m app.cli benchmark-jwt --iterations 50000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from fastapi import HTTPException
+from app.config import settings
+from app.database import AsyncSessionLocal, async_engine
+from app.models.user import UserRole
+from app.services.product_diagnostics import ProductDiagnostics
+from app.services.user_import_service import UserImportService
+from app.utils.jwt_codec import CODECS, set_codec
+from app.utils.password_pool import PasswordHasher
+from app.utils.security import create_tokens_for_user, decode_token
+
+
+async def import_users(args: argparse.Namespace) -> int:
+    """Importa usuarios desde un archivo CSV o NDJSON"""
+    fmt = UserImportService.detect_format(args.format or args.file)
+    
+    with open(args.file, encoding="utf-8-sig") as f:
+        rows = UserImportService.parse(f.read(), fmt)
+    
+    print(f"📥 Importando {len(rows)} filas con {args.workers} procesos...")
+    
+    # Pool propio: la CLI puede usar todos los núcleos de la máquina
+    hasher = PasswordHasher(max_workers=args.workers)
+    try:
+        async with AsyncSessionLocal() as db:
+            report = await UserImportService.import_users(db, rows, hasher=hasher)
+    finally:
+        hasher.shutdown()
+        await async_engine.dispose()
+    
+    for result in report.results:
+        if result.status == "error":
+            print(f"  ❌ Fila {result.row} ({result.username or '-'}): {result.error}")
+    
+    print(f"✅ Creados: {report.created}  ❌ Fallidos: {report.failed}  Total: {report.total}")
+    
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.write(report.model_dump_json(indent=2))
+        print(f"📝 Reporte guardado en {args.report}")
+    
+    return 0 if report.failed == 0 else 1
+
+
+async def explain_products(args: argparse.Namespace) -> int:
+    """Muestra el plan de las consultas del listado de productos y avisa si no usan índices"""
+    try:
+        async with async_engine.connect() as conn:
+            plans = await conn.run_sync(lambda sync_conn: ProductDiagnostics.explain_listing(sync_conn, args.limit))
+    finally:
+        await async_engine.dispose()
+    
+    for label, (lines, problems) in plans.items():
+        print(f"{'❌' if problems else '✅'} {label}")
+        for line in lines:
+            print(f"    {line}")
+        for problem in problems:
+            print(f"    ⚠️  {problem}")
+    
+    failures = sum(bool(problems) for _, problems in plans.values())
+    print(f"📊 {len(plans) - failures}/{len(plans)} consultas usan índice sin ordenación extra")
+    return 0 if failures == 0 else 1
+
+
+async def check_pagination(args: argparse.Namespace) -> int:
+    """
+    Recorre el listado de productos página a página con cursor y comprueba
+    que no se repite ni se salta ningún producto.
+    
+    Los productos de prueba se deshacen al terminar (ver ProductDiagnostics.check_pagination).
+    """
+    marker = f"check-pagination-{uuid.uuid4().hex[:8]}"
+    
+    try:
+        async with async_engine.connect() as conn:
+            transaction = await conn.begin()
+            try:
+                results = await conn.run_sync(
+                    lambda sync_conn: ProductDiagnostics.check_pagination(sync_conn, marker, args.rows, args.limit)
+                )
+            finally:
+                await transaction.rollback()
+    finally:
+        await async_engine.dispose()
+    
+    failures = 0
+    for (sort_by, order), (expected, seen) in results.items():
+        ok = seen == expected
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {sort_by} {order}: {len(seen)}/{len(expected)} productos en páginas de {args.limit}")
+        if not ok:
+            print(f"    ⚠️  Esperado {expected}")
+            print(f"    ⚠️  Obtenido {seen}")
+    
+    return 0 if failures == 0 else 1
+
+
+async def benchmark_jwt(args: argparse.Namespace) -> int:
+    """
+    Mide tokens por segundo de create_tokens_for_user y decode_token
+    con cada codec. La caché de tokens se desactiva durante la medición.
+    """
+    iterations = args.iterations
+    previous_cache = settings.TOKEN_CACHE_ENABLED
+    settings.TOKEN_CACHE_ENABLED = False
+    
+    print("⏱️  Benchmark de codecs JWT (tokens/segundo)...")
+    try:
+        for name in CODECS:
+            set_codec(name)
+            
+            start = time.perf_counter()
+            for i in range(iterations):
+                access, _ = create_tokens_for_user(i, "benchmark", UserRole.USER, "bench")
+            create_tps = iterations / (time.perf_counter() - start)
+            
+            start = time.perf_counter()
+            for _ in range(iterations):
+                decode_token(access)
+            decode_tps = iterations / (time.perf_counter() - start)
+            
+            print(f"   {name:>5}: create_tokens_for_user={round(create_tps):>8}  decode_token={round(decode_tps):>8}")
+    finally:
+        set_codec(settings.JWT_CODEC)
+        settings.TOKEN_CACHE_ENABLED = previous_cache
+    
+    return 0
+
+
+def main(argv=None) -> int:
+    """Punto de entrada de la CLI"""
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Administración de la API")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    parser_import = commands.add_parser("import-users", help="Importación masiva de usuarios (CSV o NDJSON)")
+    parser_import.add_argument("file", help="Archivo .csv, .ndjson o .jsonl")
+    parser_import.add_argument("--format", choices=["csv", "ndjson"], help="Forzar el formato del archivo")
+    parser_import.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Procesos para el hash de contraseñas")
+    parser_import.add_argument("--report", help="Guardar el reporte completo en JSON")
+    parser_import.set_defaults(handler=import_users)
+    
+    parser_explain = commands.add_parser("explain-products", help="Revisar los planes de las consultas del listado de productos")
+    parser_explain.add_argument("--limit", type=int, default=10, help="LIMIT usado en las consultas")
+    parser_explain.set_defaults(handler=explain_products)
+    
+    parser_pagination = commands.add_parser("check-pagination", help="Comprobar que la paginación por cursor no repite ni salta productos")
+    parser_pagination.add_argument("--rows", type=int, default=9, help="Productos de prueba (todos creados en el mismo segundo)")
+    parser_pagination.add_argument("--limit", type=int, default=2, help="Tamaño de página")
+    parser_pagination.set_defaults(handler=check_pagination)
+    
+    parser_benchmark = commands.add_parser("benchmark-jwt", help="Comparar el rendimiento de los codecs JWT")
+    parser_benchmark.add_argument("--iterations", type=int, default=20000, help="Operaciones por medición")
+    parser_benchmark.set_defaults(handler=benchmark_jwt)
+    
+    args = parser.parse_args(argv)
+    
+    try:
+        return asyncio.run(args.handler(args))
+    except HTTPException as exc:
+        print(f"❌ {exc.detail}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,7 @@
 Configuración de la aplicación.
 Maneja todas las variables de entorno y configuraciones globales.
 """
+import os
 from pydantic_settings import BaseSettings
 from typing import List
 
@@ -17,15 +18,138 @@ class Settings(BaseSettings):
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = True
     
+    # Logs y diagnóstico de SQL
+    LOG_LEVEL: str = "INFO"
+    SQL_ECHO: bool = False  # Imprime cada consulta (muy costoso, solo para depurar)
+    SQL_METRICS_ENABLED: bool = True  # Cabecera Server-Timing y log por petición
+    SLOW_QUERY_THRESHOLD_MS: int = 200
+    SLOW_QUERY_SAMPLE_RATE: float = 1.0  # Fracción de consultas lentas que se registran
+    
     # Base de datos
     DATABASE_URL: str
+    # URL con driver asíncrono (opcional, se deriva de DATABASE_URL si está vacía)
+    ASYNC_DATABASE_URL: str = ""
+    
+    # Pool de conexiones (cada worker abre hasta DB_POOL_SIZE + DB_MAX_OVERFLOW por motor)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800  # Segundos; menor que el wait_timeout del servidor
+    DB_POOL_TIMEOUT: int = 30  # Segundos esperando una conexión libre
+    DB_POOL_PRE_PING: bool = False  # Ping en cada checkout (normalmente basta con el recycle)
+    
+    # Réplicas de lectura (URLs separadas por comas; vacío = todo al primario)
+    DATABASE_REPLICA_URLS: str = ""
+    REPLICA_EJECT_SECONDS: int = 30  # Tiempo fuera de la rotación tras un fallo
     
     # JWT (JSON Web Tokens)
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
+    
+    # Anillo de claves JWT (RS256/ES256/EdDSA), ver app/utils/keyring.py
+    # Lista JSON de claves; vacía = firmar con SECRET_KEY/ALGORITHM
+    JWT_KEYS: str = ""
+    JWT_ACTIVE_KID: str = ""
+    # Aceptar tokens sin `kid` firmados con SECRET_KEY (útil durante la migración)
+    JWT_ACCEPT_LEGACY_TOKENS: bool = True
+    # Cache-Control del endpoint /.well-known/jwks.json (segundos)
+    JWKS_CACHE_MAX_AGE: int = 3600
+    # Codec JWT: "fast" (ruta optimizada HS256) o "jose" (python-jose)
+    JWT_CODEC: str = "fast"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     
+    # Sesiones (refresh tokens): "database" o "memory"
+    SESSION_STORE_BACKEND: str = "database"
+    SESSION_CLEANUP_INTERVAL_SECONDS: int = 3600
+    SESSION_CLEANUP_BATCH_SIZE: int = 1000
+    
+    # Revocación de access tokens (filtro de Bloom en memoria + tabla revoked_tokens)
+    REVOCATION_BLOOM_CAPACITY: int = 100000
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    REVOCATION_SYNC_INTERVAL_SECONDS: int = 30
+    
+    # Caché de tokens verificados (evita re-verificar la firma en cada petición)
+    TOKEN_CACHE_ENABLED: bool = True
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: int = 300
+    
+    # Caché del usuario autenticado (evita el SELECT de users en cada petición)
+    PRINCIPAL_CACHE_ENABLED: bool = True
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    
+    # Modo sin estado: el rol y el estado viajan en el access token y solo
+    # se compara la versión de token del usuario (mapa en memoria con TTL)
+    STATELESS_AUTH: bool = False
+    TOKEN_VERSION_MAX_SIZE: int = 100000
+    TOKEN_VERSION_TTL_SECONDS: int = 30
+    
+    # Límite de intentos de login (ventana deslizante por username y por IP)
+    # El límite por IP es opcional (0 = desactivado): detrás de un proxy, la IP
+    # del cliente solo es real si uvicorn confía en él (FORWARDED_ALLOW_IPS);
+    # si no, todos los clientes comparten la IP del proxy y la misma ventana
+    LOGIN_RATE_LIMIT_ENABLED: bool = True
+    LOGIN_RATE_LIMIT_BACKEND: str = "memory"  # "memory" o "redis"
+    LOGIN_RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    LOGIN_RATE_LIMIT_PER_USERNAME: int = 5
+    LOGIN_RATE_LIMIT_PER_IP: int = 0
+    LOGIN_RATE_LIMIT_WINDOW_SECONDS: int = 60
+    
+    # Caché negativa de usernames/emails inexistentes en el login
+    IDENTITY_NEGATIVE_CACHE_ENABLED: bool = True
+    IDENTITY_NEGATIVE_CACHE_MAX_SIZE: int = 10000
+    IDENTITY_NEGATIVE_CACHE_TTL_SECONDS: int = 30
+    
+    # Caché de totales de los listados (se invalida al escribir)
+    # Con más de COUNT_ESTIMATE_MIN_ROWS filas, los listados sin filtros
+    # usan una estimación en lugar de COUNT(*) (0 = contar siempre)
+    COUNT_CACHE_MAX_SIZE: int = 1000
+    COUNT_CACHE_TTL_SECONDS: int = 30
+    COUNT_ESTIMATE_MIN_ROWS: int = 100000
+    
+    # Búsqueda de productos: "auto" (fulltext con MySQL, memory con otros
+    # motores), "fulltext", "memory" o "like". El índice en memoria se
+    # sincroniza con los cambios de otros workers cada N segundos
+    PRODUCT_SEARCH_BACKEND: str = "auto"
+    PRODUCT_SEARCH_SYNC_INTERVAL_SECONDS: int = 60
+    
+    # Caché de GET /api/products/{id} (JSON serializado, se invalida al escribir)
+    # "memory" es local a cada worker; "redis" se comparte entre todos
+    PRODUCT_CACHE_ENABLED: bool = True
+    PRODUCT_CACHE_BACKEND: str = "memory"  # "memory" o "redis"
+    PRODUCT_CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    PRODUCT_CACHE_MAX_SIZE: int = 10000
+    PRODUCT_CACHE_TTL_SECONDS: int = 300
+    
+    # Cache-Control de las respuestas del catálogo (vacío = no se envía)
+    # Todas llevan ETag: con "no-cache" el cliente revalida en cada petición
+    # (If-None-Match → 304 sin cuerpo); con max-age se ahorra la petición.
+    # Los listados detectan los cambios de otros workers cada
+    # PRODUCT_SEARCH_SYNC_INTERVAL_SECONDS
+    CACHE_CONTROL_PRODUCT: str = "public, no-cache"
+    CACHE_CONTROL_PRODUCT_LIST: str = "public, no-cache"
+    CACHE_CONTROL_CATALOG_TERMS: str = "public, max-age=60"
+    
+    # Facetas de productos (GET /api/products/facets): límites de los tramos
+    # de precio separados por comas y máximo de valores por faceta.
+    # Las facetas sin filtros se cachean hasta la próxima escritura
+    PRODUCT_FACET_PRICE_BUCKETS: str = "50,100,250,500,1000"
+    PRODUCT_FACET_MAX_VALUES: int = 50
+    PRODUCT_FACET_CACHE_TTL_SECONDS: int = 300
+    
+    # Importación masiva de usuarios (POST /api/users/bulk y app.cli import-users)
+    # El cuerpo se corta al superar BULK_IMPORT_MAX_BYTES, antes de decodificarlo
+    BULK_IMPORT_MAX_ROWS: int = 10000
+    BULK_IMPORT_MAX_BYTES: int = 5242880  # 5 MB
+    BULK_IMPORT_CHUNK_SIZE: int = 500
+    # Procesos para el hash de contraseñas de POST /api/users/bulk, separados
+    # del pool de login para que una importación no bloquee los logins
+    # (-1 = automático: los núcleos que no usa PASSWORD_HASH_WORKERS, mínimo 1)
+    BULK_IMPORT_HASH_WORKERS: int = -1
+    
+    # Pool de procesos para bcrypt (0 = usar el threadpool por defecto)
+    PASSWORD_HASH_WORKERS: int = 2
+    
     # CORS - Lista de orígenes permitidos para hacer peticiones
     ALLOWED_ORIGINS: str = "https://jwt-api-frontend.vercel.app/"
     
@@ -40,6 +164,18 @@ class Settings(BaseSettings):
         """Convierte la cadena de orígenes en una lista"""
         return [origin.strip() for origin in self.ALLOWED_ORIGINS.split(",")]
     
+    @property
+    def price_buckets_list(self) -> List[float]:
+        """Convierte los límites de los tramos de precio en una lista ordenada"""
+        return sorted(float(limit) for limit in self.PRODUCT_FACET_PRICE_BUCKETS.split(",") if limit.strip())
+    
+    @property
+    def bulk_import_hash_workers(self) -> int:
+        """Procesos del pool de importación (resuelve el valor automático)"""
+        if self.BULK_IMPORT_HASH_WORKERS >= 0:
+            return self.BULK_IMPORT_HASH_WORKERS
+        return max((os.cpu_count() or 1) - max(self.PASSWORD_HASH_WORKERS, 0), 1)
+    
     class Config:
         # Indica que debe leer del archivo .env
         env_file = ".env"
@@ -1,24 +1,120 @@
 """
 Configuración de la base de datos.
-Establece la conexión con MySQL usando SQLAlchemy.
+Establece la conexión con MySQL usando SQLAlchemy (síncrona y asíncrona).
 """
+from pathlib import Path
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
+from app.utils.db_pool import get_pool_options, instrument_engine
+from app.utils.db_routing import READ_REPLICAS, ReplicaSet, RoutingSession
+from app.utils.sql_metrics import instrument_sql
+
+
+def get_async_database_url(url: str) -> str:
+    """
+    Convierte la URL síncrona en su equivalente con driver asíncrono.
+    
+    - mysql / mysql+pymysql → mysql+aiomysql
+    - sqlite → sqlite+aiosqlite (útil para pruebas locales)
+    
+    Args:
+        url: URL de conexión síncrona
+    
+    Returns:
+        URL de conexión con driver asíncrono
+    """
+    drivers = {
+        "mysql+pymysql://": "mysql+aiomysql://",
+        "mysql://": "mysql+aiomysql://",
+        "sqlite://": "sqlite+aiosqlite://",
+    }
+    for sync_prefix, async_prefix in drivers.items():
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
 
 # Motor de base de datos
-# pool_pre_ping=True verifica la conexión antes de usarla
+# El pool se configura con DB_POOL_* (ver app.utils.db_pool.get_pool_options)
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_pre_ping=True,
-    echo=settings.DEBUG  # Muestra las queries SQL en consola si DEBUG=True
+    echo=settings.SQL_ECHO,  # Muestra las queries SQL en consola (solo para depurar)
+    **get_pool_options(settings.DATABASE_URL, settings)
 )
+instrument_engine(engine)
+instrument_sql(engine)
+
+# Réplicas de lectura (DATABASE_REPLICA_URLS, separadas por comas)
+REPLICA_URLS = [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
+replica_set = ReplicaSet(eject_seconds=settings.REPLICA_EJECT_SECONDS)
+for index, url in enumerate(REPLICA_URLS):
+    replica_engine = create_engine(url, echo=settings.SQL_ECHO, **get_pool_options(url, settings))
+    instrument_engine(replica_engine)
+    instrument_sql(replica_engine)
+    replica_set.add(f"replica-{index}", replica_engine)
+
+
+class PrimaryRoutingSession(RoutingSession):
+    """Sesión síncrona con lecturas enrutables a las réplicas"""
+    replica_set = replica_set
+
 
 # Fábrica de sesiones
 # autocommit=False: Los cambios no se guardan automáticamente
 # autoflush=False: Los objetos no se sincronizan automáticamente
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    class_=PrimaryRoutingSession
+)
+
+# Motor asíncrono: permite tener varias consultas en vuelo por worker
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or get_async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=settings.SQL_ECHO,
+    **get_pool_options(ASYNC_DATABASE_URL, settings, asynchronous=True)
+)
+instrument_engine(async_engine.sync_engine)
+instrument_sql(async_engine.sync_engine)
+
+async_replica_set = ReplicaSet(eject_seconds=settings.REPLICA_EJECT_SECONDS)
+for index, url in enumerate(REPLICA_URLS):
+    async_url = get_async_database_url(url)
+    replica_engine = create_async_engine(
+        async_url,
+        echo=settings.SQL_ECHO,
+        **get_pool_options(async_url, settings, asynchronous=True)
+    )
+    instrument_engine(replica_engine.sync_engine)
+    instrument_sql(replica_engine.sync_engine)
+    async_replica_set.add(f"replica-{index}", replica_engine.sync_engine)
+
+
+class AsyncRoutingSession(RoutingSession):
+    """Sesión síncrona interna de AsyncSession, con lecturas enrutables a las réplicas"""
+    replica_set = async_replica_set
+
+
+# Fábrica de sesiones asíncronas
+# expire_on_commit=False: los objetos siguen siendo legibles tras el commit
+# (en modo asíncrono no se permite recargarlos de forma implícita)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    sync_session_class=AsyncRoutingSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Migraciones (ver backend/alembic.ini y backend/migrations)
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+BASELINE_REVISION = "0001"
 
 # Clase base para los modelos
 # Todos los modelos heredarán de esta clase
@@ -46,21 +142,82 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """
+    Generador de sesiones asíncronas de base de datos.
+    
+    Equivalente a get_db pero para endpoints y dependencias async.
+    
+    Uso:
+        @app.get("/users")
+        async def get_users(db: AsyncSession = Depends(get_async_db)):
+            result = await db.execute(select(User))
+            return result.scalars().all()
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_read_db():
+    """
+    Generador de sesiones para endpoints de solo lectura.
+    
+    Igual que get_db, pero los SELECT pueden ir a una réplica
+    (DATABASE_REPLICA_URLS). Si la sesión escribe, el resto de la
+    petición usa el primario.
+    
+    Uso:
+        @app.get("/products")
+        def list_products(db: Session = Depends(get_read_db)):
+            return db.query(Product).all()
+    """
+    db = SessionLocal(info={READ_REPLICAS: True})
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db():
+    """
+    Generador de sesiones asíncronas para endpoints de solo lectura.
+    
+    Equivalente a get_read_db para endpoints y dependencias async.
+    """
+    async with AsyncSessionLocal(info={READ_REPLICAS: True}) as db:
+        yield db
+
+
 def init_db():
     """
     Inicializa la base de datos.
-    Crea todas las tablas definidas en los modelos.
+    Aplica las migraciones de Alembic pendientes (alembic upgrade head).
     
-    IMPORTANTE: Ejecutar esto solo en desarrollo.
-    En producción, usar Alembic para migraciones.
+    Las bases de datos creadas antes de usar Alembic (con tablas pero sin
+    alembic_version) se marcan en la revisión inicial antes de migrar.
     """
-    from app.models import user, product  # Importar todos los modelos
-    Base.metadata.create_all(bind=engine)
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import inspect
+    
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "migrations"))
+    
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        tables = set(inspect(connection).get_table_names())
+        
+        if "users" in tables and "alembic_version" not in tables:
+            print("📌 Base de datos existente sin migraciones: marcando revisión inicial")
+            command.stamp(config, BASELINE_REVISION)
+        
+        command.upgrade(config, "head")
+    
     print("✅ Base de datos inicializada correctamente")
 
 
 if __name__ == "__main__":
     # Permite ejecutar: python -m app.database
-    # Para crear las tablas
-    print("🔧 Creando tablas en la base de datos...")
+    # Para crear o actualizar las tablas
+    print("🔧 Aplicando migraciones en la base de datos...")
     init_db()
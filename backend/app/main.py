@@ -8,12 +8,22 @@ from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from sqlalchemy.orm import Session
 from contextlib import asynccontextmanager
+import asyncio
+import time
 
 from app.config import settings
-from app.database import get_db, init_db
+from app.database import get_db, init_db, async_engine, AsyncSessionLocal
 
 from app.models.user import User, UserRole
 from app.utils.security import get_password_hash
+from app.utils.password_pool import import_password_hasher, password_hasher
+from app.services.session_store import session_store
+from app.services.revocation import revocation_list
+from app.services.product_search import product_search
+from app.services.product_suggest import product_suggest
+from app.utils.rate_limit import login_throttle
+from app.utils.response_cache import product_cache
+from app.utils.sql_metrics import configure_logging, log_request, route_template, start_request
 
 
 @asynccontextmanager
@@ -33,6 +43,20 @@ async def lifespan(app: FastAPI):
     print("👤 Verificando usuario administrador...")
     create_admin_if_not_exists()
     
+    # Arrancar el pool de procesos para bcrypt
+    password_hasher.start()
+    
+    # Cargar la lista de revocación y el índice de búsqueda en memoria
+    async with AsyncSessionLocal() as db:
+        await revocation_list.load(db)
+        await product_search.load(db)
+    
+    # Tareas periódicas en segundo plano
+    cleanup_task = asyncio.create_task(purge_expired_sessions_periodically())
+    revocation_task = asyncio.create_task(sync_revocations_periodically())
+    search_task = asyncio.create_task(sync_product_search_periodically())
+    suggest_task = asyncio.create_task(rebuild_product_suggest())
+    
     print("✅ Aplicación iniciada correctamente")
     print(f"📖 Documentación disponible en: http://localhost:8000/docs")
     
@@ -40,6 +64,15 @@ async def lifespan(app: FastAPI):
     
     # Código de limpieza (al cerrar)
     print("👋 Cerrando aplicación...")
+    cleanup_task.cancel()
+    revocation_task.cancel()
+    search_task.cancel()
+    suggest_task.cancel()
+    password_hasher.shutdown()
+    import_password_hasher.shutdown()
+    await login_throttle.close()
+    product_cache.close()
+    await async_engine.dispose()
 
 
 # Crear instancia de FastAPI
@@ -100,6 +133,24 @@ app.add_middleware(
 )
 
 
+# Instrumentación por petición: consultas SQL, tiempo de BD y Server-Timing
+if settings.SQL_METRICS_ENABLED:
+    configure_logging()
+    
+    @app.middleware("http")
+    async def sql_metrics_middleware(request: Request, call_next):
+        start = time.perf_counter()
+        stats = start_request()
+        
+        response = await call_next(request)
+        
+        elapsed = time.perf_counter() - start
+        response.headers["Server-Timing"] = stats.server_timing(elapsed)
+        
+        log_request(request.method, route_template(request), response.status_code, elapsed, stats)
+        return response
+
+
 # Manejador de errores de validación
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -148,12 +199,14 @@ async def general_exception_handler(request: Request, exc: Exception):
             }
         )
 
-from app.routes import auth, users, products
+from app.routes import auth, users, products, admin, wellknown
 
 # Incluir rutas
 app.include_router(auth.router, prefix="/api")
 app.include_router(users.router, prefix="/api")
 app.include_router(products.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
+app.include_router(wellknown.router)
 
 
 # Endpoint raíz
@@ -227,6 +280,73 @@ def create_admin_if_not_exists():
         db.close()
 
 
+async def purge_expired_sessions_periodically():
+    """
+    Elimina por lotes las sesiones (refresh tokens) expiradas.
+    Se ejecuta en segundo plano cada SESSION_CLEANUP_INTERVAL_SECONDS.
+    """
+    while True:
+        await asyncio.sleep(settings.SESSION_CLEANUP_INTERVAL_SECONDS)
+        
+        try:
+            async with AsyncSessionLocal() as db:
+                deleted = await session_store.purge_expired(
+                    db,
+                    batch_size=settings.SESSION_CLEANUP_BATCH_SIZE
+                )
+                deleted_revocations = await revocation_list.purge_expired(db)
+            if deleted or deleted_revocations:
+                print(f"🧹 Sesiones expiradas eliminadas: {deleted}, revocaciones: {deleted_revocations}")
+        except Exception as e:
+            print(f"❌ Error al limpiar sesiones: {e}")
+
+
+async def sync_revocations_periodically():
+    """
+    Sincroniza la lista de revocación con la base de datos.
+    Incorpora los tokens revocados por otros workers cada
+    REVOCATION_SYNC_INTERVAL_SECONDS.
+    """
+    while True:
+        await asyncio.sleep(settings.REVOCATION_SYNC_INTERVAL_SECONDS)
+        
+        try:
+            async with AsyncSessionLocal() as db:
+                await revocation_list.sync(db)
+        except Exception as e:
+            print(f"❌ Error al sincronizar revocaciones: {e}")
+
+
+async def sync_product_search_periodically():
+    """
+    Sincroniza los índices de productos en memoria (búsqueda y autocompletado)
+    con la base de datos. Incorpora los productos modificados por otros
+    workers cada PRODUCT_SEARCH_SYNC_INTERVAL_SECONDS.
+    """
+    while True:
+        await asyncio.sleep(settings.PRODUCT_SEARCH_SYNC_INTERVAL_SECONDS)
+        
+        try:
+            async with AsyncSessionLocal() as db:
+                await product_search.sync(db)
+                await product_suggest.sync(db)
+        except Exception as e:
+            print(f"❌ Error al sincronizar el índice de búsqueda: {e}")
+
+
+async def rebuild_product_suggest():
+    """
+    Construye el índice de autocompletado en segundo plano.
+    Hasta que termina, /api/products/suggest responde sin sugerencias.
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            await product_suggest.rebuild(db)
+        print(f"🔤 Índice de autocompletado listo ({product_suggest.stats()['suggestions']} sugerencias)")
+    except Exception as e:
+        print(f"❌ Error al construir el índice de autocompletado: {e}")
+
+
 # Para ejecutar con: uvicorn app.main:app --reload
 if __name__ == "__main__":
     import uvicorn
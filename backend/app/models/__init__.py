@@ -4,5 +4,8 @@ Aquí se importan todos los modelos para facilitar su uso.
 """
 from app.models.user import User
 from app.models.product import Product
+from app.models.session import UserSession
+from app.models.revoked_token import RevokedToken
+from app.models.catalog import CatalogVersion
 
-__all__ = ["User", "Product"]
+__all__ = ["User", "Product", "UserSession", "RevokedToken", "CatalogVersion"]
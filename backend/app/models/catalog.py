@@ -0,0 +1,25 @@
+"""
+Modelo de Versión del Catálogo para la base de datos.
+Define la estructura de la tabla 'catalog_version' en MySQL.
+Una sola fila con un contador que cambia en cada escritura de productos.
+"""
+from sqlalchemy import Column, Integer, BigInteger
+from app.database import Base
+
+
+class CatalogVersion(Base):
+    """
+    Modelo de Versión del Catálogo.
+    
+    - Tiene una única fila (id = 1), creada por la migración
+    - Cada escritura de productos incrementa `version` en su misma transacción
+    - Todos los workers leen el mismo contador (ver app.utils.http_cache)
+    """
+    __tablename__ = "catalog_version"
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    
+    def __repr__(self):
+        """Representación del objeto para debugging"""
+        return f"<CatalogVersion(version={self.version})>"
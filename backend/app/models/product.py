@@ -3,10 +3,20 @@ Modelo de Producto para la base de datos.
 Define la estructura de la tabla 'products' en MySQL.
 Este es un ejemplo de un recurso que se puede gestionar con CRUD.
 """
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, Index
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.sql import func
 from app.database import Base
 
+# En SQLite las fechas son texto y se comparan como texto: se guardan y se
+# comparan en el formato de CURRENT_TIMESTAMP (sin microsegundos). Con el
+# formato por defecto, el cursor "created_at < '...:01.000000'" volvía a
+# incluir las filas guardadas como '...:01' por server_default
+Timestamp = DateTime().with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite"
+)
+
 
 class Product(Base):
     """
@@ -20,6 +30,22 @@ class Product(Base):
     """
     __tablename__ = "products"
     
+    # Índices compuestos para el listado (filtro por is_active + orden)
+    # Se crean en las migraciones 0003 y 0004; mantener ambos sincronizados
+    __table_args__ = (
+        Index("ix_products_active_created", "is_active", "created_at"),
+        Index("ix_products_active_price", "is_active", "price"),
+        Index("ix_products_active_name", "is_active", "name"),
+        Index("ix_products_active_category_created", "is_active", "category", "created_at"),
+        Index("ix_products_active_category_price", "is_active", "category", "price"),
+        Index("ix_products_active_brand_created", "is_active", "brand", "created_at"),
+        # Búsqueda por texto (migración 0004, solo MySQL)
+        Index(
+            "ft_products_name_description", "name", "description",
+            mysql_prefix="FULLTEXT", info={"dialect": "mysql"}
+        ).ddl_if(dialect="mysql"),
+    )
+    
     # ID auto-incremental
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     
@@ -40,8 +66,8 @@ class Product(Base):
     is_active = Column(Boolean, default=True, nullable=False)
     
     # Auditoría
-    created_at = Column(DateTime, server_default=func.now(), nullable=False)
-    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+    created_at = Column(Timestamp, server_default=func.now(), nullable=False)
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now(), nullable=False)
     
     def __repr__(self):
         """Representación del objeto para debugging"""
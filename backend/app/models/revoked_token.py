@@ -0,0 +1,31 @@
+"""
+Modelo de Token Revocado para la base de datos.
+Define la estructura de la tabla 'revoked_tokens' en MySQL.
+Guarda los `jti` de access tokens invalidados antes de su expiración.
+"""
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class RevokedToken(Base):
+    """
+    Modelo de Token Revocado.
+    
+    Cada fila se puede borrar en cuanto pasa `expires_at`,
+    porque a partir de ahí el token ya no es válido de todas formas.
+    """
+    __tablename__ = "revoked_tokens"
+    
+    # Claim `jti` del access token revocado
+    jti = Column(String(64), primary_key=True)
+    
+    # Expiración del token original (después se puede eliminar la fila)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    
+    # Momento de la revocación (permite sincronizar otros workers)
+    revoked_at = Column(DateTime, server_default=func.now(), nullable=False, index=True)
+    
+    def __repr__(self):
+        """Representación del objeto para debugging"""
+        return f"<RevokedToken(jti='{self.jti}', expires_at={self.expires_at})>"
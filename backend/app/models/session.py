@@ -0,0 +1,47 @@
+"""
+Modelo de Sesión para la base de datos.
+Define la estructura de la tabla 'user_sessions' en MySQL.
+Cada fila representa un refresh token activo (una sesión por dispositivo).
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class UserSession(Base):
+    """
+    Modelo de Sesión.
+    
+    - La clave primaria es el claim `jti` del refresh token (búsqueda O(1))
+    - Solo se guarda el hash SHA-256 del refresh token, nunca el token
+    - Cada login crea una sesión nueva, así varios dispositivos conviven
+    - Al refrescar se rota el hash manteniendo el mismo `jti`
+    """
+    __tablename__ = "user_sessions"
+    
+    # Identificador de la sesión (claim `jti` del refresh token, `sid` del access token)
+    jti = Column(String(64), primary_key=True)
+    
+    # Usuario dueño de la sesión
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    
+    # Hash del refresh token vigente
+    token_hash = Column(String(64), nullable=False)
+    
+    # Información del dispositivo
+    user_agent = Column(String(255), nullable=True)
+    ip_address = Column(String(45), nullable=True)
+    
+    # Auditoría y expiración
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    last_used_at = Column(DateTime, server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        """Representación del objeto para debugging"""
+        return f"<UserSession(jti='{self.jti}', user_id={self.user_id})>"
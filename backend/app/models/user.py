@@ -45,12 +45,14 @@ class User(Base):
     role = Column(Enum(UserRole), default=UserRole.USER, nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
     
+    # Versión de los tokens: al incrementarla se invalidan los access tokens emitidos
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
+    
     # Auditoría - se llenan automáticamente
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
     
-    # Token de refresh (se guarda para poder invalidarlo)
-    refresh_token = Column(String(500), nullable=True)
+    # Los refresh tokens viven en la tabla user_sessions (ver app.models.session)
     
     def __repr__(self):
         """Representación del objeto para debugging"""
@@ -0,0 +1,96 @@
+"""
+Rutas de administración.
+Métricas internas para dimensionar pools y cachés con datos reales.
+"""
+from fastapi import APIRouter, Depends
+from app.config import settings
+from app.database import engine, async_engine, replica_set, async_replica_set
+from app.schemas.admin import PoolStatsResponse, CacheStatsResponse
+from app.services.revocation import revocation_list
+from app.utils.db_pool import pool_status
+from app.utils.dependencies import require_permissions
+from app.utils.identity_cache import unknown_identities
+from app.utils.count_cache import count_cache
+from app.services.product_search import product_search
+from app.services.product_suggest import product_suggest
+from app.utils.response_cache import facet_cache, product_cache
+from app.utils.password_pool import import_password_hasher, password_hasher
+from app.utils.permissions import Permission
+from app.utils.principal_cache import Principal, principal_cache
+from app.utils.rate_limit import login_throttle
+from app.utils.security import token_cache
+from app.utils.token_versions import token_versions
+
+router = APIRouter(prefix="/admin", tags=["Administración"])
+
+
+@router.get(
+    "/pool",
+    response_model=PoolStatsResponse,
+    summary="Estado del pool de conexiones (Admin)",
+    description="""
+    Retorna, para cada motor de base de datos, las conexiones en uso,
+    libres y de overflow, y el tiempo de espera para obtener una conexión.
+    
+    - Los valores son del worker que atiende la petición
+    - Un avg_wait_ms alto o timeouts > 0 indican que el pool se queda corto
+    - Incluye las réplicas de lectura y su estado de salud
+    - **Requiere permiso de métricas (administrador)**
+    """
+)
+async def get_pool_stats(
+    admin: Principal = Depends(require_permissions(Permission.SYSTEM_METRICS))
+):
+    """
+    Endpoint de estadísticas del pool.
+    """
+    engines = {
+        "sync": pool_status(engine, settings),
+        "async": pool_status(async_engine.sync_engine, settings)
+    }
+    for replica in replica_set.replicas:
+        engines[replica.name] = pool_status(replica.engine, settings)
+    for replica in async_replica_set.replicas:
+        engines[f"{replica.name}-async"] = pool_status(replica.engine, settings)
+    
+    return PoolStatsResponse(
+        engines=engines,
+        replicas={
+            "sync": replica_set.stats(),
+            "async": async_replica_set.stats()
+        }
+    )
+
+
+@router.get(
+    "/caches",
+    response_model=CacheStatsResponse,
+    summary="Estadísticas de cachés (Admin)",
+    description="""
+    Retorna aciertos, fallos y tamaño de las cachés en memoria, la cola
+    del pool de bcrypt y los contadores del límite de intentos de login.
+    
+    **Requiere permiso de métricas (administrador)**
+    """
+)
+async def get_cache_stats(
+    admin: Principal = Depends(require_permissions(Permission.SYSTEM_METRICS))
+):
+    """
+    Endpoint de estadísticas de cachés.
+    """
+    return CacheStatsResponse(caches={
+        "token_cache": token_cache.stats(),
+        "principal_cache": principal_cache.stats(),
+        "token_versions": token_versions.stats(),
+        "unknown_identities": unknown_identities.stats(),
+        "count_cache": count_cache.stats(),
+        "product_search": product_search.stats(),
+        "product_suggest": product_suggest.stats(),
+        "product_cache": product_cache.stats(),
+        "facet_cache": facet_cache.stats(),
+        "revocation_list": revocation_list.stats(),
+        "password_hasher": password_hasher.stats(),
+        "import_password_hasher": import_password_hasher.stats(),
+        "login_throttle": login_throttle.stats()
+    })
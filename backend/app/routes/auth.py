@@ -2,19 +2,29 @@
 Rutas de autenticación.
 Endpoints para registro, login, refresh y logout.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import get_async_db
 from app.schemas.user import UserCreate, UserResponse
 from app.schemas.auth import (
     LoginRequest,
     TokenResponse,
     RefreshTokenRequest,
-    MessageResponse
+    MessageResponse,
+    IntrospectionRequest,
+    IntrospectionResponse
 )
 from app.services.auth_service import AuthService
-from app.utils.dependencies import get_current_user
-from app.models.user import User
+from app.utils.principal_cache import Principal
+from app.utils.rate_limit import login_throttle
+from app.utils.dependencies import (
+    get_current_user,
+    get_current_user_profile,
+    get_access_token_payload,
+    require_permissions
+)
+from app.utils.permissions import Permission
 
 router = APIRouter(prefix="/auth", tags=["Autenticación"])
 
@@ -32,9 +42,9 @@ router = APIRouter(prefix="/auth", tags=["Autenticación"])
     - Se asigna automáticamente el rol 'user'
     """
 )
-def register(
+async def register(
     user_data: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Endpoint de registro de usuarios.
@@ -49,7 +59,7 @@ def register(
     }
     ```
     """
-    return AuthService.register_user(db, user_data)
+    return await AuthService.register_user(db, user_data)
 
 
 @router.post(
@@ -62,11 +72,13 @@ def register(
     - Puedes usar email o username para iniciar sesión
     - Retorna access token (corta duración) y refresh token (larga duración)
     - El access token debe incluirse en el header Authorization: Bearer <token>
+    - Demasiados intentos por usuario o IP devuelven 429 con Retry-After
     """
 )
-def login(
+async def login(
     credentials: LoginRequest,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Endpoint de login.
@@ -88,7 +100,24 @@ def login(
     }
     ```
     """
-    return AuthService.login(db, credentials.username, credentials.password)
+    ip_address = request.client.host if request.client else None
+    
+    # Limitar intentos antes de consultar la base de datos o ejecutar bcrypt
+    if settings.LOGIN_RATE_LIMIT_ENABLED:
+        await login_throttle.check(credentials.username, ip_address)
+    
+    tokens = await AuthService.login(
+        db,
+        credentials.username,
+        credentials.password,
+        user_agent=request.headers.get("user-agent"),
+        ip_address=ip_address
+    )
+    
+    if settings.LOGIN_RATE_LIMIT_ENABLED:
+        await login_throttle.succeeded(credentials.username)
+    
+    return tokens
 
 
 @router.post(
@@ -103,9 +132,9 @@ def login(
     - Retorna nuevos access y refresh tokens
     """
 )
-def refresh_token(
+async def refresh_token(
     token_request: RefreshTokenRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Endpoint para refrescar tokens.
@@ -117,7 +146,7 @@ def refresh_token(
     }
     ```
     """
-    return AuthService.refresh_access_token(db, token_request.refresh_token)
+    return await AuthService.refresh_access_token(db, token_request.refresh_token)
 
 
 @router.post(
@@ -127,13 +156,16 @@ def refresh_token(
     description="""
     Cierra la sesión del usuario actual.
     
-    - Invalida el refresh token en el servidor
+    - Invalida el refresh token de esta sesión en el servidor
+    - Revoca el access token usado, que deja de ser válido al instante
+    - Las sesiones de otros dispositivos siguen activas
     - Requiere estar autenticado
     """
 )
-def logout(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def logout(
+    current_user: Principal = Depends(get_current_user),
+    payload: dict = Depends(get_access_token_payload),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Endpoint de logout.
@@ -143,10 +175,38 @@ def logout(
     Authorization: Bearer <access_token>
     ```
     """
-    AuthService.logout(db, current_user)
+    await AuthService.logout(db, current_user, payload)
     return MessageResponse(message="Sesión cerrada exitosamente")
 
 
+@router.post(
+    "/logout-all",
+    response_model=MessageResponse,
+    summary="Cerrar todas las sesiones",
+    description="""
+    Cierra las sesiones del usuario en todos los dispositivos.
+    
+    - Invalida todos los refresh tokens del usuario
+    - Requiere estar autenticado
+    """
+)
+async def logout_all(
+    current_user: Principal = Depends(get_current_user),
+    payload: dict = Depends(get_access_token_payload),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Endpoint de logout global.
+    
+    Requiere token de autenticación en el header:
+    ```
+    Authorization: Bearer <access_token>
+    ```
+    """
+    closed = await AuthService.logout_all(db, current_user, payload)
+    return MessageResponse(message=f"Sesiones cerradas: {closed}")
+
+
 @router.get(
     "/me",
     response_model=UserResponse,
@@ -158,8 +218,8 @@ def logout(
     - Útil para verificar autenticación
     """
 )
-def get_current_user_info(
-    current_user: User = Depends(get_current_user)
+async def get_current_user_info(
+    current_user: Principal = Depends(get_current_user_profile)
 ):
     """
     Endpoint para obtener información del usuario actual.
@@ -170,3 +230,35 @@ def get_current_user_info(
     ```
     """
     return current_user
+
+
+@router.post(
+    "/introspect",
+    response_model=IntrospectionResponse,
+    summary="Introspección de tokens por lotes (Admin)",
+    description="""
+    Valida varios tokens en una sola petición (pensado para API gateways).
+    
+    - Acepta hasta 1000 tokens
+    - Retorna, para cada token, si está activo, sus claims y el estado del usuario
+    - Resuelve todos los usuarios con una sola consulta
+    - **Requiere rol de administrador** (cuenta de servicio del gateway)
+    """
+)
+async def introspect_tokens(
+    introspection: IntrospectionRequest,
+    admin: Principal = Depends(require_permissions(Permission.TOKENS_INTROSPECT)),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Endpoint de introspección.
+    
+    **Ejemplo de request:**
+    ```json
+    {
+        "tokens": ["eyJhbGciOiJIUzI1NiIs...", "eyJhbGciOiJIUzI1NiIs..."]
+    }
+    ```
+    """
+    results = await AuthService.introspect_tokens(db, introspection.tokens)
+    return IntrospectionResponse(results=results)
@@ -2,24 +2,48 @@
 Rutas de productos.
 Endpoints para gestión de productos con CRUD completo, paginación y filtros.
 """
-from fastapi import APIRouter, Depends, status, Query
+from fastapi import APIRouter, Depends, Request, Response, status, Query
 from sqlalchemy.orm import Session
 from typing import Optional
-from app.database import get_db
+from app.config import settings
+from app.database import get_db, get_read_db
 from app.schemas.product import (
     ProductCreate,
     ProductUpdate,
     ProductResponse,
-    ProductListResponse
+    ProductListResponse,
+    ProductSuggestResponse,
+    ProductFacetsResponse
 )
 from app.schemas.auth import MessageResponse
-from app.models.user import User
 from app.models.product import Product
-from app.utils.dependencies import get_current_user, require_admin, get_optional_user
+from app.services.product_service import ProductService
+from app.services.product_search import RELEVANCE, product_search
+from app.services.product_suggest import product_suggest
+from app.utils.principal_cache import Principal
+from app.utils.db_routing import use_primary
+from app.utils.dependencies import get_current_user, require_permissions
+from app.utils.permissions import Permission
+from app.utils.count_cache import count_cache, filter_signature
+from app.utils.response_cache import CachedResponse, facet_cache, product_cache
+from app.utils.http_cache import cache_headers, catalog_version, etag_matches, make_etag, not_modified
 
 router = APIRouter(prefix="/products", tags=["Productos"])
 
 
+def _product_cache_key(product_id: int) -> str:
+    """Clave del producto en la caché de respuestas"""
+    return f"product:{product_id}"
+
+
+def _after_product_write(product: Product) -> None:
+    """Actualiza los datos derivados del catálogo tras crear, modificar o eliminar un producto"""
+    product_cache.invalidate(_product_cache_key(product.id))
+    count_cache.invalidate("products")
+    product_search.index(product)
+    product_suggest.update(product)
+
+
 @router.get(
     "",
     response_model=ProductListResponse,
@@ -32,8 +56,12 @@ router = APIRouter(prefix="/products", tags=["Productos"])
     """
 )
 def list_products(
-    skip: int = Query(0, ge=0, description="Offset para paginación"),
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (next_cursor de la respuesta anterior)"),
+    skip: int = Query(0, ge=0, deprecated=True, description="Offset para paginación (obsoleto: usar cursor)"),
     limit: int = Query(10, ge=1, le=100, description="Cantidad de resultados"),
+    include_total: Optional[bool] = Query(None, description="Calcular el total (por defecto solo en la primera página)"),
     search: Optional[str] = Query(None, description="Buscar en nombre y descripción"),
     category: Optional[str] = Query(None, description="Filtrar por categoría"),
     brand: Optional[str] = Query(None, description="Filtrar por marca"),
@@ -41,10 +69,9 @@ def list_products(
     max_price: Optional[float] = Query(None, ge=0, description="Precio máximo"),
     in_stock: Optional[bool] = Query(None, description="Solo productos en stock"),
     is_active: bool = Query(True, description="Solo productos activos"),
-    sort_by: Optional[str] = Query("created_at", description="Campo para ordenar (name, price, created_at)"),
+    sort_by: Optional[str] = Query("created_at", description="Campo para ordenar (name, price, created_at, relevance)"),
     order: Optional[str] = Query("desc", description="Orden (asc/desc)"),
-    db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_optional_user)
+    db: Session = Depends(get_read_db)
 ):
     """
     Lista productos con filtros avanzados.
@@ -61,63 +88,185 @@ def list_products(
     GET /api/products?category=Electrónica&min_price=500&max_price=2000
     ```
     
+    Búsqueda ordenada por relevancia:
+    ```
+    GET /api/products?search=laptop dell&sort_by=relevance
+    ```
+    
     Con paginación y ordenamiento:
     ```
-    GET /api/products?skip=0&limit=20&sort_by=price&order=asc
+    GET /api/products?limit=20&sort_by=price&order=asc
+    GET /api/products?limit=20&sort_by=price&order=asc&cursor=<next_cursor>
     ```
+    
+    `skip` se mantiene por compatibilidad, pero cada página profunda
+    recorre y descarta las anteriores; `cursor` cuesta lo mismo en cualquier página.
+    
+    `total` solo se calcula en la primera página (o con `include_total=true`),
+    así pedir la página siguiente es una única consulta.
+    
+    La respuesta lleva un ETag de la versión del catálogo (compartida por
+    todos los workers) y los parámetros: con `If-None-Match` se responde 304
+    leyendo solo esa versión, sin ejecutar el listado.
     """
-    query = db.query(Product)
-    
-    # Filtro de estado activo
-    if is_active is not None:
-        query = query.filter(Product.is_active == is_active)
-    
-    # Búsqueda por texto
-    if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            (Product.name.like(search_filter)) |
-            (Product.description.like(search_filter))
+    # Petición condicional: si el catálogo no cambió, el cliente ya tiene la página
+    etag = make_etag("products", catalog_version.value(db), sorted(request.query_params.multi_items()))
+    if etag_matches(request, etag):
+        return not_modified(etag, settings.CACHE_CONTROL_PRODUCT_LIST)
+    response.headers.update(cache_headers(etag, settings.CACHE_CONTROL_PRODUCT_LIST))
+    
+    # Sin texto no hay relevancia que calcular: se ordena por fecha
+    if sort_by == RELEVANCE and not search:
+        sort_by = "created_at"
+    
+    query = ProductService.build_list_query(
+        search=search,
+        category=category,
+        brand=brand,
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock,
+        is_active=is_active,
+        sort_by=sort_by,
+        order=order
+    )
+    
+    # Contar total (cacheado por firma de filtros o estimado, ver count_products)
+    total, total_estimated = None, False
+    if include_total or (include_total is None and not cursor and not skip):
+        signature = filter_signature(
+            search=search,
+            category=category,
+            brand=brand,
+            min_price=min_price,
+            max_price=max_price,
+            in_stock=in_stock or None,
+            is_active=is_active
         )
+        unfiltered = not (search or category or brand or in_stock) and min_price is None and max_price is None
+        total, total_estimated = ProductService.count_products(db, query, signature, unfiltered)
     
-    # Filtro por categoría
-    if category:
-        query = query.filter(Product.category == category)
+    # Aplicar paginación: por cursor (keyset) o, por compatibilidad, por offset
+    offset = 0
+    if cursor:
+        query, offset = ProductService.apply_cursor(query, cursor, sort_by, order)
+    elif skip:
+        query = query.offset(skip)
+        offset = skip
     
-    # Filtro por marca
-    if brand:
-        query = query.filter(Product.brand == brand)
+    # Una fila extra indica si existe página siguiente
+    products = list(db.scalars(query.limit(limit + 1)).all())
+    next_cursor = ProductService.next_cursor(products, limit, sort_by, order, offset=offset)
     
-    # Filtro por rango de precio
-    if min_price is not None:
-        query = query.filter(Product.price >= min_price)
+    return ProductListResponse(
+        products=products,
+        total=total,
+        total_estimated=total_estimated,
+        skip=0 if cursor else skip,
+        limit=limit,
+        next_cursor=next_cursor
+    )
+
+
+@router.get(
+    "/suggest",
+    response_model=ProductSuggestResponse,
+    summary="Autocompletar productos",
+    description="""
+    Sugerencias de productos, marcas y categorías para el texto escrito.
     
-    if max_price is not None:
-        query = query.filter(Product.price <= max_price)
+    - Endpoint público (no requiere autenticación)
+    - Se responde desde un índice en memoria, sin consultar la base de datos
+    - Pensado para llamarse en cada pulsación de tecla
+    """
+)
+def suggest_products(
+    q: str = Query(..., min_length=1, max_length=100, description="Texto escrito por el usuario"),
+    limit: int = Query(8, ge=1, le=20, description="Cantidad de sugerencias")
+):
+    """
+    Autocompletado de la búsqueda de productos.
     
-    # Filtro por stock
-    if in_stock:
-        query = query.filter(Product.stock > 0)
+    **Ejemplo:**
+    ```
+    GET /api/products/suggest?q=lap
+    ```
+    """
+    return ProductSuggestResponse(
+        query=q,
+        suggestions=product_suggest.suggest(q, limit)
+    )
+
+
+@router.get(
+    "/facets",
+    response_model=ProductFacetsResponse,
+    summary="Facetas de productos",
+    description="""
+    Cantidad de productos por categoría, por marca y por tramo de precio.
     
-    # Ordenamiento
-    if sort_by == "name":
-        query = query.order_by(Product.name.desc() if order == "desc" else Product.name.asc())
-    elif sort_by == "price":
-        query = query.order_by(Product.price.desc() if order == "desc" else Product.price.asc())
-    else:  # default: created_at
-        query = query.order_by(Product.created_at.desc() if order == "desc" else Product.created_at.asc())
+    - Endpoint público (no requiere autenticación)
+    - Acepta los mismos filtros que el listado
+    - Se calcula con una única consulta; sin filtros se sirve desde caché
+    """
+)
+def product_facets(
+    request: Request,
+    search: Optional[str] = Query(None, description="Buscar en nombre y descripción"),
+    category: Optional[str] = Query(None, description="Filtrar por categoría"),
+    brand: Optional[str] = Query(None, description="Filtrar por marca"),
+    min_price: Optional[float] = Query(None, ge=0, description="Precio mínimo"),
+    max_price: Optional[float] = Query(None, ge=0, description="Precio máximo"),
+    in_stock: Optional[bool] = Query(None, description="Solo productos en stock"),
+    is_active: bool = Query(True, description="Solo productos activos"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Facetas para la página de productos.
     
-    # Contar total
-    total = query.count()
+    Cada faceta ignora su propio filtro: con `category=Hogar` se siguen
+    contando las demás categorías (para el resto de filtros), así se
+    pueden ofrecer como alternativas. Los tramos de precio se configuran
+    con PRODUCT_FACET_PRICE_BUCKETS.
     
-    # Aplicar paginación
-    products = query.offset(skip).limit(limit).all()
+    **Ejemplo:**
+    ```
+    GET /api/products/facets?search=laptop&in_stock=true
+    ```
+    """
+    unfiltered = not (search or category or brand or in_stock) and min_price is None and max_price is None and is_active
+    
+    # Sin filtros el ETag solo depende del catálogo (la respuesta es la misma)
+    version = catalog_version.value(db)
+    if unfiltered:
+        etag = make_etag("facets", version)
+    else:
+        etag = make_etag("facets", version, sorted(request.query_params.multi_items()))
+    if etag_matches(request, etag):
+        return not_modified(etag, settings.CACHE_CONTROL_PRODUCT_LIST)
+    
+    def load() -> CachedResponse:
+        facets = ProductService.get_facets(
+            db,
+            search=search,
+            category=category,
+            brand=brand,
+            min_price=min_price,
+            max_price=max_price,
+            in_stock=in_stock,
+            is_active=is_active
+        )
+        return CachedResponse(etag, ProductFacetsResponse(**facets).model_dump_json().encode())
     
-    return ProductListResponse(
-        products=products,
-        total=total,
-        skip=skip,
-        limit=limit
+    if unfiltered:
+        facets = facet_cache.get_or_load(f"facets:{version}", load)
+    else:
+        facets = load()
+    
+    return Response(
+        content=facets.content,
+        media_type="application/json",
+        headers=cache_headers(facets.etag, settings.CACHE_CONTROL_PRODUCT_LIST)
     )
 
 
@@ -129,26 +278,51 @@ def list_products(
 )
 def get_product(
     product_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: Session = Depends(get_read_db)
 ):
     """
     Obtiene un producto por su ID.
     
+    La respuesta se sirve desde la caché de productos (PRODUCT_CACHE_*)
+    y solo consulta la base de datos (el primario) si no está cacheada. El ETag depende
+    del ID, de `updated_at` y del contenido: con `If-None-Match` se responde
+    304 sin cuerpo.
+    
     **Ejemplo:**
     ```
     GET /api/products/1
     ```
     """
-    product = db.query(Product).filter(Product.id == product_id).first()
-    
-    if not product:
+    def load() -> Optional[CachedResponse]:
+        # La caché solo se llena desde el primario: una réplica con retraso
+        # volvería a cachear la versión anterior a la última escritura
+        use_primary(db)
+        product = db.get(Product, product_id)
+        if product is None:
+            return None
+        content = ProductResponse.model_validate(product).model_dump_json()
+        # El contenido entra en el ETag: updated_at solo tiene resolución de segundos
+        etag = make_etag("product", product.id, product.updated_at.isoformat(), content)
+        return CachedResponse(etag, content.encode())
+    
+    cached = product_cache.get_or_load(_product_cache_key(product_id), load)
+    
+    if cached is None:
         from fastapi import HTTPException
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Producto con ID {product_id} no encontrado"
         )
     
-    return product
+    if etag_matches(request, cached.etag):
+        return not_modified(cached.etag, settings.CACHE_CONTROL_PRODUCT)
+    
+    return Response(
+        content=cached.content,
+        media_type="application/json",
+        headers=cache_headers(cached.etag, settings.CACHE_CONTROL_PRODUCT)
+    )
 
 
 # ============= ENDPOINTS SOLO PARA ADMINISTRADORES =============
@@ -163,7 +337,7 @@ def get_product(
 )
 def create_product(
     product: ProductCreate,
-    admin: User = Depends(require_admin),
+    admin: Principal = Depends(require_permissions(Permission.PRODUCTS_WRITE)),
     db: Session = Depends(get_db)
 ):
     """
@@ -197,8 +371,10 @@ def create_product(
     # Crear producto
     new_product = Product(**product.model_dump())
     db.add(new_product)
+    catalog_version.bump(db)
     db.commit()
     db.refresh(new_product)
+    _after_product_write(new_product)
     
     return new_product
 
@@ -212,7 +388,7 @@ def create_product(
 def update_product(
     product_id: int,
     product_update: ProductUpdate,
-    admin: User = Depends(require_admin),
+    admin: Principal = Depends(require_permissions(Permission.PRODUCTS_WRITE)),
     db: Session = Depends(get_db)
 ):
     """
@@ -254,8 +430,10 @@ def update_product(
     for field, value in update_data.items():
         setattr(product, field, value)
     
+    catalog_version.bump(db)
     db.commit()
     db.refresh(product)
+    _after_product_write(product)
     
     return product
 
@@ -268,7 +446,7 @@ def update_product(
 )
 def delete_product(
     product_id: int,
-    admin: User = Depends(require_admin),
+    admin: Principal = Depends(require_permissions(Permission.PRODUCTS_WRITE)),
     db: Session = Depends(get_db)
 ):
     """
@@ -287,7 +465,9 @@ def delete_product(
     
     # Soft delete
     product.is_active = False
+    catalog_version.bump(db)
     db.commit()
+    _after_product_write(product)
     
     return None
 
@@ -299,16 +479,25 @@ def delete_product(
     description="Obtiene todas las categorías de productos disponibles"
 )
 def list_categories(
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db)
 ):
     """
     Lista todas las categorías únicas de productos.
     
+    Con `If-None-Match` y el catálogo sin cambios se responde 304.
+    
     **Ejemplo de response:**
     ```json
     ["Electrónica", "Ropa", "Hogar", "Deportes"]
     ```
     """
+    etag = make_etag("categories", catalog_version.value(db))
+    if etag_matches(request, etag):
+        return not_modified(etag, settings.CACHE_CONTROL_CATALOG_TERMS)
+    response.headers.update(cache_headers(etag, settings.CACHE_CONTROL_CATALOG_TERMS))
+    
     categories = db.query(Product.category).distinct().filter(
         Product.category.isnot(None),
         Product.is_active == True
@@ -324,11 +513,20 @@ def list_categories(
     description="Obtiene todas las marcas de productos disponibles"
 )
 def list_brands(
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db)
 ):
     """
     Lista todas las marcas únicas de productos.
+    
+    Con `If-None-Match` y el catálogo sin cambios se responde 304.
     """
+    etag = make_etag("brands", catalog_version.value(db))
+    if etag_matches(request, etag):
+        return not_modified(etag, settings.CACHE_CONTROL_CATALOG_TERMS)
+    response.headers.update(cache_headers(etag, settings.CACHE_CONTROL_CATALOG_TERMS))
+    
     brands = db.query(Product.brand).distinct().filter(
         Product.brand.isnot(None),
         Product.is_active == True
@@ -2,32 +2,64 @@
 Rutas de usuarios.
 Endpoints para gestión de usuarios (CRUD).
 """
-from fastapi import APIRouter, Depends, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-from app.database import get_db
+from app.config import settings
+from app.database import get_async_db, get_async_read_db
 from app.schemas.user import (
     UserResponse,
     UserUpdate,
     UserUpdateRole,
-    UserListResponse
+    UserListResponse,
+    UserImportResponse
 )
 from app.schemas.auth import PasswordChange, MessageResponse
 from app.services.user_service import UserService
-from app.utils.dependencies import get_current_user, require_admin
-from app.models.user import User, UserRole
+from app.services.user_import_service import UserImportService
+from app.utils.principal_cache import Principal
+from app.utils.dependencies import get_current_user, get_current_user_profile, require_permissions
+from app.utils.permissions import Permission
+from app.models.user import UserRole
 
 router = APIRouter(prefix="/users", tags=["Usuarios"])
 
 
+async def _read_limited_body(request: Request, max_bytes: int) -> bytes:
+    """
+    Lee el cuerpo de la petición cortando al superar `max_bytes`.
+    
+    Se rechaza antes de leer si Content-Length ya lo supera y, si no,
+    mientras llegan los fragmentos: nunca se guarda más de `max_bytes`.
+    
+    Raises:
+        HTTPException: 413 si el cuerpo es demasiado grande
+    """
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"El cuerpo no puede superar {max_bytes} bytes"
+    )
+    
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise too_large
+    
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > max_bytes:
+            raise too_large
+    return bytes(body)
+
+
 @router.get(
     "/me",
     response_model=UserResponse,
     summary="Obtener mi perfil",
     description="Retorna la información del usuario autenticado actual"
 )
-def get_my_profile(
-    current_user: User = Depends(get_current_user)
+async def get_my_profile(
+    current_user: Principal = Depends(get_current_user_profile)
 ):
     """
     Obtiene el perfil del usuario actual.
@@ -43,10 +75,10 @@ def get_my_profile(
     summary="Actualizar mi perfil",
     description="Permite al usuario actualizar su propia información"
 )
-def update_my_profile(
+async def update_my_profile(
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Actualiza el perfil del usuario actual.
@@ -65,19 +97,19 @@ def update_my_profile(
     }
     ```
     """
-    return UserService.update_user(db, current_user.id, user_update, current_user)
+    return await UserService.update_user(db, current_user.id, user_update, current_user)
 
 
 @router.post(
     "/me/change-password",
     response_model=MessageResponse,
     summary="Cambiar mi contraseña",
-    description="Permite al usuario cambiar su contraseña actual"
+    description="Permite al usuario cambiar su contraseña actual. Cierra todas sus sesiones"
 )
-def change_my_password(
+async def change_my_password(
     password_change: PasswordChange,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Cambia la contraseña del usuario actual.
@@ -90,7 +122,7 @@ def change_my_password(
     }
     ```
     """
-    UserService.change_password(
+    await UserService.change_password(
         db,
         current_user,
         password_change.current_password,
@@ -112,14 +144,15 @@ def change_my_password(
     **Requiere rol de administrador**
     """
 )
-def list_users(
+async def list_users(
     skip: int = Query(0, ge=0, description="Número de registros a saltar"),
     limit: int = Query(10, ge=1, le=100, description="Número máximo de registros"),
+    include_total: Optional[bool] = Query(None, description="Calcular el total (por defecto solo en la primera página)"),
     role: Optional[UserRole] = Query(None, description="Filtrar por rol"),
     is_active: Optional[bool] = Query(None, description="Filtrar por estado activo"),
     search: Optional[str] = Query(None, description="Buscar por username, email o nombre"),
-    admin: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    admin: Principal = Depends(require_permissions(Permission.USERS_READ)),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Lista usuarios con paginación y filtros.
@@ -127,6 +160,7 @@ def list_users(
     **Parámetros de consulta:**
     - skip: Offset para paginación
     - limit: Cantidad de resultados (máx 100)
+    - include_total: Calcular el total (por defecto solo cuando skip=0)
     - role: Filtrar por rol (user/admin)
     - is_active: Filtrar por estado
     - search: Búsqueda por texto
@@ -136,40 +170,100 @@ def list_users(
     GET /api/users?skip=0&limit=10&role=user&search=juan
     ```
     """
-    users, total = UserService.get_users(
+    users, total, total_estimated = await UserService.get_users(
         db,
         skip=skip,
         limit=limit,
         role=role,
         is_active=is_active,
-        search=search
+        search=search,
+        include_total=include_total if include_total is not None else skip == 0
     )
     
     return UserListResponse(
         users=users,
         total=total,
+        total_estimated=total_estimated,
         skip=skip,
         limit=limit
     )
 
 
+@router.post(
+    "/bulk",
+    response_model=UserImportResponse,
+    summary="Importación masiva de usuarios (Admin)",
+    description="""
+    Crea muchos usuarios en una sola petición.
+    
+    - Cuerpo en CSV con cabecera (`Content-Type: text/csv`) o NDJSON,
+      un objeto por línea (`Content-Type: application/x-ndjson`)
+    - Columnas: email, username, full_name, password y, opcionalmente, role
+    - Las filas válidas se crean aunque otras fallen
+    - Máximo BULK_IMPORT_MAX_BYTES bytes y BULK_IMPORT_MAX_ROWS filas (413)
+    - Retorna un reporte con el resultado de cada fila
+    
+    **Requiere rol de administrador**
+    """,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "text/csv": {"schema": {"type": "string"}},
+                "application/x-ndjson": {"schema": {"type": "string"}}
+            }
+        }
+    }
+)
+async def bulk_import_users(
+    request: Request,
+    admin: Principal = Depends(require_permissions(Permission.USERS_IMPORT)),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Importa usuarios desde CSV o NDJSON.
+    
+    **Ejemplo (CSV):**
+    ```
+    email,username,full_name,password
+    ana@ejemplo.com,ana,Ana López,contraseña123
+    ```
+    
+    También disponible por línea de comandos:
+    `python -m app.cli import-users usuarios.csv`
+    """
+    fmt = UserImportService.detect_format(request.headers.get("content-type"))
+    
+    try:
+        body = await _read_limited_body(request, settings.BULK_IMPORT_MAX_BYTES)
+        content = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El contenido debe estar codificado en UTF-8"
+        )
+    
+    rows = UserImportService.parse(content, fmt)
+    return await UserImportService.import_users(db, rows)
+
+
 @router.get(
     "/{user_id}",
     response_model=UserResponse,
     summary="Obtener usuario por ID (Admin)",
     description="Obtiene la información de un usuario específico por su ID"
 )
-def get_user(
+async def get_user(
     user_id: int,
-    admin: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    admin: Principal = Depends(require_permissions(Permission.USERS_READ)),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Obtiene un usuario por su ID.
     
     Requiere rol de administrador.
     """
-    return UserService.get_user_by_id(db, user_id)
+    return await UserService.get_user_by_id(db, user_id)
 
 
 @router.put(
@@ -178,11 +272,11 @@ def get_user(
     summary="Actualizar usuario (Admin)",
     description="Permite a un administrador actualizar cualquier usuario"
 )
-def update_user(
+async def update_user(
     user_id: int,
     user_update: UserUpdate,
-    admin: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    admin: Principal = Depends(require_permissions(Permission.USERS_UPDATE)),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Actualiza un usuario específico.
@@ -197,7 +291,7 @@ def update_user(
     }
     ```
     """
-    return UserService.update_user(db, user_id, user_update, admin)
+    return await UserService.update_user(db, user_id, user_update, admin)
 
 
 @router.patch(
@@ -206,11 +300,11 @@ def update_user(
     summary="Cambiar rol de usuario (Admin)",
     description="Permite a un administrador cambiar el rol de un usuario"
 )
-def update_user_role(
+async def update_user_role(
     user_id: int,
     role_update: UserUpdateRole,
-    admin: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    admin: Principal = Depends(require_permissions(Permission.USERS_MANAGE_ROLES)),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Cambia el rol de un usuario.
@@ -224,7 +318,7 @@ def update_user_role(
     }
     ```
     """
-    return UserService.update_user_role(db, user_id, role_update)
+    return await UserService.update_user_role(db, user_id, role_update)
 
 
 @router.delete(
@@ -238,15 +332,15 @@ def update_user_role(
     - El administrador no puede eliminarse a sí mismo
     """
 )
-def delete_user(
+async def delete_user(
     user_id: int,
-    admin: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    admin: Principal = Depends(require_permissions(Permission.USERS_DELETE)),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Elimina (desactiva) un usuario.
     
     Requiere rol de administrador.
     """
-    UserService.delete_user(db, user_id, admin)
+    await UserService.delete_user(db, user_id, admin)
     return None
@@ -0,0 +1,43 @@
+"""
+Rutas .well-known.
+Publica las claves públicas de firma (JWKS) para que otros servicios
+verifiquen nuestros tokens localmente.
+"""
+from fastapi import APIRouter, Response
+from app.config import settings
+from app.utils.keyring import keyring
+
+router = APIRouter(prefix="/.well-known", tags=["Well-known"])
+
+
+@router.get(
+    "/jwks.json",
+    summary="Claves públicas JWKS",
+    description="""
+    Retorna las claves públicas del anillo en formato JWK Set (RFC 7517).
+    
+    - Solo incluye claves asimétricas (RS256, ES256, EdDSA)
+    - Los secretos HS256 nunca se publican
+    - La respuesta es cacheable (ver JWKS_CACHE_MAX_AGE)
+    """
+)
+def get_jwks():
+    """
+    Endpoint JWKS.
+    
+    **Ejemplo de response:**
+    ```json
+    {
+        "keys": [
+            {"kid": "2024-06", "alg": "ES256", "use": "sig", "kty": "EC",
+             "crv": "P-256", "x": "...", "y": "..."}
+        ]
+    }
+    ```
+    """
+    # El JSON se serializa una vez al cargar el anillo
+    return Response(
+        content=keyring.jwks_json,
+        media_type="application/json",
+        headers={"Cache-Control": f"public, max-age={settings.JWKS_CACHE_MAX_AGE}"}
+    )
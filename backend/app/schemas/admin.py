@@ -0,0 +1,66 @@
+"""
+Schemas de administración usando Pydantic.
+Define las respuestas de los endpoints de métricas internas.
+"""
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Any, Dict, Optional
+
+
+class PoolStats(BaseModel):
+    """
+    Estado y métricas del pool de conexiones de un motor.
+    Los campos de tamaño solo existen en pools con cola (no en SQLite).
+    """
+    pool_class: str = Field(..., description="Clase del pool")
+    size: Optional[int] = Field(None, description="Conexiones permanentes (DB_POOL_SIZE)")
+    checked_out: Optional[int] = Field(None, description="Conexiones en uso")
+    idle: Optional[int] = Field(None, description="Conexiones libres en el pool")
+    overflow: Optional[int] = Field(None, description="Conexiones extra abiertas por encima de size")
+    max_overflow: Optional[int] = Field(None, description="Máximo de conexiones extra (DB_MAX_OVERFLOW)")
+    timeout_seconds: Optional[float] = Field(None, description="Espera máxima por una conexión (DB_POOL_TIMEOUT)")
+    recycle_seconds: Optional[int] = Field(None, description="Edad máxima de una conexión (DB_POOL_RECYCLE)")
+    checkouts: Optional[int] = Field(None, description="Conexiones entregadas desde el arranque")
+    timeouts: Optional[int] = Field(None, description="Checkouts que agotaron el timeout")
+    disconnects: Optional[int] = Field(None, description="Desconexiones detectadas (invalidan el pool)")
+    avg_wait_ms: Optional[float] = Field(None, description="Tiempo medio de checkout")
+    max_wait_ms: Optional[float] = Field(None, description="Tiempo máximo de checkout")
+
+
+class PoolStatsResponse(BaseModel):
+    """
+    Schema de respuesta con los pools de todos los motores.
+    """
+    engines: Dict[str, PoolStats]
+    replicas: Dict[str, Dict[str, Any]] = Field(default_factory=dict, description="Salud de las réplicas de lectura")
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "engines": {
+                    "sync": {
+                        "pool_class": "TimedQueuePool",
+                        "size": 5,
+                        "checked_out": 1,
+                        "idle": 4,
+                        "overflow": 0,
+                        "max_overflow": 10,
+                        "timeout_seconds": 30,
+                        "recycle_seconds": 1800,
+                        "checkouts": 1520,
+                        "timeouts": 0,
+                        "disconnects": 0,
+                        "avg_wait_ms": 0.041,
+                        "max_wait_ms": 12.5
+                    }
+                }
+            }
+        }
+    )
+
+
+class CacheStatsResponse(BaseModel):
+    """
+    Schema de respuesta con las estadísticas de cachés y limitadores en memoria.
+    Son locales al worker que atiende la petición.
+    """
+    caches: Dict[str, Dict[str, Any]]
@@ -3,7 +3,7 @@ Schemas de Autenticación usando Pydantic.
 Define cómo se validan los datos de login y tokens.
 """
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from typing import Any, Dict, Optional
 from app.models.user import UserRole
 
 
@@ -88,6 +88,67 @@ class PasswordChange(BaseModel):
     )
 
 
+class IntrospectionRequest(BaseModel):
+    """
+    Schema para introspección de tokens por lotes.
+    """
+    tokens: list[str] = Field(..., min_length=1, max_length=1000, description="Tokens a validar (máx 1000)")
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "tokens": [
+                    "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9...",
+                    "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9..."
+                ]
+            }
+        }
+    )
+
+
+class IntrospectedUser(BaseModel):
+    """
+    Estado del usuario referenciado por un token.
+    """
+    id: int
+    username: str
+    role: UserRole
+    is_active: bool
+
+
+class IntrospectionResult(BaseModel):
+    """
+    Resultado de la introspección de un token.
+    """
+    active: bool = Field(..., description="True si el token es un access token válido de un usuario activo")
+    reason: Optional[str] = Field(None, description="Motivo si no está activo (invalid, wrong_type, revoked, user_not_found, user_inactive, stale_version)")
+    claims: Optional[Dict[str, Any]] = Field(None, description="Claims del token si la firma es válida")
+    user: Optional[IntrospectedUser] = Field(None, description="Estado actual del usuario")
+
+
+class IntrospectionResponse(BaseModel):
+    """
+    Respuesta de introspección por lotes (mismo orden que la petición).
+    """
+    results: list[IntrospectionResult]
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "results": [
+                    {
+                        "active": True,
+                        "reason": None,
+                        "claims": {"user_id": 1, "username": "usuario123", "role": "user", "exp": 1705315800},
+                        "user": {"id": 1, "username": "usuario123", "role": "user", "is_active": True}
+                    },
+                    {"active": False, "reason": "invalid", "claims": None, "user": None}
+                ]
+            }
+        }
+    )
+
+
 class MessageResponse(BaseModel):
     """
     Schema genérico para respuestas con mensaje.
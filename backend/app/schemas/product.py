@@ -96,19 +96,100 @@ class ProductResponse(ProductBase):
 class ProductListResponse(BaseModel):
     """
     Schema para lista de productos con paginación.
+    
+    `next_cursor` se pasa como `cursor` para pedir la página siguiente
+    (None = no hay más resultados). `total` es None cuando no se pidió
+    y aproximado cuando `total_estimated` es True.
     """
     products: list[ProductResponse]
-    total: int
+    total: Optional[int] = None
+    total_estimated: bool = False
     skip: int
     limit: int
+    next_cursor: Optional[str] = None
     
     model_config = ConfigDict(
         json_schema_extra={
             "example": {
                 "products": [],
                 "total": 100,
+                "total_estimated": False,
                 "skip": 0,
-                "limit": 10
+                "limit": 10,
+                "next_cursor": "eyJzIjoiY3JlYXRlZF9hdCIsIm8iOiJkZXNjIiwidiI6IjIwMjQtMDEtMTVUMTA6MzA6MDAiLCJpZCI6NDJ9"
+            }
+        }
+    )
+
+
+class ProductSuggestion(BaseModel):
+    """
+    Schema de una sugerencia de búsqueda.
+    """
+    text: str = Field(..., description="Texto sugerido")
+    kind: str = Field(..., description="Tipo: product, brand o category")
+    product_id: Optional[int] = Field(None, description="ID del producto (solo kind=product)")
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ProductSuggestResponse(BaseModel):
+    """
+    Schema de respuesta del autocompletado de productos.
+    """
+    query: str
+    suggestions: list[ProductSuggestion]
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "query": "lap",
+                "suggestions": [
+                    {"text": "Laptops", "kind": "category", "product_id": None},
+                    {"text": "Laptop Dell XPS 15", "kind": "product", "product_id": 1}
+                ]
+            }
+        }
+    )
+
+
+class FacetValue(BaseModel):
+    """
+    Schema de un valor de faceta (categoría o marca) con su cantidad de productos.
+    """
+    value: str
+    count: int
+
+
+class PriceBucket(BaseModel):
+    """
+    Schema de un tramo de precio: min_price <= precio < max_price.
+    """
+    min_price: float
+    max_price: Optional[float] = Field(None, description="None = sin límite superior")
+    count: int
+
+
+class ProductFacetsResponse(BaseModel):
+    """
+    Schema de respuesta de las facetas de productos.
+    
+    Cada faceta ignora su propio filtro: con `category=X`, `categories`
+    sigue contando todas las categorías para el resto de filtros.
+    """
+    categories: list[FacetValue]
+    brands: list[FacetValue]
+    price: list[PriceBucket]
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "categories": [{"value": "Electrónica", "count": 42}, {"value": "Hogar", "count": 17}],
+                "brands": [{"value": "Dell", "count": 12}],
+                "price": [
+                    {"min_price": 0.0, "max_price": 50.0, "count": 8},
+                    {"min_price": 50.0, "max_price": None, "count": 51}
+                ]
             }
         }
     )
@@ -104,9 +104,11 @@ class UserResponse(UserBase):
 class UserListResponse(BaseModel):
     """
     Schema para lista de usuarios con paginación.
+    `total` es None cuando no se pidió y aproximado cuando `total_estimated` es True.
     """
     users: list[UserResponse]
-    total: int
+    total: Optional[int] = None
+    total_estimated: bool = False
     skip: int
     limit: int
     
@@ -115,8 +117,52 @@ class UserListResponse(BaseModel):
             "example": {
                 "users": [],
                 "total": 50,
+                "total_estimated": False,
                 "skip": 0,
                 "limit": 10
             }
         }
     )
+
+
+class UserImportRow(UserCreate):
+    """
+    Schema de una fila de la importación masiva de usuarios.
+    Igual que el registro, pero el admin puede indicar el rol.
+    """
+    role: UserRole = Field(UserRole.USER, description="Rol del usuario (por defecto user)")
+
+
+class UserImportResult(BaseModel):
+    """
+    Resultado de una fila de la importación masiva.
+    """
+    row: int = Field(..., description="Número de fila (1 = primera fila de datos)")
+    status: str = Field(..., description="created o error")
+    username: Optional[str] = None
+    email: Optional[str] = None
+    error: Optional[str] = Field(None, description="Motivo del error")
+
+
+class UserImportResponse(BaseModel):
+    """
+    Reporte de la importación masiva de usuarios.
+    """
+    total: int
+    created: int
+    failed: int
+    results: list[UserImportResult]
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "total": 2,
+                "created": 1,
+                "failed": 1,
+                "results": [
+                    {"row": 1, "status": "created", "username": "ana", "email": "ana@ejemplo.com", "error": None},
+                    {"row": 2, "status": "error", "username": "admin", "email": "x@ejemplo.com", "error": "El username ya está en uso"}
+                ]
+            }
+        }
+    )
@@ -2,17 +2,29 @@
 Servicio de autenticación.
 Lógica de negocio para registro, login y gestión de tokens.
 """
-from sqlalchemy.orm import Session
+import hmac
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
+from app.config import settings
 from app.models.user import User, UserRole
 from app.schemas.user import UserCreate
-from app.schemas.auth import TokenResponse
+from app.schemas.auth import TokenResponse, IntrospectionResult, IntrospectedUser
+from app.services.session_store import session_store
+from app.services.revocation import revocation_list
 from app.utils.security import (
-    verify_password,
-    get_password_hash,
     create_tokens_for_user,
-    decode_token
+    decode_token,
+    hash_token,
+    new_session_id
 )
+from app.utils.password_pool import password_hasher
+from app.utils.identity_cache import unknown_identities
+from app.utils.count_cache import count_cache
+from app.utils.principal_cache import Principal, principal_cache
+from app.utils.dependencies import load_principals
 
 
 class AuthService:
@@ -21,8 +33,11 @@ class AuthService:
     Maneja todas las operaciones relacionadas con auth.
     """
     
+    # Hash ficticio para igualar el tiempo de los logins fallidos (ver _dummy_password_hash)
+    _dummy_hash: Optional[str] = None
+    
     @staticmethod
-    def register_user(db: Session, user_data: UserCreate) -> User:
+    async def register_user(db: AsyncSession, user_data: UserCreate) -> User:
         """
         Registra un nuevo usuario.
         
@@ -37,23 +52,23 @@ class AuthService:
             HTTPException: Si el email o username ya existen
         """
         # Verificar si el email ya existe
-        existing_user = db.query(User).filter(User.email == user_data.email).first()
-        if existing_user:
+        result = await db.execute(select(User.id).where(User.email == user_data.email))
+        if result.first():
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="El email ya está registrado"
             )
         
         # Verificar si el username ya existe
-        existing_user = db.query(User).filter(User.username == user_data.username).first()
-        if existing_user:
+        result = await db.execute(select(User.id).where(User.username == user_data.username))
+        if result.first():
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="El username ya está en uso"
             )
         
         # Crear nuevo usuario
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await password_hasher.hash(user_data.password)
         
         new_user = User(
             email=user_data.email,
@@ -65,13 +80,15 @@ class AuthService:
         )
         
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
+        unknown_identities.invalidate(new_user.username, new_user.email)
+        count_cache.invalidate("users")
         
         return new_user
     
     @staticmethod
-    def authenticate_user(db: Session, username: str, password: str) -> User:
+    async def authenticate_user(db: AsyncSession, username: str, password: str) -> User:
         """
         Autentica un usuario con username/email y contraseña.
         
@@ -86,12 +103,12 @@ class AuthService:
         Raises:
             HTTPException: Si las credenciales son incorrectas
         """
-        # Buscar por username o email
-        user = db.query(User).filter(
-            (User.username == username) | (User.email == username)
-        ).first()
+        user = await AuthService._find_user_for_login(db, username)
         
         if not user:
+            # Verificar contra un hash ficticio para que la respuesta tarde
+            # lo mismo exista o no el usuario (evita enumerar cuentas)
+            await password_hasher.verify(password, await AuthService._dummy_password_hash())
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Credenciales incorrectas",
@@ -99,7 +116,7 @@ class AuthService:
             )
         
         # Verificar contraseña
-        if not verify_password(password, user.hashed_password):
+        if not await password_hasher.verify(password, user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Credenciales incorrectas",
@@ -116,31 +133,95 @@ class AuthService:
         return user
     
     @staticmethod
-    def login(db: Session, username: str, password: str) -> TokenResponse:
+    async def _find_user_for_login(db: AsyncSession, identity: str) -> Optional[User]:
+        """
+        Busca el usuario de un login usando un único índice.
+        
+        - Con "@" se consulta el índice de email (y, si no aparece, el de
+          username, que también admite "@")
+        - Sin "@" solo se consulta el índice de username
+        - Las identidades inexistentes se recuerdan en la caché negativa
+        
+        Args:
+            db: Sesión de base de datos
+            identity: Username o email enviado en el login
+        
+        Returns:
+            Usuario o None si no existe
+        """
+        use_cache = settings.IDENTITY_NEGATIVE_CACHE_ENABLED
+        if use_cache and unknown_identities.contains(identity):
+            return None
+        
+        columns = [User.email, User.username] if "@" in identity else [User.username]
+        
+        user = None
+        for column in columns:
+            result = await db.execute(select(User).where(column == identity))
+            user = result.scalars().first()
+            if user is not None:
+                break
+        
+        if user is None and use_cache:
+            unknown_identities.add(identity)
+        
+        return user
+    
+    @staticmethod
+    async def _dummy_password_hash() -> str:
+        """Hash bcrypt de relleno para los logins de usuarios inexistentes (se crea una vez)"""
+        if AuthService._dummy_hash is None:
+            AuthService._dummy_hash = await password_hasher.hash(new_session_id())
+        return AuthService._dummy_hash
+    
+    @staticmethod
+    async def login(
+        db: AsyncSession,
+        username: str,
+        password: str,
+        user_agent: Optional[str] = None,
+        ip_address: Optional[str] = None
+    ) -> TokenResponse:
         """
         Realiza el login y genera tokens.
         
+        Cada login abre una sesión nueva, de modo que iniciar sesión
+        en otro dispositivo no cierra las sesiones existentes.
+        
         Args:
             db: Sesión de base de datos
             username: Username o email
             password: Contraseña
+            user_agent: User-Agent del cliente (opcional)
+            ip_address: IP del cliente (opcional)
         
         Returns:
             Respuesta con access y refresh tokens
         """
         # Autenticar usuario
-        user = AuthService.authenticate_user(db, username, password)
+        user = await AuthService.authenticate_user(db, username, password)
         
         # Generar tokens
+        session_id = new_session_id()
         access_token, refresh_token = create_tokens_for_user(
             user.id,
             user.username,
-            user.role
+            user.role,
+            session_id,
+            token_version=user.token_version,
+            is_active=user.is_active
         )
         
-        # Guardar refresh token en la BD (para poder invalidarlo después)
-        user.refresh_token = refresh_token
-        db.commit()
+        # Guardar la sesión con el hash del refresh token (para poder invalidarlo después)
+        await session_store.create(
+            db,
+            jti=session_id,
+            user_id=user.id,
+            token_hash=hash_token(refresh_token),
+            expires_at=AuthService._refresh_expiration(),
+            user_agent=user_agent[:255] if user_agent else None,
+            ip_address=ip_address
+        )
         
         return TokenResponse(
             access_token=access_token,
@@ -149,10 +230,14 @@ class AuthService:
         )
     
     @staticmethod
-    def refresh_access_token(db: Session, refresh_token: str) -> TokenResponse:
+    async def refresh_access_token(db: AsyncSession, refresh_token: str) -> TokenResponse:
         """
         Genera un nuevo access token usando un refresh token.
         
+        El refresh token se rota: la sesión conserva su `jti` pero pasa
+        a guardar el hash del nuevo token. Si se presenta un refresh token
+        ya rotado, se considera reutilizado y se cierra la sesión.
+        
         Args:
             db: Sesión de base de datos
             refresh_token: Refresh token válido
@@ -180,38 +265,61 @@ class AuthService:
             )
         
         user_id = payload.get("user_id")
-        if user_id is None:
+        session_id = payload.get("jti")
+        if user_id is None or session_id is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token inválido"
             )
         
-        # Buscar usuario
-        user = db.query(User).filter(User.id == user_id).first()
+        # Buscar la sesión por su jti y verificar el hash del token
+        session = await session_store.get(db, session_id)
         
-        if not user or not user.is_active:
+        if (
+            session is None
+            or session.user_id != user_id
+            or session.expires_at < datetime.utcnow()
+        ):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Usuario no encontrado o inactivo"
+                detail="Refresh token inválido"
             )
         
-        # Verificar que el refresh token coincida con el guardado
-        if user.refresh_token != refresh_token:
+        old_hash = hash_token(refresh_token)
+        if not hmac.compare_digest(session.token_hash, old_hash):
+            # Token ya rotado: posible robo, se cierra la sesión completa
+            await AuthService._reject_reused_refresh(db, session_id)
+        
+        # Buscar usuario
+        user = await db.get(User, user_id)
+        
+        if not user or not user.is_active:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Refresh token inválido"
+                detail="Usuario no encontrado o inactivo"
             )
         
-        # Generar nuevos tokens
+        # Generar nuevos tokens para la misma sesión
         access_token, new_refresh_token = create_tokens_for_user(
             user.id,
             user.username,
-            user.role
+            user.role,
+            session_id,
+            token_version=user.token_version,
+            is_active=user.is_active
         )
         
-        # Actualizar refresh token en BD
-        user.refresh_token = new_refresh_token
-        db.commit()
+        # Rotar el refresh token de la sesión solo si sigue siendo el vigente:
+        # si otra petición lo rotó entre la lectura y aquí, es una reutilización
+        rotated = await session_store.rotate(
+            db,
+            session_id,
+            old_hash=old_hash,
+            token_hash=hash_token(new_refresh_token),
+            expires_at=AuthService._refresh_expiration()
+        )
+        if not rotated:
+            await AuthService._reject_reused_refresh(db, session_id)
         
         return TokenResponse(
             access_token=access_token,
@@ -220,13 +328,134 @@ class AuthService:
         )
     
     @staticmethod
-    def logout(db: Session, user: User) -> None:
+    async def logout(
+        db: AsyncSession,
+        current_user: Principal,
+        token_payload: dict
+    ) -> None:
         """
-        Cierra sesión invalidando el refresh token.
+        Cierra la sesión actual.
+        
+        Invalida el refresh token de la sesión y revoca el access token
+        usado en la petición, que deja de funcionar de inmediato.
         
         Args:
             db: Sesión de base de datos
-            user: Usuario actual
+            current_user: Usuario actual
+            token_payload: Payload del access token usado en la petición
+        """
+        await AuthService._revoke_access_token(db, token_payload)
+        
+        session_id = token_payload.get("sid")
+        if session_id:
+            session = await session_store.get(db, session_id)
+            if session is not None and session.user_id == current_user.id:
+                await session_store.revoke(db, session_id)
+        principal_cache.invalidate(current_user.id)
+    
+    @staticmethod
+    async def logout_all(
+        db: AsyncSession,
+        current_user: Principal,
+        token_payload: dict
+    ) -> int:
+        """
+        Cierra todas las sesiones del usuario (todos los dispositivos).
+        
+        Args:
+            db: Sesión de base de datos
+            current_user: Usuario actual
+            token_payload: Payload del access token usado en la petición
+        
+        Returns:
+            Número de sesiones cerradas
+        """
+        await AuthService._revoke_access_token(db, token_payload)
+        closed = await session_store.revoke_all(db, current_user.id)
+        principal_cache.invalidate(current_user.id)
+        return closed
+    
+    @staticmethod
+    async def introspect_tokens(db: AsyncSession, tokens: list[str]) -> list[IntrospectionResult]:
         """
-        user.refresh_token = None
-        db.commit()
+        Valida un lote de tokens (pensado para API gateways).
+        
+        - Cada token pasa por decode_token (y por su caché)
+        - Se consulta la lista de revocación en memoria
+        - Todos los usuarios referenciados se resuelven de una vez
+          (caché de principals + una sola consulta IN)
+        
+        Args:
+            db: Sesión de base de datos
+            tokens: Tokens a validar
+        
+        Returns:
+            Un resultado por token, en el mismo orden
+        """
+        payloads = [decode_token(token) for token in tokens]
+        user_ids = {
+            payload["user_id"]
+            for payload in payloads
+            if payload is not None and payload.get("user_id") is not None
+        }
+        principals = await load_principals(db, user_ids)
+        
+        results = []
+        for payload in payloads:
+            if payload is None:
+                results.append(IntrospectionResult(active=False, reason="invalid"))
+                continue
+            
+            principal = principals.get(payload.get("user_id"))
+            user = None
+            if principal is not None:
+                user = IntrospectedUser(
+                    id=principal.id,
+                    username=principal.username,
+                    role=principal.role,
+                    is_active=principal.is_active
+                )
+            
+            if payload.get("token_type") != "access":
+                reason = "wrong_type"
+            elif revocation_list.is_revoked(payload.get("jti")):
+                reason = "revoked"
+            elif principal is None:
+                reason = "user_not_found"
+            elif not principal.is_active:
+                reason = "user_inactive"
+            elif payload.get("ver", principal.token_version) != principal.token_version:
+                reason = "stale_version"
+            else:
+                reason = None
+            
+            results.append(IntrospectionResult(
+                active=reason is None,
+                reason=reason,
+                claims=payload,
+                user=user
+            ))
+        
+        return results
+    
+    @staticmethod
+    async def _revoke_access_token(db: AsyncSession, token_payload: dict) -> None:
+        """Añade el access token a la lista de revocación hasta su expiración"""
+        jti = token_payload.get("jti")
+        exp = token_payload.get("exp")
+        if jti and exp:
+            await revocation_list.revoke(db, jti, exp)
+    
+    @staticmethod
+    def _refresh_expiration() -> datetime:
+        """Fecha de expiración de una sesión creada o rotada ahora"""
+        return datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    
+    @staticmethod
+    async def _reject_reused_refresh(db: AsyncSession, session_id: str) -> None:
+        """Cierra la sesión de un refresh token reutilizado y responde 401"""
+        await session_store.revoke(db, session_id)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token inválido"
+        )
@@ -0,0 +1,150 @@
+"""
+Diagnóstico de las consultas del listado de productos.
+Planes de ejecución (EXPLAIN) y recorrido de la paginación por cursor.
+
+Lo usan los comandos `explain-products` y `check-pagination` de la CLI
+y las pruebas de tests/test_product_queries.py. Trabaja sobre una
+conexión síncrona (con AsyncConnection, a través de `run_sync`).
+"""
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import Select, insert
+from sqlalchemy.engine import Connection
+from app.models.product import Product
+from app.services.product_service import ProductService
+
+
+# Formas representativas del listado de productos (parámetros de GET /api/products)
+LISTING_SHAPES = {
+    "recientes": {},
+    "precio ascendente": {"sort_by": "price", "order": "asc"},
+    "nombre ascendente": {"sort_by": "name", "order": "asc"},
+    "categoría": {"category": "Electrónica"},
+    "categoría por precio": {"category": "Electrónica", "sort_by": "price", "order": "asc"},
+    "categoría con rango de precio": {"category": "Electrónica", "min_price": 100, "max_price": 500, "sort_by": "price"},
+    "marca": {"brand": "Dell"},
+}
+
+# Último producto de una página ficticia, para generar cursores de ejemplo
+SAMPLE_PRODUCT = Product(id=1000, name="M", price=100.0, created_at=datetime(2024, 1, 1))
+
+# Órdenes del listado que recorre check_pagination
+PAGINATION_ORDERS = [("created_at", "desc"), ("created_at", "asc"), ("price", "asc"), ("name", "desc")]
+
+
+class ProductDiagnostics:
+    """Comprobaciones de índices y paginación del listado de productos"""
+    
+    @staticmethod
+    def explain_plan(conn: Connection, sql: str) -> tuple[List[str], List[str]]:
+        """
+        Ejecuta EXPLAIN sobre una sentencia y resume el plan.
+        
+        Returns:
+            Tupla (líneas del plan, problemas detectados: tabla completa u ordenación extra)
+        """
+        lines, problems = [], []
+        
+        if conn.dialect.name == "sqlite":
+            for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"):
+                detail = row[-1]
+                lines.append(detail)
+                if detail.startswith("SCAN") and "INDEX" not in detail:
+                    problems.append("recorre la tabla completa")
+                if "TEMP B-TREE" in detail:
+                    problems.append("ordena en memoria (temp b-tree)")
+        else:
+            for row in conn.exec_driver_sql(f"EXPLAIN {sql}").mappings():
+                extra = row.get("Extra") or ""
+                lines.append(f"table={row['table']} type={row['type']} key={row['key']} rows={row['rows']} extra={extra}")
+                if row["type"] == "ALL":
+                    problems.append("recorre la tabla completa")
+                if "Using filesort" in extra:
+                    problems.append("ordena con filesort")
+        
+        return lines, problems
+    
+    @staticmethod
+    def listing_queries(limit: int = 10) -> dict[str, Select]:
+        """
+        Consultas del listado para cada forma de LISTING_SHAPES:
+        la primera página y la siguiente (con cursor).
+        
+        Returns:
+            Diccionario {etiqueta: consulta con LIMIT}
+        """
+        queries = {}
+        for name, params in LISTING_SHAPES.items():
+            sort_by, order = params.get("sort_by"), params.get("order", "desc")
+            query = ProductService.build_list_query(**params)
+            cursor = ProductService.encode_cursor(SAMPLE_PRODUCT, sort_by, order)
+            queries[name] = query.limit(limit)
+            queries[f"{name} (cursor)"] = ProductService.apply_cursor(query, cursor, sort_by, order)[0].limit(limit)
+        return queries
+    
+    @staticmethod
+    def explain_listing(conn: Connection, limit: int = 10) -> dict[str, tuple[List[str], List[str]]]:
+        """
+        Plan de cada consulta del listado (ver listing_queries).
+        
+        Returns:
+            Diccionario {etiqueta: (líneas del plan, problemas)}
+        """
+        plans = {}
+        for label, query in ProductDiagnostics.listing_queries(limit).items():
+            sql = str(query.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+            plans[label] = ProductDiagnostics.explain_plan(conn, sql)
+        return plans
+    
+    @staticmethod
+    def paginate(conn: Connection, query: Select, sort_by: Optional[str], order: Optional[str], limit: int) -> List[int]:
+        """
+        Recorre una consulta página a página con cursor, como un cliente.
+        
+        Se detiene si obtiene más filas de las que tiene la consulta completa
+        (un cursor que no avanza no deja el recorrido en un bucle infinito).
+        
+        Returns:
+            IDs en el orden en que se recibieron
+        """
+        total = len(conn.execute(query).all())
+        seen, cursor = [], None
+        
+        while len(seen) <= total:
+            page = query
+            if cursor:
+                page = ProductService.apply_cursor(query, cursor, sort_by, order)[0]
+            rows = list(conn.execute(page.limit(limit + 1)))
+            cursor = ProductService.next_cursor(rows, limit, sort_by, order)
+            seen.extend(row.id for row in rows)
+            if cursor is None:
+                break
+        
+        return seen
+    
+    @staticmethod
+    def check_pagination(conn: Connection, marker: str, rows: int = 9, limit: int = 2) -> dict[tuple[str, str], tuple[List[int], List[int]]]:
+        """
+        Crea productos de prueba y los recorre con cursor en cada orden de PAGINATION_ORDERS.
+        
+        Los productos se crean con una sola sentencia (mismo CURRENT_TIMESTAMP,
+        precios y nombres repetidos), así todas las páginas dependen del
+        desempate por id. Quien llama decide si deshace la transacción.
+        
+        Args:
+            marker: Categoría única que identifica los productos de prueba
+        
+        Returns:
+            Diccionario {(sort_by, order): (IDs esperados, IDs obtenidos)}
+        """
+        conn.execute(insert(Product).values([
+            {"name": f"Producto {i % 4}", "price": float(10 + i % 3), "stock": 1, "category": marker, "is_active": True}
+            for i in range(rows)
+        ]))
+        
+        results = {}
+        for sort_by, order in PAGINATION_ORDERS:
+            query = ProductService.build_list_query(category=marker, sort_by=sort_by, order=order)
+            expected = [row.id for row in conn.execute(query)]
+            results[(sort_by, order)] = (expected, ProductDiagnostics.paginate(conn, query, sort_by, order, limit))
+        return results
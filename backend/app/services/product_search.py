@@ -0,0 +1,339 @@
+"""
+Búsqueda de productos por texto.
+Índice FULLTEXT de MySQL y alternativa con índice invertido en memoria.
+"""
+import math
+import re
+import threading
+import unicodedata
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+from sqlalchemy import Select, case, false, select
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models.product import Product
+
+# Valor de sort_by que ordena por relevancia
+RELEVANCE = "relevance"
+
+# Margen al sincronizar con otros workers (absorbe diferencias de reloj)
+SYNC_MARGIN = timedelta(seconds=5)
+
+# Palabras del nombre pesan más que las de la descripción
+NAME_WEIGHT = 3
+
+# Máximo de palabras del vocabulario que puede cubrir un prefijo
+MAX_PREFIX_EXPANSIONS = 50
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Divide un texto en palabras normalizadas.
+    
+    Minúsculas y sin tildes, para que "Electrónica" y "electronica"
+    coincidan igual que con las colaciones de MySQL.
+    """
+    if not text:
+        return []
+    normalized = unicodedata.normalize("NFKD", text.lower())
+    normalized = "".join(char for char in normalized if not unicodedata.combining(char))
+    return TOKEN_PATTERN.findall(normalized)
+
+
+class ProductSearchBackend(ABC):
+    """
+    Interfaz común de los backends de búsqueda.
+    
+    `apply` añade el filtro de texto a la consulta del listado; el resto
+    de métodos mantienen el índice al día en los backends que lo necesitan.
+    """
+    
+    name = "base"
+    
+    @abstractmethod
+    def apply(self, query: Select, search: str, by_relevance: bool = False) -> Select:
+        """
+        Filtra la consulta por el texto buscado.
+        
+        Args:
+            query: Consulta del listado
+            search: Texto buscado
+            by_relevance: Ordenar por relevancia (más relevante primero)
+        
+        Returns:
+            Consulta filtrada (y ordenada si by_relevance)
+        """
+    
+    def index(self, product: Product) -> None:
+        """Añade o actualiza un producto en el índice"""
+    
+    def remove(self, product_id: int) -> None:
+        """Elimina un producto del índice"""
+    
+    async def load(self, db: AsyncSession) -> None:
+        """Construye el índice completo (al iniciar la aplicación)"""
+    
+    async def sync(self, db: AsyncSession) -> int:
+        """Incorpora los productos modificados por otros workers"""
+        return 0
+    
+    def stats(self) -> dict:
+        """Retorna métricas del backend"""
+        return {"backend": self.name}
+
+
+class LikeSearchBackend(ProductSearchBackend):
+    """
+    Búsqueda con LIKE '%texto%' en nombre y descripción.
+    
+    No usa índices (recorre la tabla); se mantiene como último recurso
+    para motores sin búsqueda de texto completo.
+    """
+    
+    name = "like"
+    
+    def apply(self, query: Select, search: str, by_relevance: bool = False) -> Select:
+        search_filter = f"%{search}%"
+        query = query.where(
+            (Product.name.like(search_filter)) |
+            (Product.description.like(search_filter))
+        )
+        if by_relevance:
+            # Sin puntuación: los más recientes primero
+            query = query.order_by(Product.id.desc())
+        return query
+
+
+class FulltextSearchBackend(ProductSearchBackend):
+    """
+    Búsqueda con el índice FULLTEXT de MySQL (migración 0004).
+    
+    Cada palabra es obligatoria y admite prefijo (`+lap*` encuentra
+    "laptop"), igual que el backend en memoria. La relevancia la
+    calcula InnoDB con MATCH ... AGAINST.
+    """
+    
+    name = "fulltext"
+    
+    # innodb_ft_min_token_size: InnoDB no indexa palabras más cortas
+    MIN_TOKEN_SIZE = 3
+    
+    def __init__(self):
+        self._fallback = LikeSearchBackend()
+    
+    def apply(self, query: Select, search: str, by_relevance: bool = False) -> Select:
+        terms = [term for term in tokenize(search) if len(term) >= self.MIN_TOKEN_SIZE]
+        if not terms:
+            return self._fallback.apply(query, search, by_relevance)
+        
+        relevance = match(
+            Product.name,
+            Product.description,
+            against=" ".join(f"+{term}*" for term in terms)
+        ).in_boolean_mode()
+        
+        query = query.where(relevance)
+        if by_relevance:
+            query = query.order_by(relevance.desc(), Product.id.desc())
+        return query
+
+
+class InvertedIndexSearchBackend(ProductSearchBackend):
+    """
+    Índice invertido en memoria del proceso.
+    
+    - palabra → {id de producto: peso}; las palabras del nombre pesan más
+    - Vocabulario ordenado para buscar por prefijo con bisect
+    - Relevancia tipo tf-idf: las palabras raras puntúan más
+    
+    Pensado para SQLite, desarrollo y pruebas. Cada worker tiene su
+    índice: se actualiza en cada escritura local y se sincroniza
+    periódicamente con las de otros workers (PRODUCT_SEARCH_SYNC_INTERVAL_SECONDS).
+    """
+    
+    name = "memory"
+    
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._documents: Dict[int, Set[str]] = {}
+        self._vocabulary: List[str] = []
+        self._lock = threading.Lock()
+        self._last_sync: Optional[datetime] = None
+        
+        # Métricas
+        self.searches = 0
+    
+    def _remove(self, product_id: int) -> None:
+        """Quita un producto de las listas de postings (llamar con el lock tomado)"""
+        for token in self._documents.pop(product_id, ()):
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            posting.pop(product_id, None)
+            if not posting:
+                del self._postings[token]
+                index = bisect_left(self._vocabulary, token)
+                if index < len(self._vocabulary) and self._vocabulary[index] == token:
+                    del self._vocabulary[index]
+    
+    def _index(self, product_id: int, name: Optional[str], description: Optional[str]) -> None:
+        """Indexa un producto (llamar con el lock tomado)"""
+        self._remove(product_id)
+        
+        weights: Dict[str, int] = {}
+        for token in tokenize(name):
+            weights[token] = weights.get(token, 0) + NAME_WEIGHT
+        for token in tokenize(description):
+            weights[token] = weights.get(token, 0) + 1
+        
+        for token, weight in weights.items():
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = {}
+                insort(self._vocabulary, token)
+            posting[product_id] = weight
+        self._documents[product_id] = set(weights)
+    
+    def index(self, product: Product) -> None:
+        with self._lock:
+            self._index(product.id, product.name, product.description)
+    
+    def remove(self, product_id: int) -> None:
+        with self._lock:
+            self._remove(product_id)
+    
+    def _expand(self, term: str) -> List[str]:
+        """Palabras del vocabulario que empiezan por `term` (llamar con el lock tomado)"""
+        start = bisect_left(self._vocabulary, term)
+        tokens = []
+        for token in self._vocabulary[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not token.startswith(term):
+                break
+            tokens.append(token)
+        return tokens
+    
+    def search(self, search: str) -> Dict[int, float]:
+        """
+        Busca productos que contengan todas las palabras (por prefijo).
+        
+        Returns:
+            {id de producto: puntuación}
+        """
+        terms = tokenize(search)
+        if not terms:
+            return {}
+        
+        self.searches += 1
+        
+        with self._lock:
+            total_documents = max(len(self._documents), 1)
+            scores: Optional[Dict[int, float]] = None
+            
+            for term in terms:
+                term_scores: Dict[int, float] = {}
+                for token in self._expand(term):
+                    posting = self._postings[token]
+                    idf = math.log(1 + total_documents / len(posting))
+                    for product_id, weight in posting.items():
+                        term_scores[product_id] = max(term_scores.get(product_id, 0.0), weight * idf)
+                
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {
+                        product_id: score + term_scores[product_id]
+                        for product_id, score in scores.items()
+                        if product_id in term_scores
+                    }
+                
+                if not scores:
+                    return {}
+            
+            return scores or {}
+    
+    def apply(self, query: Select, search: str, by_relevance: bool = False) -> Select:
+        scores = self.search(search)
+        if not scores:
+            return query.where(false())
+        
+        query = query.where(Product.id.in_(scores))
+        if by_relevance:
+            ranking = sorted(scores, key=lambda product_id: (-scores[product_id], -product_id))
+            query = query.order_by(
+                case({product_id: rank for rank, product_id in enumerate(ranking)}, value=Product.id),
+                Product.id.desc()
+            )
+        return query
+    
+    async def load(self, db: AsyncSession) -> None:
+        now = datetime.utcnow()
+        result = await db.execute(select(Product.id, Product.name, Product.description))
+        
+        with self._lock:
+            self._postings.clear()
+            self._documents.clear()
+            self._vocabulary.clear()
+            for product_id, name, description in result.all():
+                self._index(product_id, name, description)
+            self._last_sync = now
+    
+    async def sync(self, db: AsyncSession) -> int:
+        if self._last_sync is None:
+            await self.load(db)
+            return len(self._documents)
+        
+        now = datetime.utcnow()
+        result = await db.execute(
+            select(Product.id, Product.name, Product.description)
+            .where(Product.updated_at >= self._last_sync - SYNC_MARGIN)
+        )
+        
+        updated = 0
+        with self._lock:
+            for product_id, name, description in result.all():
+                self._index(product_id, name, description)
+                updated += 1
+            self._last_sync = now
+        
+        return updated
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "documents": len(self._documents),
+                "tokens": len(self._vocabulary),
+                "searches": self.searches
+            }
+
+
+def create_search_backend(backend: str, database_url: str) -> ProductSearchBackend:
+    """
+    Crea el backend de búsqueda indicado en la configuración.
+    
+    Args:
+        backend: "auto", "fulltext", "memory" o "like"
+        database_url: URL de la base de datos (para "auto")
+    
+    Returns:
+        Instancia del backend
+    """
+    if backend == "auto":
+        backend = "fulltext" if database_url.startswith("mysql") else "memory"
+    
+    if backend == "fulltext":
+        return FulltextSearchBackend()
+    if backend == "memory":
+        return InvertedIndexSearchBackend()
+    if backend == "like":
+        return LikeSearchBackend()
+    raise ValueError(f"PRODUCT_SEARCH_BACKEND desconocido: {backend}")
+
+
+# Instancia global (ver PRODUCT_SEARCH_* en la configuración)
+product_search = create_search_backend(settings.PRODUCT_SEARCH_BACKEND, settings.DATABASE_URL)
@@ -0,0 +1,374 @@
+"""
+Servicio de productos.
+Construcción de las consultas del listado de productos, paginación por cursor y facetas.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional
+from fastapi import HTTPException, status
+from sqlalchemy import Select, and_, case, func, literal, or_, select, union_all
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.product import Product
+from app.services.product_search import RELEVANCE, product_search
+from app.utils.count_cache import count_cache, estimated_row_count_query
+
+# Columnas por las que se puede ordenar el listado
+SORT_COLUMNS = {
+    "name": Product.name,
+    "price": Product.price,
+    "created_at": Product.created_at,
+}
+
+
+class ProductService:
+    """
+    Servicio de productos.
+    
+    Centraliza la forma de las consultas del listado para que la ruta,
+    los índices (migración 0003) y `python -m app.cli explain-products`
+    trabajen siempre sobre la misma sentencia.
+    """
+    
+    @staticmethod
+    def apply_filters(
+        query: Select,
+        search: Optional[str] = None,
+        category: Optional[str] = None,
+        brand: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        in_stock: Optional[bool] = None,
+        is_active: Optional[bool] = True,
+        by_relevance: bool = False
+    ) -> Select:
+        """
+        Añade a una consulta sobre productos los filtros del listado.
+        
+        Args:
+            query: Consulta sobre la tabla de productos
+            by_relevance: Ordenar por relevancia de la búsqueda
+            (resto: ver build_list_query)
+        
+        Returns:
+            Consulta filtrada
+        """
+        # Filtro de estado activo
+        if is_active is not None:
+            query = query.where(Product.is_active == is_active)
+        
+        # Filtro por categoría
+        if category:
+            query = query.where(Product.category == category)
+        
+        # Filtro por marca
+        if brand:
+            query = query.where(Product.brand == brand)
+        
+        # Búsqueda por texto (índice FULLTEXT o invertido, ver PRODUCT_SEARCH_BACKEND)
+        if search:
+            query = product_search.apply(query, search, by_relevance=by_relevance)
+        
+        # Filtro por rango de precio
+        if min_price is not None:
+            query = query.where(Product.price >= min_price)
+        
+        if max_price is not None:
+            query = query.where(Product.price <= max_price)
+        
+        # Filtro por stock
+        if in_stock:
+            query = query.where(Product.stock > 0)
+        
+        return query
+    
+    @staticmethod
+    def build_list_query(
+        search: Optional[str] = None,
+        category: Optional[str] = None,
+        brand: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        in_stock: Optional[bool] = None,
+        is_active: Optional[bool] = True,
+        sort_by: Optional[str] = "created_at",
+        order: Optional[str] = "desc"
+    ) -> Select:
+        """
+        Construye el SELECT del listado de productos (sin paginar).
+        
+        Los filtros de igualdad (is_active, category, brand) van primero y
+        el orden usa una sola columna, de modo que coincide con los índices
+        compuestos (is_active, [category | brand], columna de orden).
+        
+        Args:
+            search: Texto a buscar en nombre y descripción
+            category: Filtrar por categoría
+            brand: Filtrar por marca
+            min_price: Precio mínimo
+            max_price: Precio máximo
+            in_stock: Solo productos con stock
+            is_active: Filtrar por estado activo (None = todos)
+            sort_by: Campo para ordenar (name, price, created_at, relevance)
+            order: Orden (asc/desc; la relevancia siempre es descendente)
+        
+        Returns:
+            Sentencia SELECT lista para paginar
+        """
+        query = ProductService.apply_filters(
+            select(Product),
+            search=search,
+            category=category,
+            brand=brand,
+            min_price=min_price,
+            max_price=max_price,
+            in_stock=in_stock,
+            is_active=is_active,
+            by_relevance=sort_by == RELEVANCE
+        )
+        
+        # Con búsqueda, el backend ya ordenó por relevancia
+        if search and sort_by == RELEVANCE:
+            return query
+        
+        # Ordenamiento (por defecto: created_at)
+        # El id desempata filas con el mismo valor: el orden es total y estable
+        column = SORT_COLUMNS.get(sort_by, Product.created_at)
+        if order == "desc":
+            return query.order_by(column.desc(), Product.id.desc())
+        return query.order_by(column.asc(), Product.id.asc())
+    
+    @staticmethod
+    def _sort_key(sort_by: Optional[str]) -> str:
+        """Normaliza el campo de orden (los valores desconocidos ordenan por created_at)"""
+        return sort_by if sort_by in SORT_COLUMNS or sort_by == RELEVANCE else "created_at"
+    
+    @staticmethod
+    def encode_cursor(product: Product, sort_by: Optional[str], order: Optional[str], offset: int = 0) -> str:
+        """
+        Genera el cursor opaco que apunta justo después de un producto.
+        
+        Contiene el valor de la columna de orden y el id (desempate),
+        junto con el orden para el que es válido. La relevancia no es una
+        columna: en ese caso el cursor guarda la posición (`offset`).
+        
+        Args:
+            product: Último producto de la página
+            sort_by: Campo de orden del listado
+            order: Orden (asc/desc)
+            offset: Posición siguiente a `product` (solo para relevancia)
+        
+        Returns:
+            Cursor en base64 url-safe
+        """
+        sort_key = ProductService._sort_key(sort_by)
+        if sort_key == RELEVANCE:
+            data = {"s": sort_key, "o": "desc", "off": offset}
+        else:
+            value = getattr(product, sort_key)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            data = {"s": sort_key, "o": "desc" if order == "desc" else "asc", "v": value, "id": product.id}
+        
+        raw = json.dumps(data, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+    
+    @staticmethod
+    def apply_cursor(query: Select, cursor: str, sort_by: Optional[str], order: Optional[str]) -> tuple[Select, int]:
+        """
+        Añade a la consulta la condición para continuar después del cursor.
+        
+        Es una condición sobre (columna de orden, id) que el índice compuesto
+        resuelve con un rango: cada página cuesta lo mismo que la primera.
+        
+        Args:
+            query: Consulta construida con build_list_query
+            cursor: Cursor recibido en la petición
+            sort_by: Campo de orden del listado
+            order: Orden (asc/desc)
+        
+        Returns:
+            Tupla (consulta filtrada, posición de la página: solo con relevancia, si no 0)
+        
+        Raises:
+            HTTPException: Si el cursor es inválido o de otro orden
+        """
+        sort_key = ProductService._sort_key(sort_by)
+        direction = "desc" if order == "desc" or sort_key == RELEVANCE else "asc"
+        
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            if sort_key == RELEVANCE:
+                value, last_id = max(int(data["off"]), 0), None
+            else:
+                value, last_id = data["v"], int(data["id"])
+                if sort_key == "created_at":
+                    value = datetime.fromisoformat(value)
+            valid = data["s"] == sort_key and data["o"] == direction
+        except (ValueError, TypeError, KeyError):
+            valid = False
+        
+        if not valid:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor inválido o no corresponde al orden solicitado"
+            )
+        
+        # Relevancia: el resultado de una búsqueda es acotado, basta con offset
+        if sort_key == RELEVANCE:
+            return query.offset(value), value
+        
+        column = SORT_COLUMNS[sort_key]
+        if direction == "desc":
+            return query.where(or_(column < value, and_(column == value, Product.id < last_id))), 0
+        return query.where(or_(column > value, and_(column == value, Product.id > last_id))), 0
+    
+    @staticmethod
+    def next_cursor(
+        products: List[Product],
+        limit: int,
+        sort_by: Optional[str],
+        order: Optional[str],
+        offset: int = 0
+    ) -> Optional[str]:
+        """
+        Calcula el cursor de la página siguiente.
+        
+        Se piden `limit + 1` filas: si llega la fila extra hay más páginas,
+        y se descarta de `products`.
+        
+        Args:
+            offset: Posición de la página actual (solo para relevancia)
+        
+        Returns:
+            Cursor de la página siguiente o None si es la última
+        """
+        if len(products) <= limit:
+            return None
+        
+        del products[limit:]
+        return ProductService.encode_cursor(products[-1], sort_by, order, offset=offset + limit)
+    
+    @staticmethod
+    def count_products(db: Session, query: Select, signature: str, unfiltered: bool) -> tuple[int, bool]:
+        """
+        Total del listado, evitando el COUNT(*) siempre que se pueda.
+        
+        1. Total cacheado para la misma firma de filtros
+        2. Listados sin filtros en tablas grandes: estimación del motor
+        3. COUNT(*) exacto, que queda cacheado hasta la próxima escritura
+        
+        Args:
+            db: Sesión de base de datos
+            query: Consulta construida con build_list_query
+            signature: Firma de los filtros (ver filter_signature)
+            unfiltered: True si solo se filtra por estado activo
+        
+        Returns:
+            Tupla (total, True si es una estimación)
+        """
+        total = count_cache.get("products", signature)
+        if total is not None:
+            return total, False
+        
+        if unfiltered and count_cache.estimate_min_rows > 0:
+            estimate_query = estimated_row_count_query(db.bind.dialect.name, Product.__tablename__)
+            if estimate_query is not None:
+                estimate = count_cache.accept_estimate(db.scalar(estimate_query))
+                if estimate is not None:
+                    return estimate, True
+        
+        total = db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+        count_cache.set("products", signature, total)
+        return total, False
+    
+    @staticmethod
+    def build_facets_query(
+        search: Optional[str] = None,
+        category: Optional[str] = None,
+        brand: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        in_stock: Optional[bool] = None,
+        is_active: Optional[bool] = True
+    ) -> Select:
+        """
+        Construye la consulta de facetas: una sola sentencia UNION ALL con
+        los conteos por categoría, por marca y por tramo de precio.
+        
+        Cada faceta ignora su propio filtro (con `category=X` se siguen
+        contando las demás categorías), así el cliente puede mostrar las
+        alternativas; el resto de filtros se aplican igual que en el listado.
+        
+        Returns:
+            Sentencia con columnas (facet, value, count)
+        """
+        filters = dict(
+            search=search,
+            category=category,
+            brand=brand,
+            min_price=min_price,
+            max_price=max_price,
+            in_stock=in_stock,
+            is_active=is_active
+        )
+        
+        def facet(name: str, value, **ignored):
+            query = select(
+                literal(name).label("facet"),
+                value.label("value"),
+                func.count().label("count")
+            ).select_from(Product)
+            query = ProductService.apply_filters(query, **{**filters, **ignored})
+            return query.where(value.isnot(None)).group_by(value)
+        
+        # Tramo de precio como texto ("0", "1", ...) para compartir columna con las demás facetas
+        limits = settings.price_buckets_list
+        price_bucket = case(
+            *[(Product.price < limit, str(index)) for index, limit in enumerate(limits)],
+            else_=str(len(limits))
+        )
+        
+        return union_all(
+            facet("category", Product.category, category=None),
+            facet("brand", Product.brand, brand=None),
+            facet("price", price_bucket, min_price=None, max_price=None)
+        )
+    
+    @staticmethod
+    def get_facets(db: Session, **filters) -> dict:
+        """
+        Calcula las facetas del listado con una única consulta.
+        
+        Args:
+            db: Sesión de base de datos
+            **filters: Filtros del listado (ver build_facets_query)
+        
+        Returns:
+            Diccionario con categories, brands (valor y cantidad, de más a
+            menos productos) y price (tramos de precio, todos, en orden)
+        """
+        rows = db.execute(ProductService.build_facets_query(**filters)).all()
+        
+        values = {"category": [], "brand": []}
+        bucket_counts = {}
+        for facet, value, count in rows:
+            if facet == "price":
+                bucket_counts[int(value)] = count
+            else:
+                values[facet].append({"value": value, "count": count})
+        
+        max_values = settings.PRODUCT_FACET_MAX_VALUES
+        for facet_values in values.values():
+            facet_values.sort(key=lambda item: (-item["count"], item["value"]))
+            del facet_values[max_values:]
+        
+        limits = settings.price_buckets_list
+        bounds = [None, *limits, None]
+        price = [
+            {"min_price": bounds[index] or 0.0, "max_price": bounds[index + 1], "count": bucket_counts.get(index, 0)}
+            for index in range(len(limits) + 1)
+        ]
+        
+        return {"categories": values["category"], "brands": values["brand"], "price": price}
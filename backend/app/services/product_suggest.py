@@ -0,0 +1,306 @@
+"""
+Sugerencias de búsqueda de productos (typeahead).
+Índice de prefijos en memoria sobre nombres, marcas y categorías de productos activos.
+"""
+import asyncio
+import threading
+import time
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.product import Product
+from app.services.product_search import SYNC_MARGIN, tokenize
+
+# Orden de los tipos de sugerencia cuando empatan
+KIND_PRIORITY = {"category": 0, "brand": 1, "product": 2}
+
+# Máximo de claves que se examinan por consulta en cada grupo (acota el tiempo de respuesta)
+# Las marcas y categorías son pocas; los productos pueden ser cientos de miles
+MAX_SCAN = {"terms": 200, "products": 50}
+
+
+@dataclass
+class Suggestion:
+    """Texto sugerido: un producto, una marca o una categoría"""
+    text: str
+    kind: str
+    product_id: Optional[int] = None
+    count: int = 1
+
+
+class ProductSuggestIndex:
+    """
+    Índice de prefijos para autocompletar.
+    
+    - Arrays ordenados de claves normalizadas (minúsculas, sin tildes) y
+      búsqueda con bisect: cada consulta es O(log n + resultados)
+    - Marcas y categorías van en un array aparte, así los productos
+      nunca las dejan fuera de la ventana de búsqueda
+    - Cada texto se indexa también desde cada palabra ("laptop dell xps",
+      "dell xps", "xps"), así "xps" sugiere "Laptop Dell XPS"
+    - Marcas y categorías llevan la cuenta de productos activos que las usan
+      y desaparecen cuando llega a cero
+    - Solo productos activos: desactivar un producto lo quita del índice
+    """
+    
+    def __init__(self):
+        self._keys: Dict[str, List[Tuple[str, str]]] = {"terms": [], "products": []}
+        self._entries: Dict[str, Suggestion] = {}
+        self._products: Dict[int, Tuple[str, Optional[str], Optional[str]]] = {}
+        self._lock = threading.Lock()
+        self._last_sync: Optional[datetime] = None
+        
+        # Reconstrucción en segundo plano
+        self.ready = False
+        self._building = False
+        self._pending: List[Tuple[int, Optional[tuple]]] = []
+        
+        # Métricas
+        self.queries = 0
+        self._total_seconds = 0.0
+        self._max_seconds = 0.0
+    
+    @staticmethod
+    def _group(kind: str) -> str:
+        """Array de claves donde se guarda cada tipo de sugerencia"""
+        return "products" if kind == "product" else "terms"
+    
+    @staticmethod
+    def _keys_for(text: str) -> List[str]:
+        """Claves de un texto: el texto completo y el resto desde cada palabra"""
+        words = tokenize(text)
+        return [" ".join(words[i:]) for i in range(len(words))]
+    
+    def _add_entry(self, entry_id: str, text: str, kind: str, product_id: Optional[int] = None) -> None:
+        """Suma una referencia a una sugerencia (llamar con el lock tomado)"""
+        entry = self._entries.get(entry_id)
+        if entry is not None:
+            entry.count += 1
+            return
+        
+        self._entries[entry_id] = Suggestion(text=text, kind=kind, product_id=product_id)
+        keys = self._keys[self._group(kind)]
+        for key in self._keys_for(text):
+            insort(keys, (key, entry_id))
+    
+    def _remove_entry(self, entry_id: str) -> None:
+        """Resta una referencia y elimina la sugerencia al llegar a cero (llamar con el lock tomado)"""
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            return
+        
+        entry.count -= 1
+        if entry.count > 0:
+            return
+        
+        del self._entries[entry_id]
+        keys = self._keys[self._group(entry.kind)]
+        for key in self._keys_for(entry.text):
+            index = bisect_left(keys, (key, entry_id))
+            if index < len(keys) and keys[index] == (key, entry_id):
+                del keys[index]
+    
+    def _apply(self, product_id: int, snapshot: Optional[tuple]) -> None:
+        """
+        Deja el índice con el estado actual de un producto (llamar con el lock tomado).
+        
+        Args:
+            product_id: ID del producto
+            snapshot: (nombre, marca, categoría) o None si está inactivo
+        """
+        previous = self._products.pop(product_id, None)
+        if previous == snapshot:
+            if snapshot is not None:
+                self._products[product_id] = snapshot
+            return
+        
+        if previous is not None:
+            name, brand, category = previous
+            self._remove_entry(f"product:{product_id}")
+            if brand:
+                self._remove_entry(f"brand:{' '.join(tokenize(brand))}")
+            if category:
+                self._remove_entry(f"category:{' '.join(tokenize(category))}")
+        
+        if snapshot is not None:
+            name, brand, category = snapshot
+            self._add_entry(f"product:{product_id}", name, "product", product_id)
+            if brand:
+                self._add_entry(f"brand:{' '.join(tokenize(brand))}", brand, "brand")
+            if category:
+                self._add_entry(f"category:{' '.join(tokenize(category))}", category, "category")
+            self._products[product_id] = snapshot
+    
+    @staticmethod
+    def _snapshot(is_active: bool, name: str, brand: Optional[str], category: Optional[str]) -> Optional[tuple]:
+        """Estado indexable de un producto (None si no debe aparecer)"""
+        return (name, brand, category) if is_active else None
+    
+    def update(self, product: Product) -> None:
+        """Actualiza un producto tras crearlo, modificarlo o desactivarlo"""
+        snapshot = self._snapshot(product.is_active, product.name, product.brand, product.category)
+        
+        with self._lock:
+            self._apply(product.id, snapshot)
+            if self._building:
+                # Se reaplica sobre el índice nuevo cuando termine la reconstrucción
+                self._pending.append((product.id, snapshot))
+    
+    def suggest(self, query: str, limit: int = 8) -> List[Suggestion]:
+        """
+        Sugerencias que empiezan por `query` (o por una de sus palabras).
+        
+        Orden: coincidencia exacta, categorías y marcas con más productos,
+        y después los textos más cortos. Los nombres repetidos se agrupan.
+        
+        Args:
+            query: Texto escrito por el usuario
+            limit: Máximo de sugerencias
+        
+        Returns:
+            Lista de sugerencias
+        """
+        start = time.perf_counter()
+        prefix = " ".join(tokenize(query))
+        if query[-1:].isspace() and prefix:
+            prefix += " "
+        
+        matches: Dict[str, Tuple[bool, Suggestion]] = {}
+        if prefix:
+            with self._lock:
+                for group, keys in self._keys.items():
+                    index = bisect_left(keys, (prefix,))
+                    for key, entry_id in keys[index:index + MAX_SCAN[group]]:
+                        if not key.startswith(prefix):
+                            break
+                        exact = key == prefix
+                        if entry_id not in matches or exact:
+                            matches[entry_id] = (exact, self._entries[entry_id])
+        
+        ranked = sorted(
+            matches.values(),
+            key=lambda match: (
+                not match[0],
+                KIND_PRIORITY[match[1].kind],
+                -match[1].count,
+                len(match[1].text),
+                match[1].text
+            )
+        )
+        
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.queries += 1
+            self._total_seconds += elapsed
+            self._max_seconds = max(self._max_seconds, elapsed)
+        
+        # Productos con el mismo nombre solo se sugieren una vez
+        suggestions, seen = [], set()
+        for _, suggestion in ranked:
+            text_key = (suggestion.kind, suggestion.text.lower())
+            if text_key in seen:
+                continue
+            seen.add(text_key)
+            suggestions.append(suggestion)
+            if len(suggestions) == limit:
+                break
+        
+        return suggestions
+    
+    async def rebuild(self, db: AsyncSession) -> None:
+        """
+        Reconstruye el índice completo sin bloquear las consultas.
+        
+        Se construye un índice nuevo aparte y se sustituye al terminar;
+        los cambios hechos mientras tanto se reaplican encima.
+        """
+        with self._lock:
+            self._building = True
+            self._pending = []
+        
+        try:
+            now = datetime.utcnow()
+            result = await db.execute(
+                select(Product.id, Product.name, Product.brand, Product.category)
+                .where(Product.is_active == True)
+            )
+            rows = result.all()
+            
+            fresh = ProductSuggestIndex()
+            # Insertar en bloque y ordenar una vez es mucho más rápido que insort
+            for position, (product_id, name, brand, category) in enumerate(rows, 1):
+                fresh._products[product_id] = (name, brand, category)
+                for entry_id, text, kind, pid in (
+                    (f"product:{product_id}", name, "product", product_id),
+                    (f"brand:{' '.join(tokenize(brand))}", brand, "brand", None),
+                    (f"category:{' '.join(tokenize(category))}", category, "category", None),
+                ):
+                    if not text:
+                        continue
+                    entry = fresh._entries.get(entry_id)
+                    if entry is not None:
+                        entry.count += 1
+                        continue
+                    fresh._entries[entry_id] = Suggestion(text=text, kind=kind, product_id=pid)
+                    fresh._keys[self._group(kind)].extend((key, entry_id) for key in self._keys_for(text))
+                # Ceder el event loop en catálogos grandes
+                if position % 1000 == 0:
+                    await asyncio.sleep(0)
+            for keys in fresh._keys.values():
+                keys.sort()
+            
+            with self._lock:
+                self._keys, self._entries, self._products = fresh._keys, fresh._entries, fresh._products
+                for product_id, snapshot in self._pending:
+                    self._apply(product_id, snapshot)
+                self._last_sync = now
+                self.ready = True
+        finally:
+            with self._lock:
+                self._building = False
+                self._pending = []
+    
+    async def sync(self, db: AsyncSession) -> int:
+        """
+        Incorpora los productos modificados por otros workers.
+        
+        Returns:
+            Número de productos revisados
+        """
+        if self._last_sync is None:
+            return 0
+        
+        now = datetime.utcnow()
+        result = await db.execute(
+            select(Product.id, Product.is_active, Product.name, Product.brand, Product.category)
+            .where(Product.updated_at >= self._last_sync - SYNC_MARGIN)
+        )
+        
+        updated = 0
+        with self._lock:
+            for product_id, is_active, name, brand, category in result.all():
+                self._apply(product_id, self._snapshot(is_active, name, brand, category))
+                updated += 1
+            self._last_sync = now
+        
+        return updated
+    
+    def stats(self) -> dict:
+        """Retorna tamaño del índice y latencia de las consultas (en microsegundos)"""
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "products": len(self._products),
+                "suggestions": len(self._entries),
+                "keys": sum(len(keys) for keys in self._keys.values()),
+                "queries": self.queries,
+                "avg_us": round(self._total_seconds / self.queries * 1e6, 1) if self.queries else 0.0,
+                "max_us": round(self._max_seconds * 1e6, 1)
+            }
+
+
+# Instancia global
+product_suggest = ProductSuggestIndex()
@@ -0,0 +1,190 @@
+"""
+Lista de revocación de access tokens.
+Persistida en la tabla revoked_tokens y consultada en memoria con un filtro de Bloom.
+"""
+import threading
+import time
+from calendar import timegm
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models.revoked_token import RevokedToken
+from app.utils.bloom import BloomFilter
+
+# Margen al sincronizar con otros workers (absorbe diferencias de reloj)
+SYNC_MARGIN = timedelta(seconds=5)
+
+
+class RevocationList:
+    """
+    Denylist de `jti` con dos niveles en memoria.
+    
+    - Filtro de Bloom: descarta en nanosegundos los tokens no revocados
+      (la inmensa mayoría) sin tocar la base de datos
+    - Conjunto exacto {jti: exp}: confirma los positivos del filtro
+    
+    Las entradas expiran solas en el `exp` del token. La tabla
+    revoked_tokens es la fuente de verdad y permite que otros workers
+    se sincronicen periódicamente.
+    """
+    
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._exact: Dict[str, float] = {}
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._lock = threading.Lock()
+        self._last_sync: Optional[datetime] = None
+        
+        # Métricas
+        self.checks = 0
+        self.bloom_positives = 0
+        self.revoked_hits = 0
+    
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        """
+        Indica si un `jti` está revocado.
+        
+        Args:
+            jti: Claim `jti` del token (None = token sin jti, no revocable)
+        
+        Returns:
+            True si el token fue revocado y aún no ha expirado
+        """
+        self.checks += 1
+        
+        if jti is None or jti not in self._bloom:
+            return False
+        
+        # Posible positivo: confirmar con el conjunto exacto
+        self.bloom_positives += 1
+        exp = self._exact.get(jti)
+        if exp is not None and exp > time.time():
+            self.revoked_hits += 1
+            return True
+        return False
+    
+    def _add(self, jti: str, exp: float) -> None:
+        """Añade un jti en memoria (llamar con el lock tomado)"""
+        if jti in self._exact:
+            return
+        self._exact[jti] = exp
+        
+        if len(self._exact) > self._bloom.capacity:
+            # El filtro se quedó pequeño: reconstruirlo con el doble de capacidad
+            self._rebuild(self._bloom.capacity * 2)
+        else:
+            self._bloom.add(jti)
+    
+    def _rebuild(self, capacity: int) -> None:
+        """Reconstruye el filtro con las entradas vigentes (llamar con el lock tomado)"""
+        now = time.time()
+        self._exact = {jti: exp for jti, exp in self._exact.items() if exp > now}
+        self._bloom = BloomFilter(max(capacity, self.capacity), self.error_rate)
+        for jti in self._exact:
+            self._bloom.add(jti)
+    
+    async def revoke(self, db: AsyncSession, jti: str, exp: float) -> None:
+        """
+        Revoca un access token hasta su expiración.
+        
+        Args:
+            db: Sesión de base de datos
+            jti: Claim `jti` del token
+            exp: Claim `exp` del token (timestamp)
+        """
+        if exp <= time.time():
+            return
+        
+        if await db.get(RevokedToken, jti) is None:
+            db.add(RevokedToken(
+                jti=jti,
+                expires_at=datetime.utcfromtimestamp(exp),
+                revoked_at=datetime.utcnow()
+            ))
+            await db.commit()
+        
+        with self._lock:
+            self._add(jti, exp)
+    
+    async def load(self, db: AsyncSession) -> None:
+        """Carga todas las revocaciones vigentes (al iniciar la aplicación)"""
+        now = datetime.utcnow()
+        result = await db.execute(
+            select(RevokedToken.jti, RevokedToken.expires_at)
+            .where(RevokedToken.expires_at > now)
+        )
+        
+        with self._lock:
+            self._exact = {jti: timegm(expires_at.utctimetuple()) for jti, expires_at in result.all()}
+            self._rebuild(len(self._exact) * 2)
+            self._last_sync = now
+    
+    async def sync(self, db: AsyncSession) -> int:
+        """
+        Incorpora las revocaciones hechas por otros workers
+        y descarta de memoria las ya expiradas.
+        
+        Returns:
+            Número de revocaciones nuevas incorporadas
+        """
+        if self._last_sync is None:
+            await self.load(db)
+            return len(self._exact)
+        
+        now = datetime.utcnow()
+        result = await db.execute(
+            select(RevokedToken.jti, RevokedToken.expires_at)
+            .where(
+                RevokedToken.revoked_at >= self._last_sync - SYNC_MARGIN,
+                RevokedToken.expires_at > now
+            )
+        )
+        
+        added = 0
+        with self._lock:
+            for jti, expires_at in result.all():
+                if jti not in self._exact:
+                    self._add(jti, timegm(expires_at.utctimetuple()))
+                    added += 1
+            
+            # Los filtros de Bloom no admiten borrados: se reconstruye
+            # cuando al menos la mitad de las entradas ya expiraron
+            expired = sum(1 for exp in self._exact.values() if exp <= time.time())
+            if expired and expired * 2 >= len(self._exact):
+                self._rebuild(self._bloom.capacity)
+            
+            self._last_sync = now
+        
+        return added
+    
+    async def purge_expired(self, db: AsyncSession) -> int:
+        """Elimina de la tabla las revocaciones de tokens ya expirados"""
+        result = await db.execute(
+            delete(RevokedToken)
+            .where(RevokedToken.expires_at <= datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return result.rowcount or 0
+    
+    def stats(self) -> dict:
+        """Retorna métricas del filtro y de las consultas"""
+        return {
+            "entries": len(self._exact),
+            "bloom_capacity": self._bloom.capacity,
+            "bloom_bits": self._bloom.num_bits,
+            "bloom_hashes": self._bloom.num_hashes,
+            "checks": self.checks,
+            "bloom_positives": self.bloom_positives,
+            "revoked_hits": self.revoked_hits
+        }
+
+
+# Instancia global (ver REVOCATION_* en la configuración)
+revocation_list = RevocationList(
+    capacity=settings.REVOCATION_BLOOM_CAPACITY,
+    error_rate=settings.REVOCATION_BLOOM_ERROR_RATE
+)
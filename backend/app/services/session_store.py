@@ -0,0 +1,282 @@
+"""
+Almacén de sesiones (refresh tokens).
+Implementación en base de datos y alternativa en memoria.
+"""
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Optional, Set
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models.session import UserSession
+
+
+class SessionStore(ABC):
+    """
+    Interfaz común de los almacenes de sesiones.
+    
+    Todas las operaciones reciben la sesión de base de datos de la petición;
+    las implementaciones que no la necesitan simplemente la ignoran.
+    """
+    
+    @abstractmethod
+    async def create(
+        self,
+        db: AsyncSession,
+        jti: str,
+        user_id: int,
+        token_hash: str,
+        expires_at: datetime,
+        user_agent: Optional[str] = None,
+        ip_address: Optional[str] = None
+    ) -> UserSession:
+        """Registra una sesión nueva"""
+    
+    @abstractmethod
+    async def get(self, db: AsyncSession, jti: str) -> Optional[UserSession]:
+        """Obtiene una sesión por su `jti`"""
+    
+    @abstractmethod
+    async def rotate(
+        self,
+        db: AsyncSession,
+        jti: str,
+        old_hash: str,
+        token_hash: str,
+        expires_at: datetime
+    ) -> bool:
+        """
+        Sustituye el refresh token de una sesión de forma atómica.
+        
+        Solo rota si el hash guardado sigue siendo `old_hash`: de dos
+        peticiones concurrentes con el mismo token, únicamente una gana.
+        
+        Returns:
+            True si se rotó, False si el token ya no era el vigente
+        """
+    
+    @abstractmethod
+    async def revoke(self, db: AsyncSession, jti: str) -> None:
+        """Elimina una sesión"""
+    
+    @abstractmethod
+    async def revoke_all(self, db: AsyncSession, user_id: int) -> int:
+        """Elimina todas las sesiones de un usuario y retorna cuántas había"""
+    
+    @abstractmethod
+    async def purge_expired(self, db: AsyncSession, batch_size: int = 1000) -> int:
+        """Elimina las sesiones expiradas por lotes y retorna cuántas se borraron"""
+
+
+class DatabaseSessionStore(SessionStore):
+    """
+    Sesiones guardadas en la tabla user_sessions.
+    Las búsquedas usan la clave primaria (`jti`).
+    """
+    
+    async def create(
+        self,
+        db: AsyncSession,
+        jti: str,
+        user_id: int,
+        token_hash: str,
+        expires_at: datetime,
+        user_agent: Optional[str] = None,
+        ip_address: Optional[str] = None
+    ) -> UserSession:
+        now = datetime.utcnow()
+        session = UserSession(
+            jti=jti,
+            user_id=user_id,
+            token_hash=token_hash,
+            expires_at=expires_at,
+            user_agent=user_agent,
+            ip_address=ip_address,
+            created_at=now,
+            last_used_at=now
+        )
+        db.add(session)
+        await db.commit()
+        return session
+    
+    async def get(self, db: AsyncSession, jti: str) -> Optional[UserSession]:
+        return await db.get(UserSession, jti)
+    
+    async def rotate(
+        self,
+        db: AsyncSession,
+        jti: str,
+        old_hash: str,
+        token_hash: str,
+        expires_at: datetime
+    ) -> bool:
+        # Comparar y sustituir en una sola sentencia (sin carrera entre workers)
+        result = await db.execute(
+            update(UserSession)
+            .where(UserSession.jti == jti, UserSession.token_hash == old_hash)
+            .values(
+                token_hash=token_hash,
+                expires_at=expires_at,
+                last_used_at=datetime.utcnow()
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return result.rowcount == 1
+    
+    async def revoke(self, db: AsyncSession, jti: str) -> None:
+        await db.execute(
+            delete(UserSession)
+            .where(UserSession.jti == jti)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+    
+    async def revoke_all(self, db: AsyncSession, user_id: int) -> int:
+        result = await db.execute(
+            delete(UserSession)
+            .where(UserSession.user_id == user_id)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return result.rowcount or 0
+    
+    async def purge_expired(self, db: AsyncSession, batch_size: int = 1000) -> int:
+        now = datetime.utcnow()
+        total = 0
+        
+        # Borrar por lotes para no bloquear la tabla con un DELETE enorme
+        while True:
+            result = await db.execute(
+                select(UserSession.jti)
+                .where(UserSession.expires_at < now)
+                .limit(batch_size)
+            )
+            expired = result.scalars().all()
+            
+            if not expired:
+                break
+            
+            await db.execute(
+                delete(UserSession)
+                .where(UserSession.jti.in_(expired))
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            total += len(expired)
+            
+            if len(expired) < batch_size:
+                break
+        
+        return total
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Sesiones guardadas en memoria del proceso.
+    
+    Útil para pruebas y desarrollo local. No se comparte entre workers
+    y se pierde al reiniciar la aplicación.
+    """
+    
+    def __init__(self):
+        self._sessions: Dict[str, UserSession] = {}
+        self._by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+    
+    async def create(
+        self,
+        db: AsyncSession,
+        jti: str,
+        user_id: int,
+        token_hash: str,
+        expires_at: datetime,
+        user_agent: Optional[str] = None,
+        ip_address: Optional[str] = None
+    ) -> UserSession:
+        now = datetime.utcnow()
+        session = UserSession(
+            jti=jti,
+            user_id=user_id,
+            token_hash=token_hash,
+            expires_at=expires_at,
+            user_agent=user_agent,
+            ip_address=ip_address,
+            created_at=now,
+            last_used_at=now
+        )
+        with self._lock:
+            self._sessions[jti] = session
+            self._by_user.setdefault(user_id, set()).add(jti)
+        return session
+    
+    async def get(self, db: AsyncSession, jti: str) -> Optional[UserSession]:
+        return self._sessions.get(jti)
+    
+    async def rotate(
+        self,
+        db: AsyncSession,
+        jti: str,
+        old_hash: str,
+        token_hash: str,
+        expires_at: datetime
+    ) -> bool:
+        with self._lock:
+            session = self._sessions.get(jti)
+            if session is None or session.token_hash != old_hash:
+                return False
+            session.token_hash = token_hash
+            session.expires_at = expires_at
+            session.last_used_at = datetime.utcnow()
+            return True
+    
+    def _remove(self, jti: str) -> None:
+        """Elimina una sesión de ambos índices (llamar con el lock tomado)"""
+        session = self._sessions.pop(jti, None)
+        if session is not None:
+            jtis = self._by_user.get(session.user_id)
+            if jtis is not None:
+                jtis.discard(jti)
+                if not jtis:
+                    del self._by_user[session.user_id]
+    
+    async def revoke(self, db: AsyncSession, jti: str) -> None:
+        with self._lock:
+            self._remove(jti)
+    
+    async def revoke_all(self, db: AsyncSession, user_id: int) -> int:
+        with self._lock:
+            jtis = list(self._by_user.get(user_id, ()))
+            for jti in jtis:
+                self._remove(jti)
+        return len(jtis)
+    
+    async def purge_expired(self, db: AsyncSession, batch_size: int = 1000) -> int:
+        now = datetime.utcnow()
+        with self._lock:
+            expired = [jti for jti, s in self._sessions.items() if s.expires_at < now]
+            for jti in expired:
+                self._remove(jti)
+        return len(expired)
+
+
+def create_session_store(backend: str) -> SessionStore:
+    """
+    Crea el almacén de sesiones indicado en la configuración.
+    
+    Args:
+        backend: "database" o "memory"
+    
+    Returns:
+        Instancia del almacén
+    """
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "database":
+        return DatabaseSessionStore()
+    raise ValueError(f"SESSION_STORE_BACKEND desconocido: {backend}")
+
+
+# Instancia global (ver SESSION_STORE_BACKEND en la configuración)
+session_store = create_session_store(settings.SESSION_STORE_BACKEND)
@@ -0,0 +1,248 @@
+"""
+Servicio de importación masiva de usuarios.
+Alta de miles de usuarios desde CSV o NDJSON sin pasar por /auth/register uno a uno.
+"""
+import csv
+import io
+import json
+from typing import Iterable, Optional
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException, status
+from app.config import settings
+from app.models.user import User
+from app.schemas.user import UserImportRow, UserImportResult, UserImportResponse
+from app.utils.password_pool import PasswordHasher, import_password_hasher
+from app.utils.identity_cache import unknown_identities
+from app.utils.count_cache import count_cache
+
+# Formatos admitidos: extensión o Content-Type -> formato
+FORMATS = {
+    "csv": "csv",
+    "text/csv": "csv",
+    "ndjson": "ndjson",
+    "jsonl": "ndjson",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+# Tamaño máximo de cada IN (...) al comprobar unicidad
+IN_CHUNK_SIZE = 1000
+
+
+class UserImportService:
+    """
+    Importación masiva de usuarios.
+    
+    - La unicidad de todo el lote se comprueba con consultas IN por conjuntos
+    - Las contraseñas se hashean en paralelo en un pool de procesos propio
+    - Los INSERT se envían con executemany por bloques; si un bloque choca
+      con usuarios creados mientras tanto, se reintenta fila a fila
+    - Cada fila recibe su propio resultado (created o error)
+    """
+    
+    @staticmethod
+    def detect_format(hint: Optional[str]) -> str:
+        """
+        Obtiene el formato a partir de un Content-Type, extensión o nombre.
+        
+        Raises:
+            HTTPException: Si el formato no es CSV ni NDJSON
+        """
+        value = (hint or "").split(";")[0].strip().lower()
+        fmt = FORMATS.get(value) or FORMATS.get(value.rsplit(".", 1)[-1])
+        
+        if fmt is None:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Formato no soportado: usa CSV (text/csv) o NDJSON (application/x-ndjson)"
+            )
+        return fmt
+    
+    @staticmethod
+    def parse(content: str, fmt: str) -> list[tuple[int, Optional[dict], Optional[str]]]:
+        """
+        Convierte el contenido en filas.
+        
+        Args:
+            content: Texto CSV (con cabecera) o NDJSON (un objeto por línea)
+            fmt: "csv" o "ndjson"
+        
+        Returns:
+            Lista de (número de fila, datos, error de formato)
+        
+        Raises:
+            HTTPException: Si hay más filas de las permitidas
+        """
+        rows: list[tuple[int, Optional[dict], Optional[str]]] = []
+        
+        if fmt == "csv":
+            reader = csv.DictReader(io.StringIO(content))
+            for number, record in enumerate(reader, start=1):
+                data = {key.strip(): value.strip() for key, value in record.items() if key and value}
+                rows.append((number, data, None))
+        else:
+            lines = [line for line in content.splitlines() if line.strip()]
+            for number, line in enumerate(lines, start=1):
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    rows.append((number, None, f"JSON inválido: {exc.msg}"))
+                    continue
+                if not isinstance(data, dict):
+                    rows.append((number, None, "Cada línea debe ser un objeto JSON"))
+                    continue
+                rows.append((number, data, None))
+        
+        if len(rows) > settings.BULK_IMPORT_MAX_ROWS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Máximo {settings.BULK_IMPORT_MAX_ROWS} filas por importación"
+            )
+        
+        return rows
+    
+    @staticmethod
+    async def _existing(db: AsyncSession, column, values: list[str]) -> set[str]:
+        """Retorna (en minúsculas) los valores que ya existen en la columna"""
+        existing: set[str] = set()
+        for i in range(0, len(values), IN_CHUNK_SIZE):
+            result = await db.execute(select(column).where(column.in_(values[i:i + IN_CHUNK_SIZE])))
+            existing.update(value.lower() for value in result.scalars().all())
+        return existing
+    
+    @staticmethod
+    async def import_users(
+        db: AsyncSession,
+        rows: Iterable[tuple[int, Optional[dict], Optional[str]]],
+        hasher: PasswordHasher = import_password_hasher
+    ) -> UserImportResponse:
+        """
+        Crea los usuarios válidos de un lote.
+        
+        Args:
+            db: Sesión de base de datos
+            rows: Filas obtenidas con parse
+            hasher: Pool de hash a usar (por defecto el de importaciones, separado
+                del de login; la CLI puede usar uno con más procesos)
+        
+        Returns:
+            Reporte con el resultado de cada fila
+        """
+        results: dict[int, UserImportResult] = {}
+        candidates: list[tuple[int, UserImportRow]] = []
+        seen_emails: set[str] = set()
+        seen_usernames: set[str] = set()
+        
+        def fail(number: int, error: str, item=None, data: Optional[dict] = None) -> None:
+            source = item.model_dump() if item is not None else (data or {})
+            results[number] = UserImportResult(
+                row=number,
+                status="error",
+                username=str(source["username"]) if source.get("username") is not None else None,
+                email=str(source["email"]) if source.get("email") is not None else None,
+                error=error
+            )
+        
+        # 1. Validar cada fila y detectar duplicados dentro del propio lote
+        for number, data, error in rows:
+            if error:
+                fail(number, error)
+                continue
+            
+            try:
+                item = UserImportRow.model_validate(data)
+            except ValidationError as exc:
+                fail(number, "; ".join(
+                    f"{'.'.join(str(loc) for loc in e['loc'])}: {e['msg']}" for e in exc.errors()
+                ), data=data)
+                continue
+            
+            email, username = item.email.lower(), item.username.lower()
+            if email in seen_emails:
+                fail(number, "Email duplicado en el lote", item)
+            elif username in seen_usernames:
+                fail(number, "Username duplicado en el lote", item)
+            else:
+                seen_emails.add(email)
+                seen_usernames.add(username)
+                candidates.append((number, item))
+        
+        # 2. Unicidad contra la base de datos (consultas IN por conjuntos)
+        existing_emails = await UserImportService._existing(
+            db, User.email, [item.email for _, item in candidates]
+        )
+        existing_usernames = await UserImportService._existing(
+            db, User.username, [item.username for _, item in candidates]
+        )
+        
+        to_create: list[tuple[int, UserImportRow]] = []
+        for number, item in candidates:
+            if item.email.lower() in existing_emails:
+                fail(number, "El email ya está registrado", item)
+            elif item.username.lower() in existing_usernames:
+                fail(number, "El username ya está en uso", item)
+            else:
+                to_create.append((number, item))
+        
+        # 3. Hash de contraseñas en paralelo
+        hashes = await hasher.hash_many([item.password for _, item in to_create])
+        
+        # 4. INSERT con executemany por bloques (una transacción por bloque)
+        chunk_size = settings.BULK_IMPORT_CHUNK_SIZE
+        for i in range(0, len(to_create), chunk_size):
+            chunk = to_create[i:i + chunk_size]
+            values = [
+                {
+                    "email": item.email,
+                    "username": item.username,
+                    "full_name": item.full_name,
+                    "hashed_password": hashed,
+                    "role": item.role,
+                    "is_active": True,
+                    "token_version": 0
+                }
+                for (_, item), hashed in zip(chunk, hashes[i:i + chunk_size])
+            ]
+            
+            try:
+                await db.execute(insert(User), values)
+                await db.commit()
+                inserted = chunk
+            except IntegrityError:
+                # Otro proceso creó alguno de estos usuarios mientras tanto:
+                # se reintenta fila a fila y solo fallan las que chocan
+                await db.rollback()
+                inserted = []
+                for (number, item), row_values in zip(chunk, values):
+                    try:
+                        await db.execute(insert(User), [row_values])
+                        await db.commit()
+                    except IntegrityError:
+                        await db.rollback()
+                        fail(number, "Conflicto al insertar: el email o username ya existe", item)
+                        continue
+                    inserted.append((number, item))
+            
+            for number, item in inserted:
+                results[number] = UserImportResult(
+                    row=number,
+                    status="created",
+                    username=item.username,
+                    email=item.email
+                )
+                unknown_identities.invalidate(item.username, item.email)
+        
+        ordered = [results[number] for number in sorted(results)]
+        created = sum(1 for result in ordered if result.status == "created")
+        if created:
+            count_cache.invalidate("users")
+        
+        return UserImportResponse(
+            total=len(ordered),
+            created=created,
+            failed=len(ordered) - created,
+            results=ordered
+        )
@@ -2,12 +2,19 @@
 Servicio de usuarios.
 Lógica de negocio para gestión de usuarios.
 """
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 from typing import List, Optional
 from app.models.user import User, UserRole
 from app.schemas.user import UserUpdate, UserUpdateRole
-from app.utils.security import get_password_hash, verify_password
+from app.services.session_store import session_store
+from app.utils.password_pool import password_hasher
+from app.utils.principal_cache import Principal, principal_cache
+from app.utils.token_versions import token_versions
+from app.utils.identity_cache import unknown_identities
+from app.utils.count_cache import count_cache, estimated_row_count_query, filter_signature
+from app.utils.permissions import Permission, ensure_permissions, has_permissions
 
 
 class UserService:
@@ -17,7 +24,7 @@ class UserService:
     """
     
     @staticmethod
-    def get_user_by_id(db: Session, user_id: int) -> User:
+    async def get_user_by_id(db: AsyncSession, user_id: int) -> User:
         """
         Obtiene un usuario por su ID.
         
@@ -31,7 +38,7 @@ class UserService:
         Raises:
             HTTPException: Si el usuario no existe
         """
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, user_id)
         
         if not user:
             raise HTTPException(
@@ -42,17 +49,21 @@ class UserService:
         return user
     
     @staticmethod
-    def get_users(
-        db: Session,
+    async def get_users(
+        db: AsyncSession,
         skip: int = 0,
         limit: int = 100,
         role: Optional[UserRole] = None,
         is_active: Optional[bool] = None,
-        search: Optional[str] = None
-    ) -> tuple[List[User], int]:
+        search: Optional[str] = None,
+        include_total: bool = True
+    ) -> tuple[List[User], Optional[int], bool]:
         """
         Obtiene lista de usuarios con paginación y filtros.
         
+        El total sale de la caché de totales (misma firma de filtros) o,
+        sin filtros y con muchos usuarios, de la estimación del motor.
+        
         Args:
             db: Sesión de base de datos
             skip: Número de registros a saltar
@@ -60,41 +71,60 @@ class UserService:
             role: Filtrar por rol
             is_active: Filtrar por estado activo
             search: Buscar por username, email o nombre
+            include_total: Calcular el total de registros
         
         Returns:
-            Tupla (lista de usuarios, total de registros)
+            Tupla (lista de usuarios, total o None, True si el total es estimado)
         """
-        query = db.query(User)
+        query = select(User)
         
         # Aplicar filtros
         if role is not None:
-            query = query.filter(User.role == role)
+            query = query.where(User.role == role)
         
         if is_active is not None:
-            query = query.filter(User.is_active == is_active)
+            query = query.where(User.is_active == is_active)
         
         if search:
             search_filter = f"%{search}%"
-            query = query.filter(
+            query = query.where(
                 (User.username.like(search_filter)) |
                 (User.email.like(search_filter)) |
                 (User.full_name.like(search_filter))
             )
         
-        # Contar total antes de paginar
-        total = query.count()
-        
         # Aplicar paginación
-        users = query.offset(skip).limit(limit).all()
-        
-        return users, total
+        result = await db.execute(query.order_by(User.id).offset(skip).limit(limit))
+        users = result.scalars().all()
+        
+        if not include_total:
+            return users, None, False
+        
+        signature = filter_signature(role=role, is_active=is_active, search=search)
+        total = count_cache.get("users", signature)
+        if total is not None:
+            return users, total, False
+        
+        # Sin filtros: en tablas grandes basta la estimación del motor
+        unfiltered = role is None and is_active is None and not search
+        if unfiltered and count_cache.estimate_min_rows > 0:
+            estimate_query = estimated_row_count_query(db.bind.dialect.name, User.__tablename__)
+            if estimate_query is not None:
+                estimate = count_cache.accept_estimate(await db.scalar(estimate_query))
+                if estimate is not None:
+                    return users, estimate, True
+        
+        total = await db.scalar(select(func.count()).select_from(query.subquery()))
+        count_cache.set("users", signature, total)
+        
+        return users, total, False
     
     @staticmethod
-    def update_user(
-        db: Session,
+    async def update_user(
+        db: AsyncSession,
         user_id: int,
         user_update: UserUpdate,
-        current_user: User
+        current_user: Principal
     ) -> User:
         """
         Actualiza un usuario.
@@ -112,10 +142,12 @@ class UserService:
             HTTPException: Si hay errores de validación o permisos
         """
         # Obtener usuario a actualizar
-        user = UserService.get_user_by_id(db, user_id)
+        user = await UserService.get_user_by_id(db, user_id)
+        
+        can_manage_users = has_permissions(current_user.role, Permission.USERS_UPDATE)
         
-        # Solo admins pueden actualizar otros usuarios
-        if current_user.id != user_id and current_user.role != UserRole.ADMIN:
+        # Solo quien tiene USERS_UPDATE puede actualizar otros usuarios
+        if current_user.id != user_id and not can_manage_users:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="No tienes permisos para actualizar este usuario"
@@ -126,8 +158,8 @@ class UserService:
         
         # Verificar unicidad de email si se actualiza
         if "email" in update_data and update_data["email"] != user.email:
-            existing = db.query(User).filter(User.email == update_data["email"]).first()
-            if existing:
+            result = await db.execute(select(User.id).where(User.email == update_data["email"]))
+            if result.first():
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="El email ya está en uso"
@@ -135,8 +167,8 @@ class UserService:
         
         # Verificar unicidad de username si se actualiza
         if "username" in update_data and update_data["username"] != user.username:
-            existing = db.query(User).filter(User.username == update_data["username"]).first()
-            if existing:
+            result = await db.execute(select(User.id).where(User.username == update_data["username"]))
+            if result.first():
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="El username ya está en uso"
@@ -144,24 +176,52 @@ class UserService:
         
         # Hashear contraseña si se actualiza
         if "password" in update_data:
-            update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+            update_data["hashed_password"] = await password_hasher.hash(update_data.pop("password"))
         
-        # Solo admins pueden cambiar is_active
-        if "is_active" in update_data and current_user.role != UserRole.ADMIN:
+        # Solo quien tiene USERS_UPDATE puede cambiar is_active
+        if "is_active" in update_data and not can_manage_users:
             del update_data["is_active"]
         
+        # Los access tokens llevan identidad y estado: si cambian, dejan de valer
+        # (en modo stateless no hay otra forma de revocarlos)
+        revoke_tokens = (
+            update_data.get("is_active") is False and user.is_active
+            or "hashed_password" in update_data
+            or any(
+                field in update_data and update_data[field] != getattr(user, field)
+                for field in ("email", "username")
+            )
+        )
+        
+        # Con la contraseña cambiada o la cuenta desactivada, además se cierran
+        # las sesiones: los refresh tokens existentes no pueden emitir más tokens
+        revoke_sessions = (
+            update_data.get("is_active") is False and user.is_active
+            or "hashed_password" in update_data
+        )
+        
         # Aplicar actualizaciones
         for field, value in update_data.items():
             setattr(user, field, value)
         
-        db.commit()
-        db.refresh(user)
+        if revoke_tokens:
+            user.token_version += 1
+        
+        await db.commit()
+        await db.refresh(user)
+        principal_cache.invalidate(user.id)
+        if revoke_tokens:
+            token_versions.set(user.id, user.token_version)
+        if revoke_sessions:
+            await session_store.revoke_all(db, user.id)
+        unknown_identities.invalidate(update_data.get("username"), update_data.get("email"))
+        count_cache.invalidate("users")
         
         return user
     
     @staticmethod
-    def update_user_role(
-        db: Session,
+    async def update_user_role(
+        db: AsyncSession,
         user_id: int,
         role_update: UserUpdateRole
     ) -> User:
@@ -176,14 +236,20 @@ class UserService:
         Returns:
             Usuario actualizado
         """
-        user = UserService.get_user_by_id(db, user_id)
+        user = await UserService.get_user_by_id(db, user_id)
         user.role = role_update.role
-        db.commit()
-        db.refresh(user)
+        
+        # Invalidar los access tokens emitidos con el rol anterior
+        user.token_version += 1
+        await db.commit()
+        await db.refresh(user)
+        principal_cache.invalidate(user.id)
+        token_versions.set(user.id, user.token_version)
+        count_cache.invalidate("users")
         return user
     
     @staticmethod
-    def delete_user(db: Session, user_id: int, current_user: User) -> None:
+    async def delete_user(db: AsyncSession, user_id: int, current_user: Principal) -> None:
         """
         Elimina un usuario (soft delete - lo marca como inactivo).
         
@@ -195,12 +261,12 @@ class UserService:
         Raises:
             HTTPException: Si no tiene permisos o intenta eliminarse a sí mismo
         """
-        # Solo admins pueden eliminar usuarios
-        if current_user.role != UserRole.ADMIN:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Solo administradores pueden eliminar usuarios"
-            )
+        # Solo quien tiene USERS_DELETE puede eliminar usuarios
+        ensure_permissions(
+            current_user.role,
+            Permission.USERS_DELETE,
+            detail="Solo administradores pueden eliminar usuarios"
+        )
         
         # No se puede eliminar a sí mismo
         if current_user.id == user_id:
@@ -209,16 +275,21 @@ class UserService:
                 detail="No puedes eliminarte a ti mismo"
             )
         
-        user = UserService.get_user_by_id(db, user_id)
+        user = await UserService.get_user_by_id(db, user_id)
         
         # Soft delete - marcar como inactivo
         user.is_active = False
-        db.commit()
+        user.token_version += 1
+        await db.commit()
+        principal_cache.invalidate(user.id)
+        token_versions.set(user.id, user.token_version)
+        await session_store.revoke_all(db, user.id)
+        count_cache.invalidate("users")
     
     @staticmethod
-    def change_password(
-        db: Session,
-        user: User,
+    async def change_password(
+        db: AsyncSession,
+        current_user: Principal,
         current_password: str,
         new_password: str
     ) -> None:
@@ -227,20 +298,28 @@ class UserService:
         
         Args:
             db: Sesión de base de datos
-            user: Usuario actual
+            current_user: Usuario actual
             current_password: Contraseña actual
             new_password: Nueva contraseña
         
         Raises:
             HTTPException: Si la contraseña actual es incorrecta
         """
+        user = await UserService.get_user_by_id(db, current_user.id)
+        
         # Verificar contraseña actual
-        if not verify_password(current_password, user.hashed_password):
+        if not await password_hasher.verify(current_password, user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Contraseña actual incorrecta"
             )
         
         # Actualizar contraseña
-        user.hashed_password = get_password_hash(new_password)
-        db.commit()
+        user.hashed_password = await password_hasher.hash(new_password)
+        
+        # Invalidar los access tokens y las sesiones abiertas con la contraseña anterior
+        user.token_version += 1
+        await db.commit()
+        principal_cache.invalidate(user.id)
+        token_versions.set(user.id, user.token_version)
+        await session_store.revoke_all(db, user.id)
@@ -0,0 +1,52 @@
+"""
+Filtro de Bloom.
+Estructura probabilística para comprobar pertenencia en tiempo constante:
+puede dar falsos positivos, pero nunca falsos negativos.
+"""
+import hashlib
+import math
+
+
+class BloomFilter:
+    """
+    Filtro de Bloom sobre un bytearray.
+    
+    - `capacity`: número de elementos esperado
+    - `error_rate`: tasa de falsos positivos aceptada con esa capacidad
+    - Usa doble hashing (Kirsch-Mitzenmacher) sobre un único digest blake2b
+    
+    No admite borrados: para eliminar elementos hay que reconstruirlo.
+    """
+    
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        
+        # Tamaño óptimo en bits y número de funciones hash
+        self.num_bits = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+    
+    def _positions(self, item: str):
+        """Posiciones de bit que corresponden a un elemento"""
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+    
+    def add(self, item: str) -> None:
+        """Añade un elemento al filtro"""
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+    
+    def __contains__(self, item: str) -> bool:
+        """True si el elemento puede estar en el filtro, False si seguro que no está"""
+        bits = self._bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+    
+    def __len__(self) -> int:
+        """Número de elementos añadidos"""
+        return self.count
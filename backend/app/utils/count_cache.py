@@ -0,0 +1,169 @@
+"""
+Caché de totales de los listados.
+Evita repetir el COUNT(*) del conjunto filtrado en cada página de un listado.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from sqlalchemy import Select, column, func, literal_column, select, table
+from app.config import settings
+
+
+def filter_signature(**filters) -> str:
+    """
+    Firma normalizada de los filtros de un listado.
+    
+    Se ignoran los filtros vacíos y el orden de los argumentos, así
+    `?category=X&brand=` y `?brand=&category=X` comparten entrada.
+    Los textos se recortan; las mayúsculas se respetan porque la
+    colación de la base de datos decide si importan.
+    
+    Returns:
+        Firma lista para usar como clave de caché
+    """
+    normalized = {}
+    for name, value in filters.items():
+        if isinstance(value, str):
+            value = value.strip() or None
+        if value is None:
+            continue
+        if hasattr(value, "value"):  # Enum
+            value = value.value
+        normalized[name] = value
+    return json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+
+
+class CountCache:
+    """
+    Caché LRU en memoria de totales por listado y firma de filtros.
+    
+    - Cada listado ("products", "users") tiene su propia generación: al
+      escribir en la tabla se incrementa y las entradas anteriores dejan
+      de ser válidas sin tener que recorrerlas
+    - El TTL acota el desfase con escrituras hechas por otros workers
+    """
+    
+    def __init__(self, max_size: int = 1000, ttl_seconds: int = 30, estimate_min_rows: int = 0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.estimate_min_rows = estimate_min_rows
+        self._entries: "OrderedDict[tuple[str, str], tuple[float, int, int]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def get(self, listing: str, signature: str) -> Optional[int]:
+        """
+        Retorna el total cacheado para un listado y firma de filtros.
+        
+        Returns:
+            Total o None si no está en caché (o quedó obsoleto)
+        """
+        key = (listing, signature)
+        now = time.monotonic()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            expires_at, generation, total = entry
+            if expires_at <= now or generation != self._generations.get(listing, 0):
+                del self._entries[key]
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return total
+    
+    def set(self, listing: str, signature: str, total: int) -> None:
+        """Guarda el total de un listado"""
+        key = (listing, signature)
+        
+        with self._lock:
+            generation = self._generations.get(listing, 0)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, generation, total)
+            self._entries.move_to_end(key)
+            
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, listing: str) -> None:
+        """Descarta todos los totales de un listado (llamar tras escribir en su tabla)"""
+        with self._lock:
+            self._generations[listing] = self._generations.get(listing, 0) + 1
+            self.invalidations += 1
+    
+    def accept_estimate(self, estimate: Optional[int]) -> Optional[int]:
+        """
+        Decide si una estimación de filas sustituye al COUNT(*) exacto.
+        
+        Solo en tablas grandes (COUNT_ESTIMATE_MIN_ROWS, 0 = nunca):
+        ahí el COUNT(*) es caro y un total aproximado basta para paginar.
+        
+        Returns:
+            La estimación o None si hay que contar
+        """
+        if self.estimate_min_rows <= 0 or estimate is None:
+            return None
+        estimate = int(estimate)
+        return estimate if estimate >= self.estimate_min_rows else None
+    
+    def clear(self) -> None:
+        """Vacía la caché y reinicia los contadores"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.invalidations = 0
+    
+    def stats(self) -> dict:
+        """Retorna estadísticas de uso de la caché"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0
+            }
+
+
+def estimated_row_count_query(dialect: str, table_name: str) -> Optional[Select]:
+    """
+    Consulta que estima las filas de una tabla sin recorrerla.
+    
+    - MySQL: estadísticas de InnoDB (information_schema.TABLES.TABLE_ROWS)
+    - SQLite: mayor rowid (cota superior, exacta si nunca se borraron filas)
+    
+    Es un SELECT, así que en sesiones de lectura puede ir a una réplica.
+    
+    Returns:
+        Sentencia o None si el dialecto no permite estimar
+    """
+    if dialect == "mysql":
+        tables = table("TABLES", column("TABLE_SCHEMA"), column("TABLE_NAME"), column("TABLE_ROWS"), schema="information_schema")
+        return select(tables.c.TABLE_ROWS).where(
+            tables.c.TABLE_SCHEMA == func.database(),
+            tables.c.TABLE_NAME == table_name
+        )
+    if dialect == "sqlite":
+        return select(func.max(literal_column("rowid"))).select_from(table(table_name))
+    return None
+
+
+# Instancia global (ver COUNT_CACHE_* en la configuración)
+count_cache = CountCache(
+    max_size=settings.COUNT_CACHE_MAX_SIZE,
+    ttl_seconds=settings.COUNT_CACHE_TTL_SECONDS,
+    estimate_min_rows=settings.COUNT_ESTIMATE_MIN_ROWS
+)
@@ -0,0 +1,181 @@
+"""
+Pools de conexiones instrumentados.
+Miden cuánto espera cada petición para obtener una conexión del pool,
+para poder dimensionar DB_POOL_SIZE y DB_MAX_OVERFLOW con datos reales.
+"""
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolMetrics:
+    """
+    Contadores de un pool: checkouts, tiempo de espera, timeouts y desconexiones.
+    Sobreviven a la recreación del pool (por ejemplo tras una desconexión).
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.disconnects = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+    
+    def record_checkout(self, seconds: float) -> None:
+        """Registra un checkout y lo que tardó"""
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+    
+    def record_timeout(self) -> None:
+        """Registra un checkout que agotó DB_POOL_TIMEOUT"""
+        with self._lock:
+            self.timeouts += 1
+    
+    def record_disconnect(self) -> None:
+        """Registra un error de conexión perdida (el pool se invalida)"""
+        with self._lock:
+            self.disconnects += 1
+    
+    def reset(self) -> None:
+        """Reinicia los contadores"""
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.disconnects = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+    
+    def stats(self) -> dict:
+        """Retorna los contadores (tiempos en milisegundos)"""
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "disconnects": self.disconnects,
+                "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3)
+            }
+
+
+class TimedPoolMixin:
+    """
+    Añade PoolMetrics a un QueuePool midiendo la duración de cada checkout
+    (espera en la cola + conexión nueva si hace falta + reset).
+    """
+    
+    metrics: PoolMetrics
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+    
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_checkout(time.perf_counter() - start)
+        return connection
+    
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    """QueuePool con métricas (motor síncrono)"""
+
+
+class TimedAsyncAdaptedQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool con métricas (motor asíncrono)"""
+
+
+def get_pool_options(url: str, settings, asynchronous: bool = False) -> dict:
+    """
+    Argumentos de pool para create_engine / create_async_engine.
+    
+    - SQLite usa sus propios pools por defecto y no admite estos parámetros
+    - En lugar de hacer ping en cada checkout (DB_POOL_PRE_PING) se reciclan
+      las conexiones antes del timeout del servidor (DB_POOL_RECYCLE); si aun
+      así una conexión está muerta, SQLAlchemy detecta la desconexión,
+      invalida el pool y la siguiente petición abre conexiones nuevas
+    
+    Args:
+        url: URL de conexión
+        settings: Configuración de la aplicación
+        asynchronous: True para el motor asíncrono
+    
+    Returns:
+        Diccionario de argumentos
+    """
+    if url.startswith("sqlite"):
+        return {}
+    
+    return {
+        "poolclass": TimedAsyncAdaptedQueuePool if asynchronous else TimedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_use_lifo": True,  # Reutiliza las conexiones calientes; las sobrantes caducan por recycle
+    }
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Cuenta las desconexiones detectadas por el motor.
+    
+    Args:
+        engine: Motor síncrono (para uno asíncrono, usar .sync_engine)
+    """
+    @event.listens_for(engine, "handle_error")
+    def count_disconnects(context):
+        metrics = getattr(engine.pool, "metrics", None)
+        if context.is_disconnect and metrics is not None:
+            metrics.record_disconnect()
+
+
+def pool_status(engine: Engine, settings) -> dict:
+    """
+    Estado actual del pool de un motor.
+    
+    Los límites que el pool no expone públicamente (max_overflow, recycle)
+    se toman de la misma configuración con la que se creó (get_pool_options).
+    
+    Args:
+        engine: Motor síncrono (para uno asíncrono, usar .sync_engine)
+        settings: Configuración de la aplicación
+    
+    Returns:
+        Tamaño, conexiones en uso, libres, overflow y métricas de espera
+    """
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__}
+    
+    if isinstance(pool, QueuePool):
+        options = get_pool_options(str(engine.url), settings)
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": options.get("max_overflow"),
+            "timeout_seconds": pool.timeout(),
+            "recycle_seconds": options.get("pool_recycle")
+        })
+    
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        status.update(metrics.stats())
+    
+    return status
@@ -0,0 +1,183 @@
+"""
+Enrutado de lecturas a réplicas.
+Una sesión que envía los SELECT a réplicas de solo lectura (round-robin,
+con expulsión temporal de las que fallan) y todo lo demás al primario.
+"""
+import itertools
+import threading
+import time
+from typing import List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+# Claves de session.info
+READ_REPLICAS = "read_replicas"  # La sesión puede leer de réplicas
+USE_PRIMARY = "use_primary"      # Hubo una escritura: todo va al primario
+REPLICA_BIND = "replica_bind"    # Réplica asignada a la sesión
+
+
+class Replica:
+    """Una réplica y su estado de salud"""
+    
+    def __init__(self, name: str, engine: Engine):
+        self.name = name
+        self.engine = engine
+        self.ejected_until = 0.0
+        self.reads = 0
+        self.failures = 0
+    
+    @property
+    def healthy(self) -> bool:
+        return self.ejected_until <= time.monotonic()
+
+
+class ReplicaSet:
+    """
+    Conjunto de réplicas con reparto round-robin.
+    
+    - Una réplica que falla al conectar o pierde la conexión se expulsa
+      durante `eject_seconds`; mientras tanto las lecturas van a las demás
+      (o al primario si no queda ninguna)
+    - Pasado ese tiempo vuelve a recibir tráfico; si sigue caída, se expulsa de nuevo
+    """
+    
+    def __init__(self, eject_seconds: int = 30):
+        self.eject_seconds = eject_seconds
+        self.replicas: List[Replica] = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+    
+    def add(self, name: str, engine: Engine) -> None:
+        """
+        Registra una réplica y vigila sus errores.
+        
+        Args:
+            name: Nombre para las métricas
+            engine: Motor síncrono de la réplica (para uno asíncrono, .sync_engine)
+        """
+        replica = Replica(name, engine)
+        self.replicas.append(replica)
+        
+        @event.listens_for(engine, "handle_error")
+        def eject_on_failure(context):
+            # Sin conexión = no se pudo conectar; is_disconnect = se perdió
+            if context.connection is None or context.is_disconnect:
+                self.eject(replica)
+    
+    def eject(self, replica: Replica) -> None:
+        """Saca una réplica de la rotación temporalmente"""
+        with self._lock:
+            replica.failures += 1
+            replica.ejected_until = time.monotonic() + self.eject_seconds
+    
+    def is_ejected(self, engine: Engine) -> bool:
+        """Indica si el motor es una réplica fuera de la rotación"""
+        return any(replica.engine is engine and not replica.healthy for replica in self.replicas)
+    
+    def choose(self) -> Optional[Engine]:
+        """
+        Elige la siguiente réplica sana.
+        
+        Returns:
+            Motor de la réplica o None si no hay ninguna disponible
+        """
+        with self._lock:
+            for _ in range(len(self.replicas)):
+                replica = self.replicas[next(self._counter) % len(self.replicas)]
+                if replica.healthy:
+                    replica.reads += 1
+                    return replica.engine
+        return None
+    
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+    
+    def stats(self) -> dict:
+        """Retorna el estado de cada réplica"""
+        with self._lock:
+            return {
+                replica.name: {
+                    "healthy": replica.healthy,
+                    "sessions": replica.reads,
+                    "failures": replica.failures
+                }
+                for replica in self.replicas
+            }
+
+
+class RoutingSession(Session):
+    """
+    Sesión que decide el motor de cada sentencia.
+    
+    - Por defecto todo va al primario (como una sesión normal)
+    - Si la sesión se creó para lecturas (info["read_replicas"]), los SELECT
+      van a una réplica elegida una vez por sesión
+    - En cuanto la sesión escribe (flush o INSERT/UPDATE/DELETE), queda fijada
+      al primario hasta que se cierra, para poder leer lo que acaba de escribir
+    - La réplica se elige comprobando que acepta conexiones: si está caída,
+      queda expulsada y la sesión lee de otra réplica o del primario
+    - Si una réplica se expulsa a mitad de sesión (conexión perdida), la
+      sentencia que falló propaga el error y las siguientes van al primario
+    
+    Las subclases indican su conjunto de réplicas en `replica_set`.
+    """
+    
+    replica_set: ReplicaSet = ReplicaSet()
+    
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        primary = super().get_bind(mapper, clause=clause, **kw)
+        
+        if not self.info.get(READ_REPLICAS) or not self.replica_set:
+            return primary
+        
+        if self._flushing or (clause is not None and not isinstance(clause, Select)):
+            self.info[USE_PRIMARY] = True
+        
+        if self.info.get(USE_PRIMARY):
+            return primary
+        
+        replica = self.info.get(REPLICA_BIND)
+        if replica is None:
+            replica = self._choose_replica() or primary
+            self.info[REPLICA_BIND] = replica
+        elif self.replica_set.is_ejected(replica):
+            # La réplica falló a mitad de sesión: el resto de lecturas, al primario
+            self.info[USE_PRIMARY] = True
+            return primary
+        return replica
+    
+    def _choose_replica(self) -> Optional[Engine]:
+        """
+        Elige la réplica de la sesión comprobando que acepta conexiones.
+        
+        La conexión de prueba vuelve al pool y la reutiliza la primera
+        sentencia. Si falla, el evento handle_error de ReplicaSet ya la
+        expulsó y se prueba la siguiente (o el primario si no queda ninguna).
+        """
+        for _ in range(len(self.replica_set.replicas)):
+            replica = self.replica_set.choose()
+            if replica is None:
+                return None
+            try:
+                with replica.connect():
+                    return replica
+            except DBAPIError:
+                continue
+        return None
+    
+    def close(self) -> None:
+        # La sesión puede reutilizarse tras close(): volver al estado inicial
+        self.info.pop(USE_PRIMARY, None)
+        self.info.pop(REPLICA_BIND, None)
+        super().close()
+
+
+def use_primary(session) -> None:
+    """
+    Fija una sesión (síncrona o asíncrona) al primario, por ejemplo antes de
+    una lectura que debe ver datos recién escritos por otra petición.
+    """
+    session.info[USE_PRIMARY] = True
@@ -7,40 +7,222 @@ Funciones que se inyectan en los endpoints para:
 """
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from typing import Optional
-from app.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+from app.database import get_async_db
 from app.models.user import User, UserRole
 from app.utils.security import decode_token
+from app.utils.principal_cache import Principal, principal_cache
+from app.utils.token_versions import token_versions
+from app.utils.permissions import ALL_PERMISSIONS, Permission, combine, has_permissions
+from app.services.revocation import revocation_list
+from app.config import settings
 
 # Esquema de seguridad Bearer
 security = HTTPBearer()
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+async def load_principal(db: AsyncSession, user_id: int) -> Optional[Principal]:
     """
-    Obtiene el usuario actual desde el token JWT.
+    Obtiene el principal de un usuario, primero desde la caché.
     
-    Esta función se usa como dependencia en endpoints protegidos.
-    Valida el token y devuelve el usuario autenticado.
+    En caso de fallo solo se leen las columnas públicas del usuario
+    (sin hashed_password).
+    
+    Args:
+        db: Sesión de base de datos
+        user_id: ID del usuario
+    
+    Returns:
+        Principal del usuario o None si no existe
+    """
+    if settings.PRINCIPAL_CACHE_ENABLED:
+        principal = principal_cache.get(user_id)
+        if principal is not None:
+            return principal
+    
+    columns = [getattr(User, name) for name in Principal.COLUMNS]
+    result = await db.execute(select(*columns).where(User.id == user_id))
+    row = result.first()
+    
+    if row is None:
+        return None
+    
+    principal = Principal.from_row(row)
+    
+    if settings.PRINCIPAL_CACHE_ENABLED:
+        principal_cache.set(principal)
+    
+    return principal
+
+
+async def load_principals(db: AsyncSession, user_ids: Iterable[int]) -> Dict[int, Principal]:
+    """
+    Obtiene los principals de varios usuarios a la vez.
+    
+    Los que no están en caché se resuelven con una sola consulta
+    `WHERE id IN (...)`.
+    
+    Args:
+        db: Sesión de base de datos
+        user_ids: IDs de los usuarios
+    
+    Returns:
+        Diccionario {user_id: Principal} (los IDs inexistentes no aparecen)
+    """
+    principals: Dict[int, Principal] = {}
+    missing = set()
+    
+    for user_id in set(user_ids):
+        principal = principal_cache.get(user_id) if settings.PRINCIPAL_CACHE_ENABLED else None
+        if principal is not None:
+            principals[user_id] = principal
+        else:
+            missing.add(user_id)
+    
+    if missing:
+        columns = [getattr(User, name) for name in Principal.COLUMNS]
+        result = await db.execute(select(*columns).where(User.id.in_(missing)))
+        
+        for row in result.all():
+            principal = Principal.from_row(row)
+            principals[principal.id] = principal
+            if settings.PRINCIPAL_CACHE_ENABLED:
+                principal_cache.set(principal)
+    
+    return principals
+
+
+async def load_token_version(db: AsyncSession, user_id: int) -> Optional[int]:
+    """
+    Obtiene la versión de token vigente de un usuario.
+    
+    Se sirve desde el mapa en memoria; en caso de fallo solo se lee
+    la columna token_version.
+    
+    Args:
+        db: Sesión de base de datos
+        user_id: ID del usuario
+    
+    Returns:
+        Versión vigente o None si el usuario no existe
+    """
+    version = token_versions.get(user_id)
+    if version is not None:
+        return version
+    
+    result = await db.execute(select(User.token_version).where(User.id == user_id))
+    version = result.scalar_one_or_none()
+    
+    if version is not None:
+        token_versions.set(user_id, version)
+    
+    return version
+
+
+async def resolve_principal(db: AsyncSession, payload: dict) -> Principal:
+    """
+    Obtiene el principal de un access token ya validado.
+    
+    - Modo normal: carga el usuario (caché o base de datos)
+    - Modo STATELESS_AUTH: confía en `role` y `active` del token y solo
+      compara su `ver` con la versión vigente del usuario
+    
+    En ambos modos un token con `ver` anterior a la versión vigente
+    se rechaza (rol cambiado, usuario eliminado o contraseña cambiada).
     
     Args:
-        credentials: Credenciales del header Authorization
         db: Sesión de base de datos
+        payload: Payload del access token
     
     Returns:
-        Usuario autenticado
+        Principal del usuario (parcial en modo sin estado)
     
     Raises:
-        HTTPException: Si el token es inválido o el usuario no existe
+        HTTPException: Si el token no es válido o el usuario no existe o está inactivo
+    """
+    # Obtener ID del usuario desde el token
+    user_id: Optional[int] = payload.get("user_id")
     
-    Uso:
-        @app.get("/protected")
-        def protected_route(current_user: User = Depends(get_current_user)):
-            return {"user": current_user.username}
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    token_version = payload.get("ver")
+    
+    if settings.STATELESS_AUTH:
+        # Los tokens emitidos antes de existir `ver` no traen los claims necesarios
+        if token_version is None or payload.get("role") is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token inválido",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        
+        current_version = await load_token_version(db, user_id)
+        
+        if current_version is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Usuario no encontrado",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        
+        user = Principal.from_token(payload)
+    else:
+        # Buscar usuario (caché o base de datos)
+        user = await load_principal(db, user_id)
+        
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Usuario no encontrado",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        
+        current_version = user.token_version
+    
+    # Verificar que el token no haya sido invalidado por un cambio de versión
+    if token_version is not None and token_version != current_version:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token invalidado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    # Verificar que el usuario esté activo
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Usuario inactivo",
+        )
+    
+    return user
+
+
+async def get_access_token_payload(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> dict:
+    """
+    Valida el access token de la petición y retorna su payload.
+    
+    FastAPI cachea las dependencias por petición, así que los endpoints
+    pueden pedir el payload (por ejemplo el `sid`) junto con
+    get_current_user sin decodificar el token dos veces.
+    
+    Args:
+        credentials: Credenciales del header Authorization
+    
+    Returns:
+        Payload del access token
+    
+    Raises:
+        HTTPException: Si el token es inválido, expiró o no es de acceso
     """
     # Extraer token del header "Authorization: Bearer <token>"
     token = credentials.credentials
@@ -63,18 +245,75 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Obtener ID del usuario desde el token
-    user_id: Optional[int] = payload.get("user_id")
-    
-    if user_id is None:
+    # Verificar que no haya sido revocado (filtro de Bloom en memoria)
+    if revocation_list.is_revoked(payload.get("jti")):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token inválido",
+            detail="Token revocado",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Buscar usuario en la base de datos
-    user = db.query(User).filter(User.id == user_id).first()
+    return payload
+
+
+async def get_current_user(
+    payload: dict = Depends(get_access_token_payload),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """
+    Obtiene el usuario actual desde el token JWT.
+    
+    Esta función se usa como dependencia en endpoints protegidos.
+    Valida el token y devuelve el usuario autenticado como un
+    Principal ligero (servido desde caché cuando es posible).
+    
+    Con STATELESS_AUTH el principal se construye desde el token y solo
+    trae id, username, role e is_active; los endpoints que necesitan el
+    perfil completo deben usar get_current_user_profile.
+    
+    Args:
+        payload: Payload del access token ya validado
+        db: Sesión de base de datos
+    
+    Returns:
+        Principal del usuario autenticado
+    
+    Raises:
+        HTTPException: Si el token es inválido o el usuario no existe
+    
+    Uso:
+        @app.get("/protected")
+        def protected_route(current_user: Principal = Depends(get_current_user)):
+            return {"user": current_user.username}
+    """
+    return await resolve_principal(db, payload)
+
+
+async def get_current_user_profile(
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """
+    Obtiene el perfil completo del usuario actual.
+    
+    En modo normal equivale a get_current_user. Con STATELESS_AUTH
+    completa el principal construido desde el token cargando el usuario
+    (solo lo necesitan los endpoints que devuelven el perfil).
+    
+    Args:
+        current_user: Usuario actual
+        db: Sesión de base de datos
+    
+    Returns:
+        Principal con todos los campos públicos del usuario
+    
+    Raises:
+        HTTPException: Si el usuario ya no existe
+    """
+    if current_user.is_complete:
+        return current_user
+    
+    user = await load_principal(db, current_user.id)
     
     if user is None:
         raise HTTPException(
@@ -83,19 +322,12 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Verificar que el usuario esté activo
-    if not user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Usuario inactivo",
-        )
-    
     return user
 
 
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: Principal = Depends(get_current_user)
+) -> Principal:
     """
     Verifica que el usuario actual esté activo.
     
@@ -118,47 +350,58 @@ async def get_current_active_user(
     return current_user
 
 
-async def require_admin(
-    current_user: User = Depends(get_current_user)
-) -> User:
+@lru_cache(maxsize=None)
+def require_permissions(*required: Permission):
     """
-    Verifica que el usuario actual sea administrador.
+    Factory de dependencias que exigen uno o varios permisos.
+    
+    - La máscara requerida se calcula una sola vez por combinación
+    - La comprobación es un AND bit a bit con la máscara del rol
+    - Está cacheada: la misma combinación devuelve siempre la misma
+      dependencia, así FastAPI la resuelve una sola vez por petición
     
-    Uso en endpoints que solo admins pueden acceder:
+    Uso:
         @app.delete("/users/{id}")
-        def delete_user(
+        async def delete_user(
             user_id: int,
-            admin: User = Depends(require_admin)
+            admin: Principal = Depends(require_permissions(Permission.USERS_DELETE))
         ):
-            # Solo admins pueden llegar aquí
             pass
     
     Args:
-        current_user: Usuario actual
+        required: Permisos requeridos (todos)
     
     Returns:
-        Usuario administrador
-    
-    Raises:
-        HTTPException: Si el usuario no es admin
+        Función de dependencia
     """
-    if current_user.role != UserRole.ADMIN:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Se requieren permisos de administrador"
-        )
-    return current_user
+    mask = combine(*required)
+    
+    async def permission_checker(current_user: Principal = Depends(get_current_user)) -> Principal:
+        if not has_permissions(current_user.role, mask):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Permisos insuficientes"
+            )
+        return current_user
+    
+    return permission_checker
+
+
+# Administrador = todos los permisos (se mantiene por compatibilidad)
+require_admin = require_permissions(ALL_PERMISSIONS)
 
 
-async def require_role(required_role: UserRole):
+@lru_cache(maxsize=None)
+def require_role(required_role: UserRole):
     """
     Factory para crear dependencias de roles específicos.
     
     Esta es una función más flexible que permite requerir cualquier rol.
+    Para autorizar acciones es preferible require_permissions.
     
     Uso:
         @app.get("/admin-only")
-        def admin_only(user: User = Depends(require_role(UserRole.ADMIN))):
+        def admin_only(user: Principal = Depends(require_role(UserRole.ADMIN))):
             pass
     
     Args:
@@ -167,7 +410,7 @@ async def require_role(required_role: UserRole):
     Returns:
         Función de dependencia
     """
-    async def role_checker(current_user: User = Depends(get_current_user)) -> User:
+    async def role_checker(current_user: Principal = Depends(get_current_user)) -> Principal:
         if current_user.role != required_role:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -178,10 +421,10 @@ async def require_role(required_role: UserRole):
     return role_checker
 
 
-def get_optional_user(
+async def get_optional_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
-    db: Session = Depends(get_db)
-) -> Optional[User]:
+    db: AsyncSession = Depends(get_async_db)
+) -> Optional[Principal]:
     """
     Obtiene el usuario si hay token, pero no es obligatorio.
     
@@ -205,12 +448,11 @@ def get_optional_user(
         if payload is None or payload.get("token_type") != "access":
             return None
         
-        user_id = payload.get("user_id")
-        if user_id is None:
+        if revocation_list.is_revoked(payload.get("jti")):
             return None
         
-        user = db.query(User).filter(User.id == user_id).first()
-        return user if user and user.is_active else None
+        return await resolve_principal(db, payload)
     
-    except Exception:
+    except HTTPException:
+        # Token de un usuario inexistente, inactivo o con versión antigua
         return None
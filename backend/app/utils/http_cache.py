@@ -0,0 +1,89 @@
+"""
+Caché HTTP del catálogo.
+ETags, peticiones condicionales (If-None-Match → 304) y versión del catálogo.
+"""
+import hashlib
+from typing import Optional
+from fastapi import Request, Response, status
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.models.catalog import CatalogVersion
+
+
+def make_etag(*parts) -> str:
+    """
+    Genera un ETag fuerte a partir de las partes que identifican el contenido.
+    
+    Returns:
+        ETag entre comillas, listo para la cabecera
+    """
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Indica si el cliente ya tiene esta versión (cabecera If-None-Match).
+    
+    Acepta listas de ETags, `*` y ETags débiles (W/"..."), como indica
+    la comparación débil que el RFC 9110 exige para If-None-Match.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def cache_headers(etag: str, cache_control: Optional[str]) -> dict:
+    """Cabeceras de caché de una respuesta (Cache-Control vacío = no se envía)"""
+    headers = {"ETag": etag}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    return headers
+
+
+def not_modified(etag: str, cache_control: Optional[str]) -> Response:
+    """Respuesta 304 sin cuerpo"""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag, cache_control))
+
+
+class CatalogVersionCounter:
+    """
+    Versión del catálogo de productos para los ETags de los listados.
+    
+    - Es el contador de la tabla catalog_version, el mismo para todos los
+      workers: un 304 solo se responde si nadie modificó el catálogo desde
+      que se generó el ETag
+    - Cada escritura de productos lo incrementa en su propia transacción
+      (`bump` antes del commit), así el cambio y la versión nueva se
+      confirman juntos
+    - Leerlo es una consulta por clave primaria
+    """
+    
+    def value(self, db: Session) -> str:
+        """Versión actual"""
+        version = db.execute(
+            select(CatalogVersion.version).where(CatalogVersion.id == 1)
+        ).scalar()
+        return str(version or 0)
+    
+    def bump(self, db: Session) -> None:
+        """Marca el catálogo como modificado (se confirma con el commit del llamador)"""
+        db.execute(
+            update(CatalogVersion)
+            .where(CatalogVersion.id == 1)
+            .values(version=CatalogVersion.version + 1)
+        )
+
+
+# Instancia global
+catalog_version = CatalogVersionCounter()
@@ -0,0 +1,44 @@
+"""
+Caché negativa de identidades de login.
+Recuerda durante unos segundos los usernames/emails que no existen para que
+los logins fallidos repetidos (scripts, credential stuffing) no consulten la base de datos.
+"""
+from app.config import settings
+from app.utils.ttl_cache import TTLCache
+
+
+class NegativeIdentityCache(TTLCache):
+    """
+    Conjunto en memoria de identidades inexistentes con TTL.
+    
+    - Las claves se normalizan (minúsculas, sin espacios) para cubrir
+      las colaciones de MySQL que no distinguen mayúsculas
+    - Se invalida al registrar un usuario o cambiar su username/email
+    - Es local a cada worker: un usuario recién creado en otro worker
+      puede tardar como mucho el TTL en poder iniciar sesión aquí
+      si antes se intentó entrar con su identidad
+    """
+    
+    @staticmethod
+    def _key(identity: str) -> str:
+        """Normaliza el username o email"""
+        return identity.strip().lower()
+    
+    def contains(self, identity: str) -> bool:
+        """Indica si la identidad se sabe inexistente"""
+        return self.get(self._key(identity)) is not None
+    
+    def add(self, identity: str) -> None:
+        """Marca una identidad como inexistente"""
+        self.set(self._key(identity), True)
+    
+    def invalidate(self, *identities: str) -> None:
+        """Olvida las identidades indicadas (porque ahora existen)"""
+        super().invalidate(*(self._key(identity) for identity in identities if identity))
+
+
+# Instancia global (ver IDENTITY_NEGATIVE_CACHE_* en la configuración)
+unknown_identities = NegativeIdentityCache(
+    max_size=settings.IDENTITY_NEGATIVE_CACHE_MAX_SIZE,
+    ttl_seconds=settings.IDENTITY_NEGATIVE_CACHE_TTL_SECONDS
+)
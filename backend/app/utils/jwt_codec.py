@@ -0,0 +1,182 @@
+"""
+Codecs JWT intercambiables.
+Permite usar una ruta optimizada para HS256 manteniendo python-jose
+como implementación de respaldo para el resto de algoritmos.
+
+Benchmark:
+    python -m app.cli benchmark-jwt
+"""
+import base64
+import calendar
+import hashlib
+import hmac
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from jose import JWTError, jwt
+from app.config import settings
+
+
+def b64url_encode(data: bytes) -> str:
+    """Codifica en base64url sin relleno (formato JOSE)"""
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def b64url_decode(data: str) -> bytes:
+    """Decodifica base64url sin relleno"""
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def to_timestamp(value) -> int:
+    """Convierte un datetime UTC (naive) a timestamp, igual que python-jose"""
+    if isinstance(value, datetime):
+        return calendar.timegm(value.utctimetuple())
+    return value
+
+
+class JWTCodec(ABC):
+    """
+    Interfaz de los codecs.
+    Las claves son instancias de app.utils.keyring.SigningKey.
+    """
+    name = "base"
+    
+    @abstractmethod
+    def encode(self, claims: dict, key) -> str:
+        """Firma los claims con la clave indicada"""
+    
+    @abstractmethod
+    def decode(self, token: str, key) -> dict:
+        """Verifica firma y expiración; lanza JWTError si no es válido"""
+    
+    @abstractmethod
+    def header(self, token: str) -> dict:
+        """Retorna la cabecera del token sin verificarla"""
+
+
+class JoseCodec(JWTCodec):
+    """Implementación genérica basada en python-jose"""
+    name = "jose"
+    
+    def encode(self, claims: dict, key) -> str:
+        headers = {"kid": key.kid} if key.kid else None
+        return jwt.encode(claims, key.signing_material, algorithm=key.algorithm, headers=headers)
+    
+    def decode(self, token: str, key) -> dict:
+        return jwt.decode(token, key.verification_key, algorithms=[key.algorithm])
+    
+    def header(self, token: str) -> dict:
+        return jwt.get_unverified_header(token)
+
+
+class FastHS256Codec(JWTCodec):
+    """
+    Ruta rápida para HS256.
+    
+    - El estado HMAC de cada secreto se calcula una vez y se copia por token
+    - La cabecera codificada de cada `kid` se genera una sola vez
+    - Solo se validan los claims temporales (exp, nbf)
+    - Cualquier otro algoritmo se delega en el codec de respaldo
+    """
+    name = "fast"
+    
+    def __init__(self, fallback: Optional[JWTCodec] = None):
+        self.fallback = fallback or JoseCodec()
+        self._states: Dict[Tuple[Optional[str], str], Tuple[bytes, "hmac.HMAC"]] = {}
+        self._headers: Dict[bytes, dict] = {}
+        self._lock = threading.Lock()
+    
+    def _state(self, key) -> Tuple[bytes, "hmac.HMAC"]:
+        """Cabecera codificada y HMAC precalculado para una clave"""
+        state = self._states.get((key.kid, key.secret))
+        if state is None:
+            header = {"alg": "HS256", "typ": "JWT"}
+            if key.kid:
+                header["kid"] = key.kid
+            segment = b64url_encode(json.dumps(header, separators=(",", ":")).encode()).encode()
+            state = (segment, hmac.new(key.secret.encode(), digestmod=hashlib.sha256))
+            with self._lock:
+                self._states[(key.kid, key.secret)] = state
+        return state
+    
+    def encode(self, claims: dict, key) -> str:
+        if key.algorithm != "HS256":
+            return self.fallback.encode(claims, key)
+        
+        header_segment, template = self._state(key)
+        payload = {k: to_timestamp(v) for k, v in claims.items()}
+        payload_segment = b64url_encode(json.dumps(payload, separators=(",", ":")).encode()).encode()
+        
+        signing_input = header_segment + b"." + payload_segment
+        mac = template.copy()
+        mac.update(signing_input)
+        return (signing_input + b"." + b64url_encode(mac.digest()).encode()).decode()
+    
+    def decode(self, token: str, key) -> dict:
+        if key.algorithm != "HS256":
+            return self.fallback.decode(token, key)
+        
+        _, template = self._state(key)
+        
+        try:
+            signing_input, signature = token.encode().rsplit(b".", 1)
+            mac = template.copy()
+            mac.update(signing_input)
+            if not hmac.compare_digest(mac.digest(), b64url_decode(signature.decode())):
+                raise JWTError("Firma inválida")
+            payload = json.loads(b64url_decode(signing_input.split(b".", 1)[1].decode()))
+        except (ValueError, UnicodeError) as e:
+            raise JWTError("Token mal formado") from e
+        
+        if not isinstance(payload, dict):
+            raise JWTError("Payload inválido")
+        
+        now = time.time()
+        exp = payload.get("exp")
+        if exp is not None and (not isinstance(exp, (int, float)) or now >= exp):
+            raise JWTError("Token expirado")
+        nbf = payload.get("nbf")
+        if nbf is not None and (not isinstance(nbf, (int, float)) or now < nbf):
+            raise JWTError("Token aún no válido")
+        
+        return payload
+    
+    def header(self, token: str) -> dict:
+        segment = token.split(".", 1)[0].encode()
+        
+        # Los tokens de una misma clave comparten cabecera: se parsea una vez
+        header = self._headers.get(segment)
+        if header is None:
+            try:
+                header = json.loads(b64url_decode(segment.decode()))
+            except (ValueError, UnicodeError) as e:
+                raise JWTError("Cabecera inválida") from e
+            if not isinstance(header, dict):
+                raise JWTError("Cabecera inválida")
+            with self._lock:
+                if len(self._headers) < 64:
+                    self._headers[segment] = header
+        return dict(header)
+
+
+CODECS = {
+    "jose": JoseCodec,
+    "fast": FastHS256Codec,
+}
+
+_codec: JWTCodec = CODECS[settings.JWT_CODEC]()
+
+
+def get_codec() -> JWTCodec:
+    """Retorna el codec activo (ver JWT_CODEC en la configuración)"""
+    return _codec
+
+
+def set_codec(name: str) -> None:
+    """Cambia el codec activo ("jose" o "fast")"""
+    global _codec
+    _codec = CODECS[name]()
+
@@ -0,0 +1,282 @@
+"""
+Anillo de claves para firmar y verificar JWT.
+Soporta HS256 (secreto compartido) y claves asimétricas RS256, ES256 y EdDSA,
+identificadas por `kid` para poder rotarlas sin downtime.
+"""
+import json
+import time
+from typing import Dict, List, Optional
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from cryptography.exceptions import InvalidSignature
+from jose import JWTError
+from app.config import settings
+from app.utils.jwt_codec import b64url_decode, b64url_encode, get_codec, to_timestamp
+
+# Algoritmos soportados y el tipo de clave que exige cada uno
+SYMMETRIC_ALGORITHMS = {"HS256", "HS384", "HS512"}
+ASYMMETRIC_ALGORITHMS = {"RS256", "ES256", "EdDSA"}
+
+
+def _int_to_b64url(value: int, length: Optional[int] = None) -> str:
+    """Codifica un entero big-endian en base64url (para JWK)"""
+    length = length or (value.bit_length() + 7) // 8
+    return b64url_encode(value.to_bytes(length, "big"))
+
+
+class SigningKey:
+    """
+    Clave del anillo.
+    
+    - Las claves HS usan un secreto compartido y nunca se publican
+    - Las claves asimétricas pueden tener solo parte pública
+      (verify-only), útil para aceptar tokens de una clave ya retirada
+      o publicar una clave nueva antes de empezar a firmar con ella
+    """
+    __slots__ = ("kid", "algorithm", "secret", "private_pem", "public_pem", "_private", "_public")
+    
+    def __init__(
+        self,
+        kid: Optional[str],
+        algorithm: str,
+        secret: Optional[str] = None,
+        private_pem: Optional[str] = None,
+        public_pem: Optional[str] = None
+    ):
+        if algorithm not in SYMMETRIC_ALGORITHMS | ASYMMETRIC_ALGORITHMS:
+            raise ValueError(f"Algoritmo JWT no soportado: {algorithm}")
+        
+        self.kid = kid
+        self.algorithm = algorithm
+        self.secret = secret
+        self.private_pem = private_pem
+        self.public_pem = public_pem
+        self._private = None
+        self._public = None
+        
+        if algorithm in SYMMETRIC_ALGORITHMS:
+            if not secret:
+                raise ValueError(f"La clave '{kid}' ({algorithm}) requiere un secreto")
+            return
+        
+        if private_pem:
+            self._private = serialization.load_pem_private_key(private_pem.encode(), password=None)
+            self._public = self._private.public_key()
+        elif public_pem:
+            self._public = serialization.load_pem_public_key(public_pem.encode())
+        else:
+            raise ValueError(f"La clave '{kid}' ({algorithm}) requiere una clave PEM")
+        
+        # La parte pública se guarda siempre en PEM (python-jose la usa para verificar)
+        self.public_pem = self._public.public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode()
+        
+        expected = {
+            "RS256": rsa.RSAPublicKey,
+            "ES256": ec.EllipticCurvePublicKey,
+            "EdDSA": ed25519.Ed25519PublicKey,
+        }[algorithm]
+        if not isinstance(self._public, expected):
+            raise ValueError(f"La clave '{kid}' no es válida para {algorithm}")
+    
+    @property
+    def can_sign(self) -> bool:
+        """Indica si la clave puede firmar (secreto o clave privada)"""
+        return self.algorithm in SYMMETRIC_ALGORITHMS or self._private is not None
+    
+    @property
+    def signing_material(self) -> Optional[str]:
+        """Material de firma en el formato que espera python-jose"""
+        if self.algorithm in SYMMETRIC_ALGORITHMS:
+            return self.secret
+        return self.private_pem
+    
+    @property
+    def verification_key(self) -> str:
+        """Material de verificación en el formato que espera python-jose"""
+        if self.algorithm in SYMMETRIC_ALGORITHMS:
+            return self.secret
+        return self.public_pem
+    
+    def encode(self, claims: dict) -> str:
+        """
+        Firma un conjunto de claims.
+        
+        Args:
+            claims: Claims del token (exp/iat pueden ser datetime)
+        
+        Returns:
+            Token JWT compacto
+        """
+        if not self.can_sign:
+            raise ValueError(f"La clave '{self.kid}' solo sirve para verificar")
+        
+        if self.algorithm == "EdDSA":
+            return self._encode_eddsa(claims, {"kid": self.kid} if self.kid else {})
+        
+        return get_codec().encode(claims, self)
+    
+    def decode(self, token: str) -> dict:
+        """
+        Verifica la firma y la expiración de un token.
+        
+        Raises:
+            JWTError: Si la firma o los claims no son válidos
+        """
+        if self.algorithm == "EdDSA":
+            return self._decode_eddsa(token)
+        
+        return get_codec().decode(token, self)
+    
+    # python-jose no implementa EdDSA: se firma directamente con cryptography
+    
+    def _encode_eddsa(self, claims: dict, headers: dict) -> str:
+        header = {"alg": "EdDSA", "typ": "JWT", **headers}
+        payload = {k: to_timestamp(v) for k, v in claims.items()}
+        signing_input = ".".join(
+            b64url_encode(json.dumps(part, separators=(",", ":")).encode())
+            for part in (header, payload)
+        )
+        signature = self._private.sign(signing_input.encode())
+        return f"{signing_input}.{b64url_encode(signature)}"
+    
+    def _decode_eddsa(self, token: str) -> dict:
+        try:
+            signing_input, signature = token.rsplit(".", 1)
+            self._public.verify(b64url_decode(signature), signing_input.encode())
+            payload = json.loads(b64url_decode(signing_input.split(".", 1)[1]))
+        except (ValueError, InvalidSignature) as e:
+            raise JWTError("Firma inválida") from e
+        
+        now = time.time()
+        if "exp" in payload and now >= payload["exp"]:
+            raise JWTError("Token expirado")
+        if "nbf" in payload and now < payload["nbf"]:
+            raise JWTError("Token aún no válido")
+        return payload
+    
+    def public_jwk(self) -> Optional[dict]:
+        """
+        Representación JWK de la parte pública.
+        Retorna None para claves HS (el secreto nunca se publica).
+        """
+        if self.algorithm in SYMMETRIC_ALGORITHMS:
+            return None
+        
+        jwk = {"kid": self.kid, "alg": self.algorithm, "use": "sig"}
+        
+        if self.algorithm == "RS256":
+            numbers = self._public.public_numbers()
+            jwk.update(kty="RSA", n=_int_to_b64url(numbers.n), e=_int_to_b64url(numbers.e))
+        elif self.algorithm == "ES256":
+            numbers = self._public.public_numbers()
+            jwk.update(
+                kty="EC",
+                crv="P-256",
+                x=_int_to_b64url(numbers.x, 32),
+                y=_int_to_b64url(numbers.y, 32)
+            )
+        else:
+            raw = self._public.public_bytes(
+                serialization.Encoding.Raw,
+                serialization.PublicFormat.Raw
+            )
+            jwk.update(kty="OKP", crv="Ed25519", x=b64url_encode(raw))
+        
+        return jwk
+
+
+class KeyRing:
+    """
+    Conjunto de claves indexado por `kid`.
+    
+    - La clave activa firma los tokens nuevos
+    - Cualquier clave del anillo verifica los tokens que la referencian
+    - `legacy` (opcional) verifica tokens emitidos sin `kid`
+    
+    Rotación sin downtime:
+        1. Añadir la clave nueva (o solo su parte pública) y desplegar:
+           aparece en el JWKS y los demás servicios la cachean
+        2. Cambiar JWT_ACTIVE_KID a la clave nueva
+        3. Cuando expiren los tokens firmados con la anterior, retirarla
+    """
+    
+    def __init__(
+        self,
+        keys: List[SigningKey],
+        active_kid: Optional[str],
+        legacy: Optional[SigningKey] = None
+    ):
+        self._keys: Dict[str, SigningKey] = {key.kid: key for key in keys if key.kid}
+        self.legacy = legacy
+        
+        if active_kid:
+            if active_kid not in self._keys:
+                raise ValueError(f"JWT_ACTIVE_KID '{active_kid}' no está en el anillo")
+            self.active = self._keys[active_kid]
+        elif keys:
+            self.active = keys[0]
+        else:
+            self.active = legacy
+        
+        if self.active is None or not self.active.can_sign:
+            raise ValueError("La clave activa debe poder firmar")
+        
+        # El JWKS no cambia mientras viva el proceso: se serializa una sola vez
+        self.jwks = {
+            "keys": [jwk for jwk in (key.public_jwk() for key in self._keys.values()) if jwk]
+        }
+        self.jwks_json = json.dumps(self.jwks, separators=(",", ":")).encode()
+    
+    def get(self, kid: Optional[str]) -> Optional[SigningKey]:
+        """Busca la clave de verificación de un token según su `kid`"""
+        if kid is None:
+            return self.legacy
+        if not isinstance(kid, str):
+            return None
+        return self._keys.get(kid)
+
+
+def _read_pem(entry: dict, field: str) -> Optional[str]:
+    """Lee un PEM en línea (`field`) o desde archivo (`field`_path)"""
+    if entry.get(field):
+        return entry[field]
+    path = entry.get(f"{field}_path")
+    if path:
+        with open(path) as f:
+            return f.read()
+    return None
+
+
+def load_keyring() -> KeyRing:
+    """
+    Construye el anillo de claves a partir de la configuración.
+    
+    JWT_KEYS es una lista JSON de claves, por ejemplo:
+        [{"kid": "2024-06", "alg": "ES256", "private_key_path": "keys/2024-06.pem"},
+         {"kid": "2024-01", "alg": "RS256", "public_key_path": "keys/2024-01.pub.pem"}]
+    
+    Si JWT_KEYS está vacío se usa SECRET_KEY/ALGORITHM como hasta ahora
+    (tokens sin `kid`).
+    """
+    legacy = None
+    if settings.JWT_ACCEPT_LEGACY_TOKENS or not settings.JWT_KEYS:
+        legacy = SigningKey(None, settings.ALGORITHM, secret=settings.SECRET_KEY)
+    
+    keys = []
+    for entry in json.loads(settings.JWT_KEYS or "[]"):
+        keys.append(SigningKey(
+            kid=entry["kid"],
+            algorithm=entry["alg"],
+            secret=entry.get("secret"),
+            private_pem=_read_pem(entry, "private_key"),
+            public_pem=_read_pem(entry, "public_key")
+        ))
+    
+    return KeyRing(keys, settings.JWT_ACTIVE_KID or None, legacy)
+
+
+# Instancia global
+keyring = load_keyring()
@@ -0,0 +1,138 @@
+"""
+Pool de procesos para el hash de contraseñas.
+Ejecuta bcrypt fuera del hilo de la petición para no saturar el event loop
+ni el threadpool de FastAPI durante ráfagas de login o registro.
+"""
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Optional
+from app.config import settings
+from app.utils.security import verify_password, get_password_hash
+
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """Hashea un lote de contraseñas (se ejecuta dentro de un proceso del pool)"""
+    return [get_password_hash(password) for password in passwords]
+
+
+class PasswordHasher:
+    """
+    Ejecuta get_password_hash y verify_password en un pool de procesos dedicado.
+    
+    - El tamaño del pool se configura con PASSWORD_HASH_WORKERS
+      (0 = usar el threadpool por defecto del event loop)
+    - El pool se crea de forma perezosa en el primer uso
+    - Lleva métricas de profundidad de cola y latencia
+    """
+    
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max_workers
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        
+        # Métricas
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._counts = {"hash": 0, "verify": 0, "hash_batch": 0}
+        self._total_seconds = {"hash": 0.0, "verify": 0.0, "hash_batch": 0.0}
+        self._max_seconds = {"hash": 0.0, "verify": 0.0, "hash_batch": 0.0}
+    
+    def _get_executor(self) -> Optional[Executor]:
+        """Crea el pool de procesos si aún no existe"""
+        if self.max_workers <= 0:
+            return None
+        
+        with self._lock:
+            if self._executor is None:
+                # "spawn" evita heredar hilos y conexiones abiertas del proceso padre
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+    
+    async def _run(self, kind: str, func, *args):
+        """Envía una operación al pool y registra sus métricas"""
+        loop = asyncio.get_running_loop()
+        
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.in_flight -= 1
+                self._counts[kind] += 1
+                self._total_seconds[kind] += elapsed
+                self._max_seconds[kind] = max(self._max_seconds[kind], elapsed)
+    
+    async def hash(self, password: str) -> str:
+        """Versión asíncrona de get_password_hash"""
+        return await self._run("hash", get_password_hash, password)
+    
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Versión asíncrona de verify_password"""
+        return await self._run("verify", verify_password, plain_password, hashed_password)
+    
+    async def hash_many(self, passwords: List[str], chunk_size: int = 32) -> List[str]:
+        """
+        Hashea muchas contraseñas repartiéndolas entre todos los procesos del pool.
+        
+        Se envían en lotes de `chunk_size` para no pagar un viaje entre
+        procesos por contraseña.
+        
+        Args:
+            passwords: Contraseñas en texto plano
+            chunk_size: Contraseñas por lote
+        
+        Returns:
+            Hashes en el mismo orden
+        """
+        chunks = [passwords[i:i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+        results = await asyncio.gather(*(self._run("hash_batch", hash_passwords, chunk) for chunk in chunks))
+        return [hashed for chunk in results for hashed in chunk]
+    
+    def start(self) -> None:
+        """Arranca el pool por adelantado (evita el coste del primer login)"""
+        self._get_executor()
+    
+    def shutdown(self) -> None:
+        """Detiene el pool de procesos"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+    
+    def stats(self) -> dict:
+        """Retorna métricas de cola y latencia (en milisegundos)"""
+        with self._lock:
+            latency = {}
+            for kind, count in self._counts.items():
+                total = self._total_seconds[kind]
+                latency[kind] = {
+                    "count": count,
+                    "avg_ms": round(total / count * 1000, 2) if count else 0.0,
+                    "max_ms": round(self._max_seconds[kind] * 1000, 2)
+                }
+            
+            return {
+                "workers": self.max_workers,
+                "queue_depth": self.in_flight,
+                "max_queue_depth": self.max_in_flight,
+                "latency": latency
+            }
+
+
+# Instancia global (ver PASSWORD_HASH_WORKERS en la configuración)
+password_hasher = PasswordHasher(max_workers=settings.PASSWORD_HASH_WORKERS)
+
+# Pool aparte para la importación masiva: una importación no retrasa los logins
+# (ver BULK_IMPORT_HASH_WORKERS en la configuración)
+import_password_hasher = PasswordHasher(max_workers=settings.bulk_import_hash_workers)
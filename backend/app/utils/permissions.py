@@ -0,0 +1,74 @@
+"""
+Modelo de permisos.
+Cada rol tiene precalculada una máscara de bits con sus permisos, así que
+comprobar una autorización es un único AND bit a bit.
+"""
+import enum
+from functools import reduce
+from operator import or_
+from typing import Dict
+from fastapi import HTTPException, status
+from app.models.user import UserRole
+
+
+class Permission(enum.IntFlag):
+    """
+    Permisos del sistema (uno por bit).
+    
+    Para añadir un permiso basta con un nuevo bit; para añadir un rol,
+    una entrada en ROLE_PERMISSIONS.
+    """
+    NONE = 0
+    USERS_READ = enum.auto()            # Listar y ver usuarios
+    USERS_UPDATE = enum.auto()          # Editar otros usuarios y activarlos/desactivarlos
+    USERS_DELETE = enum.auto()          # Eliminar (desactivar) usuarios
+    USERS_MANAGE_ROLES = enum.auto()    # Cambiar roles
+    USERS_IMPORT = enum.auto()          # Importación masiva
+    PRODUCTS_WRITE = enum.auto()        # Crear, editar y eliminar productos
+    TOKENS_INTROSPECT = enum.auto()     # Introspección de tokens (gateways)
+    SYSTEM_METRICS = enum.auto()        # Métricas internas (pools, cachés)
+
+
+# Todos los permisos definidos
+ALL_PERMISSIONS = reduce(or_, Permission, Permission.NONE)
+
+# Máscara precalculada por rol
+ROLE_PERMISSIONS: Dict[UserRole, Permission] = {
+    UserRole.USER: Permission.NONE,
+    UserRole.ADMIN: ALL_PERMISSIONS,
+}
+
+
+def combine(*permissions: Permission) -> Permission:
+    """Une varios permisos en una sola máscara"""
+    return reduce(or_, permissions, Permission.NONE)
+
+
+def has_permissions(role: UserRole, required: Permission) -> bool:
+    """
+    Indica si un rol tiene todos los permisos pedidos.
+    
+    Args:
+        role: Rol del usuario
+        required: Máscara de permisos requeridos
+    
+    Returns:
+        True si el rol los tiene todos
+    """
+    return ROLE_PERMISSIONS.get(role, Permission.NONE) & required == required
+
+
+def ensure_permissions(role: UserRole, required: Permission, detail: str = "Permisos insuficientes") -> None:
+    """
+    Lanza un 403 si el rol no tiene los permisos pedidos.
+    
+    Pensada para los servicios, que reciben el usuario ya autenticado.
+    
+    Raises:
+        HTTPException: Si falta algún permiso
+    """
+    if not has_permissions(role, required):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=detail
+        )
@@ -0,0 +1,105 @@
+"""
+Caché del usuario autenticado (principal).
+Evita consultar la tabla users en cada petición protegida.
+"""
+from datetime import datetime
+from typing import Optional
+from app.config import settings
+from app.models.user import UserRole
+from app.utils.ttl_cache import TTLCache
+
+
+class Principal:
+    """
+    Representación ligera del usuario autenticado.
+    
+    Solo contiene los campos públicos del usuario (los mismos que UserResponse),
+    sin hashed_password. Usa __slots__ para ocupar poca memoria.
+    """
+    __slots__ = (
+        "id",
+        "email",
+        "username",
+        "full_name",
+        "role",
+        "is_active",
+        "created_at",
+        "updated_at",
+        "token_version"
+    )
+    
+    # Columnas que se leen de la tabla users para construir el principal
+    COLUMNS = __slots__
+    
+    def __init__(
+        self,
+        id: int,
+        email: str,
+        username: str,
+        full_name: str,
+        role: UserRole,
+        is_active: bool,
+        created_at: Optional[datetime] = None,
+        updated_at: Optional[datetime] = None,
+        token_version: int = 0
+    ):
+        self.id = id
+        self.email = email
+        self.username = username
+        self.full_name = full_name
+        self.role = role
+        self.is_active = is_active
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.token_version = token_version
+    
+    @classmethod
+    def from_row(cls, row) -> "Principal":
+        """Crea un principal desde una fila (o modelo) con los campos de COLUMNS"""
+        return cls(**{name: getattr(row, name) for name in cls.COLUMNS})
+    
+    @classmethod
+    def from_token(cls, payload: dict) -> "Principal":
+        """
+        Crea un principal parcial a partir de los claims del access token
+        (modo STATELESS_AUTH). email, full_name y las fechas quedan en None.
+        """
+        return cls(
+            id=payload["user_id"],
+            email=None,
+            username=payload.get("username"),
+            full_name=None,
+            role=UserRole(payload["role"]),
+            is_active=bool(payload.get("active")),
+            token_version=payload["ver"]
+        )
+    
+    @property
+    def is_complete(self) -> bool:
+        """Indica si el principal tiene el perfil completo (no viene solo del token)"""
+        return self.email is not None
+    
+    def __repr__(self):
+        """Representación del objeto para debugging"""
+        return f"<Principal(id={self.id}, username='{self.username}', role='{self.role}')>"
+
+
+class PrincipalCache(TTLCache):
+    """
+    Caché en memoria de principals con TTL, indexada por ID de usuario.
+    
+    Las entradas se invalidan explícitamente cuando el usuario cambia
+    (perfil, rol, contraseña, desactivación o logout) y, en cualquier caso,
+    caducan al cumplirse el TTL.
+    """
+    
+    def set(self, principal: Principal) -> None:
+        """Guarda un principal en la caché"""
+        super().set(principal.id, principal)
+
+
+# Instancia global (ver PRINCIPAL_CACHE_* en la configuración)
+principal_cache = PrincipalCache(
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
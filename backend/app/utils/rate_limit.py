@@ -0,0 +1,260 @@
+"""
+Limitador de intentos con ventana deslizante.
+Frena ataques de fuerza bruta y credential stuffing contra /api/auth/login
+antes de tocar la base de datos o ejecutar bcrypt.
+"""
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Deque, Optional
+from fastapi import HTTPException, status
+from app.config import settings
+
+
+class RateLimiter(ABC):
+    """
+    Interfaz común de los limitadores de ventana deslizante.
+    
+    `hit` registra un intento solo si está permitido y retorna 0;
+    si no, retorna los segundos que faltan para que se libere un hueco.
+    """
+    
+    @abstractmethod
+    async def hit(self, key: str, limit: int, window: float) -> float:
+        """Registra un intento para `key` (máximo `limit` cada `window` segundos)"""
+    
+    @abstractmethod
+    async def reset(self, key: str) -> None:
+        """Olvida los intentos registrados para `key`"""
+    
+    async def close(self) -> None:
+        """Libera los recursos del backend"""
+    
+    def stats(self) -> dict:
+        """Retorna métricas propias del backend"""
+        return {}
+
+
+class MemoryRateLimiter(RateLimiter):
+    """
+    Ventanas guardadas en memoria del proceso (una deque de timestamps por clave).
+    
+    - LRU acotada a `max_keys` claves: al llenarse se descarta la clave usada
+      hace más tiempo, en O(1), aunque siga dentro de su ventana
+    - No se comparte entre workers: con varios workers el límite efectivo
+      se multiplica por su número
+    """
+    
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._windows: "OrderedDict[str, Deque[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+    
+    async def hit(self, key: str, limit: int, window: float) -> float:
+        now = time.monotonic()
+        
+        with self._lock:
+            attempts = self._windows.get(key)
+            if attempts is None:
+                attempts = self._windows[key] = deque()
+                while len(self._windows) > self.max_keys:
+                    self._windows.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._windows.move_to_end(key)
+            
+            # Descartar los intentos que ya salieron de la ventana
+            while attempts and attempts[0] <= now - window:
+                attempts.popleft()
+            
+            if len(attempts) >= limit:
+                return attempts[0] + window - now
+            
+            attempts.append(now)
+            return 0.0
+    
+    async def reset(self, key: str) -> None:
+        with self._lock:
+            self._windows.pop(key, None)
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {"keys": len(self._windows), "max_keys": self.max_keys, "evictions": self.evictions}
+
+
+class RedisRateLimiter(RateLimiter):
+    """
+    Ventanas guardadas en Redis (un sorted set por clave), compartidas
+    entre todos los workers e instancias.
+    
+    La comprobación y el registro se hacen de forma atómica con un script Lua.
+    Requiere el paquete `redis`, que se importa solo al usar este backend.
+    """
+    
+    # KEYS[1] = clave; ARGV = ahora, ventana, límite, miembro único
+    SCRIPT = """
+    local now = tonumber(ARGV[1])
+    local window = tonumber(ARGV[2])
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+    if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+        local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+        return tostring(tonumber(oldest[2]) + window - now)
+    end
+    redis.call('ZADD', KEYS[1], now, ARGV[4])
+    redis.call('PEXPIRE', KEYS[1], math.ceil(window * 1000))
+    return '0'
+    """
+    
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError(
+                "LOGIN_RATE_LIMIT_BACKEND=redis requiere el paquete 'redis' (pip install redis)"
+            ) from exc
+        
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+    
+    async def hit(self, key: str, limit: int, window: float) -> float:
+        retry_after = await self._script(
+            keys=[self.prefix + key],
+            args=[time.time(), window, limit, uuid.uuid4().hex]
+        )
+        return max(float(retry_after), 0.0)
+    
+    async def reset(self, key: str) -> None:
+        await self._client.delete(self.prefix + key)
+    
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def create_rate_limiter(backend: str, redis_url: Optional[str] = None) -> RateLimiter:
+    """
+    Crea el limitador indicado en la configuración.
+    
+    Args:
+        backend: "memory" o "redis"
+        redis_url: URL de Redis (solo para el backend "redis")
+    
+    Returns:
+        Instancia del limitador
+    """
+    if backend == "memory":
+        return MemoryRateLimiter()
+    if backend == "redis":
+        return RedisRateLimiter(redis_url)
+    raise ValueError(f"LOGIN_RATE_LIMIT_BACKEND desconocido: {backend}")
+
+
+class LoginThrottle:
+    """
+    Límite de intentos de login por username y, opcionalmente, por IP.
+    
+    - Se comprueba antes de cualquier consulta o verificación de contraseña
+    - Un login correcto libera la ventana de su username
+    - Si el backend compartido falla, se deja pasar el intento (fail-open)
+      y se contabiliza el error
+    - Lleva contadores de intentos rechazados
+    """
+    
+    def __init__(
+        self,
+        limiter: RateLimiter,
+        per_username: int = 5,
+        per_ip: int = 20,
+        window_seconds: int = 60
+    ):
+        self.limiter = limiter
+        self.per_username = per_username
+        self.per_ip = per_ip
+        self.window_seconds = window_seconds
+        
+        # Métricas
+        self.allowed = 0
+        self.rejected_username = 0
+        self.rejected_ip = 0
+        self.backend_errors = 0
+    
+    @staticmethod
+    def _username_key(username: str) -> str:
+        """Normaliza el username/email para que las variantes compartan ventana"""
+        return "login:user:" + username.strip().lower()
+    
+    async def _hit(self, key: str, limit: int) -> float:
+        """Registra un intento tolerando fallos del backend"""
+        try:
+            return await self.limiter.hit(key, limit, self.window_seconds)
+        except Exception:
+            self.backend_errors += 1
+            return 0.0
+    
+    async def check(self, username: str, ip_address: Optional[str]) -> None:
+        """
+        Registra un intento de login o lo rechaza.
+        
+        Args:
+            username: Username o email enviado
+            ip_address: IP del cliente (None si no se conoce)
+        
+        Raises:
+            HTTPException: 429 con Retry-After si se superó algún límite
+        """
+        if ip_address and self.per_ip > 0:
+            retry_after = await self._hit("login:ip:" + ip_address, self.per_ip)
+            if retry_after:
+                self.rejected_ip += 1
+                self._reject(retry_after)
+        
+        retry_after = await self._hit(self._username_key(username), self.per_username)
+        if retry_after:
+            self.rejected_username += 1
+            self._reject(retry_after)
+        
+        self.allowed += 1
+    
+    @staticmethod
+    def _reject(retry_after: float) -> None:
+        """Lanza el error 429 con la cabecera Retry-After (segundos enteros)"""
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiados intentos de inicio de sesión. Intenta más tarde",
+            headers={"Retry-After": str(max(int(retry_after + 0.999), 1))},
+        )
+    
+    async def succeeded(self, username: str) -> None:
+        """Libera la ventana del username tras un login correcto"""
+        try:
+            await self.limiter.reset(self._username_key(username))
+        except Exception:
+            self.backend_errors += 1
+    
+    async def close(self) -> None:
+        """Cierra la conexión del backend"""
+        await self.limiter.close()
+    
+    def stats(self) -> dict:
+        """Retorna contadores de intentos permitidos y rechazados"""
+        return {
+            "backend": type(self.limiter).__name__,
+            "allowed": self.allowed,
+            "rejected": self.rejected_username + self.rejected_ip,
+            "rejected_username": self.rejected_username,
+            "rejected_ip": self.rejected_ip,
+            "backend_errors": self.backend_errors,
+            **self.limiter.stats()
+        }
+
+
+# Instancia global (ver LOGIN_RATE_LIMIT_* en la configuración)
+login_throttle = LoginThrottle(
+    create_rate_limiter(settings.LOGIN_RATE_LIMIT_BACKEND, settings.LOGIN_RATE_LIMIT_REDIS_URL),
+    per_username=settings.LOGIN_RATE_LIMIT_PER_USERNAME,
+    per_ip=settings.LOGIN_RATE_LIMIT_PER_IP,
+    window_seconds=settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS
+)
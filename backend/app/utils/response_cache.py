@@ -0,0 +1,273 @@
+"""
+Caché de respuestas serializadas.
+Guarda el JSON ya generado de recursos que se leen mucho más de lo que cambian.
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Optional
+from app.config import settings
+
+
+class CachedResponse(NamedTuple):
+    """Respuesta cacheada: su ETag y el JSON ya serializado"""
+    etag: str
+    content: bytes
+    
+    def pack(self) -> bytes:
+        """Serializa la respuesta para el almacén (ETag, salto de línea y JSON)"""
+        return self.etag.encode() + b"\n" + self.content
+    
+    @classmethod
+    def unpack(cls, value: bytes) -> Optional["CachedResponse"]:
+        """Recupera una respuesta del almacén (None si el formato no es válido)"""
+        etag, separator, content = value.partition(b"\n")
+        if not separator or not etag.startswith(b'"'):
+            return None
+        return cls(etag.decode(), content)
+
+
+class CacheStore(ABC):
+    """
+    Interfaz común de los almacenes de la caché.
+    
+    Los valores son bytes (el JSON de la respuesta); cada implementación
+    decide cómo aplicar el TTL y el límite de tamaño.
+    """
+    
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Obtiene un valor o None si no existe o expiró"""
+    
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        """Guarda un valor durante `ttl` segundos"""
+    
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Elimina un valor"""
+    
+    def close(self) -> None:
+        """Libera las conexiones del almacén"""
+    
+    def stats(self) -> dict:
+        """Retorna métricas propias del almacén"""
+        return {}
+
+
+class MemoryCacheStore(CacheStore):
+    """
+    LRU en memoria del proceso con TTL por entrada.
+    
+    No se comparte entre workers: una escritura en otro worker
+    tarda como mucho el TTL en verse aquí.
+    """
+    
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+    
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "evictions": self.evictions
+            }
+
+
+class RedisCacheStore(CacheStore):
+    """
+    Almacén compartido en Redis: todos los workers ven la misma caché
+    y las invalidaciones son inmediatas en todos ellos.
+    
+    El límite de tamaño y las expulsiones los gestiona Redis (maxmemory-policy).
+    Requiere el paquete `redis`, que se importa solo al usar este backend.
+    """
+    
+    def __init__(self, url: str, prefix: str = "cache:"):
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError(
+                "PRODUCT_CACHE_BACKEND=redis requiere el paquete 'redis' (pip install redis)"
+            ) from exc
+        
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+    
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(self.prefix + key)
+    
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        self._client.set(self.prefix + key, value, ex=ttl)
+    
+    def delete(self, key: str) -> None:
+        self._client.delete(self.prefix + key)
+    
+    def close(self) -> None:
+        self._client.close()
+
+
+def create_cache_store(backend: str, max_size: int = 10000, redis_url: Optional[str] = None) -> CacheStore:
+    """
+    Crea el almacén indicado en la configuración.
+    
+    Args:
+        backend: "memory" o "redis"
+        max_size: Máximo de entradas (solo para "memory")
+        redis_url: URL de Redis (solo para "redis")
+    
+    Returns:
+        Instancia del almacén
+    """
+    if backend == "memory":
+        return MemoryCacheStore(max_size=max_size)
+    if backend == "redis":
+        return RedisCacheStore(redis_url)
+    raise ValueError(f"PRODUCT_CACHE_BACKEND desconocido: {backend}")
+
+
+class ResponseCache:
+    """
+    Caché read-through de respuestas serializadas.
+    
+    - `get_or_load` devuelve la respuesta cacheada o llama a `loader`
+      (consulta + serialización) y guarda el resultado
+    - Cada respuesta se guarda con su ETag, así una petición condicional
+      se responde con 304 sin deserializar ni consultar nada
+    - Se invalida explícitamente tras cada escritura del recurso
+    - Si el almacén compartido falla, se sirve desde la base de datos
+      (fail-open) y se contabiliza el error
+    - Lleva contadores de aciertos, fallos y errores
+    """
+    
+    def __init__(self, store: CacheStore, ttl_seconds: int = 300, enabled: bool = True):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+    
+    def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Optional[CachedResponse]]
+    ) -> Optional[CachedResponse]:
+        """
+        Retorna la respuesta cacheada o la carga y la guarda.
+        
+        Args:
+            key: Clave del recurso (p. ej. "product:42")
+            loader: Función que genera la respuesta (None = no existe, no se cachea)
+        
+        Returns:
+            Respuesta (ETag y JSON) o None si el recurso no existe
+        """
+        if not self.enabled:
+            return loader()
+        
+        try:
+            stored = self.store.get(key)
+        except Exception:
+            self.errors += 1
+            stored = None
+        
+        value = CachedResponse.unpack(stored) if stored is not None else None
+        if value is not None:
+            self.hits += 1
+            return value
+        
+        self.misses += 1
+        value = loader()
+        
+        if value is not None:
+            try:
+                self.store.set(key, value.pack(), self.ttl_seconds)
+            except Exception:
+                self.errors += 1
+        
+        return value
+    
+    def invalidate(self, key: str) -> None:
+        """Elimina un recurso de la caché (llamar tras modificarlo)"""
+        if not self.enabled:
+            return
+        
+        self.invalidations += 1
+        try:
+            self.store.delete(key)
+        except Exception:
+            self.errors += 1
+    
+    def close(self) -> None:
+        """Cierra la conexión del almacén"""
+        self.store.close()
+    
+    def stats(self) -> dict:
+        """Retorna estadísticas de uso de la caché"""
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.store).__name__,
+            "enabled": self.enabled,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+            **self.store.stats()
+        }
+
+
+# Instancia global (ver PRODUCT_CACHE_* en la configuración)
+product_cache = ResponseCache(
+    create_cache_store(
+        settings.PRODUCT_CACHE_BACKEND,
+        max_size=settings.PRODUCT_CACHE_MAX_SIZE,
+        redis_url=settings.PRODUCT_CACHE_REDIS_URL
+    ),
+    ttl_seconds=settings.PRODUCT_CACHE_TTL_SECONDS,
+    enabled=settings.PRODUCT_CACHE_ENABLED
+)
+
+# Instancia global de las facetas sin filtros (ver PRODUCT_FACET_* en la configuración)
+# La clave incluye la versión del catálogo, que es propia de cada worker: siempre en memoria
+facet_cache = ResponseCache(
+    MemoryCacheStore(max_size=16),
+    ttl_seconds=settings.PRODUCT_FACET_CACHE_TTL_SECONDS
+)
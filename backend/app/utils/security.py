@@ -2,16 +2,27 @@
 Utilidades de seguridad.
 Manejo de contraseñas hasheadas y tokens JWT.
 """
+import hashlib
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
+from jose import JWTError
 from passlib.context import CryptContext
 from app.config import settings
 from app.models.user import UserRole
+from app.utils.token_cache import TokenCache
+from app.utils.keyring import keyring
+from app.utils.jwt_codec import get_codec
 
 # Contexto para hashear contraseñas con bcrypt
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Caché de payloads ya verificados (ver TOKEN_CACHE_* en la configuración)
+token_cache = TokenCache(
+    max_size=settings.TOKEN_CACHE_MAX_SIZE,
+    ttl_seconds=settings.TOKEN_CACHE_TTL_SECONDS
+)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
@@ -79,17 +90,12 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode.update({
         "exp": expire,
         "iat": datetime.utcnow(),  # Issued at (fecha de emisión)
+        "jti": uuid.uuid4().hex,  # Identificador único (permite revocarlo)
         "token_type": "access"
     })
     
-    # Codificar el token
-    encoded_jwt = jwt.encode(
-        to_encode,
-        settings.SECRET_KEY,
-        algorithm=settings.ALGORITHM
-    )
-    
-    return encoded_jwt
+    # Codificar el token con la clave activa del anillo
+    return keyring.active.encode(to_encode)
 
 
 def create_refresh_token(data: dict) -> str:
@@ -116,19 +122,19 @@ def create_refresh_token(data: dict) -> str:
         "token_type": "refresh"
     })
     
-    encoded_jwt = jwt.encode(
-        to_encode,
-        settings.SECRET_KEY,
-        algorithm=settings.ALGORITHM
-    )
-    
-    return encoded_jwt
+    return keyring.active.encode(to_encode)
 
 
 def decode_token(token: str) -> Optional[dict]:
     """
     Decodifica y valida un token JWT.
     
+    La clave de verificación se elige por el `kid` de la cabecera
+    y el algoritmo debe coincidir con el de esa clave.
+    
+    Si TOKEN_CACHE_ENABLED está activo, los tokens ya verificados
+    se sirven desde la caché hasta su expiración.
+    
     Args:
         token: Token JWT a decodificar
     
@@ -140,31 +146,87 @@ def decode_token(token: str) -> Optional[dict]:
         >>> print(payload['user_id'])
         1
     """
+    if settings.TOKEN_CACHE_ENABLED:
+        cached = token_cache.get(token)
+        if cached is not None:
+            return cached
+    
     try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
-        return payload
-    except JWTError:
+        header = get_codec().header(token)
+        
+        # La cabecera aún no está verificada: `kid` puede ser cualquier valor JSON
+        kid = header.get("kid")
+        if kid is not None and not isinstance(kid, str):
+            return None
+        key = keyring.get(kid)
+        
+        # Rechazar claves desconocidas y algoritmos distintos al de la clave
+        if key is None or header.get("alg") != key.algorithm:
+            return None
+        
+        payload = key.decode(token)
+    except (JWTError, TypeError, ValueError, AttributeError):
+        # Tokens malformados (cabecera que no es un objeto, tipos inesperados): 401, nunca 500
         return None
+    
+    if settings.TOKEN_CACHE_ENABLED:
+        token_cache.set(token, payload)
+    
+    return payload
+
+
+def new_session_id() -> str:
+    """
+    Genera un identificador aleatorio de sesión.
+    Se usa como claim `jti` del refresh token y `sid` del access token.
+    """
+    return uuid.uuid4().hex
 
 
-def create_tokens_for_user(user_id: int, username: str, role: UserRole) -> tuple[str, str]:
+def hash_token(token: str) -> str:
+    """
+    Calcula el hash SHA-256 de un token.
+    
+    Los refresh tokens se guardan hasheados: si se filtra la tabla
+    de sesiones no se pueden reutilizar.
+    
+    Args:
+        token: Token en texto plano
+    
+    Returns:
+        Hash hexadecimal de 64 caracteres
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def create_tokens_for_user(
+    user_id: int,
+    username: str,
+    role: UserRole,
+    session_id: str,
+    token_version: int = 0,
+    is_active: bool = True
+) -> tuple[str, str]:
     """
     Crea ambos tokens (access y refresh) para un usuario.
     
+    El access token incluye además `ver` (versión de token del usuario)
+    y `active`, necesarios para validarlo sin cargar el usuario
+    (ver STATELESS_AUTH).
+    
     Args:
         user_id: ID del usuario
         username: Username del usuario
         role: Rol del usuario
+        session_id: ID de la sesión (ver new_session_id)
+        token_version: Versión de token vigente del usuario
+        is_active: Estado del usuario
     
     Returns:
         Tupla (access_token, refresh_token)
     
     Ejemplo:
-        >>> access, refresh = create_tokens_for_user(1, "usuario", UserRole.USER)
+        >>> access, refresh = create_tokens_for_user(1, "usuario", UserRole.USER, new_session_id())
     """
     token_data = {
         "user_id": user_id,
@@ -172,7 +234,12 @@ def create_tokens_for_user(user_id: int, username: str, role: UserRole) -> tuple
         "role": role.value
     }
     
-    access_token = create_access_token(token_data)
-    refresh_token = create_refresh_token(token_data)
+    access_token = create_access_token({
+        **token_data,
+        "sid": session_id,
+        "ver": token_version,
+        "active": is_active
+    })
+    refresh_token = create_refresh_token({**token_data, "jti": session_id})
     
     return access_token, refresh_token
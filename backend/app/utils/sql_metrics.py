@@ -0,0 +1,145 @@
+"""
+Instrumentación de SQL por petición.
+Cuenta las consultas y el tiempo de base de datos de cada petición
+(para la cabecera Server-Timing y el log de peticiones) y escribe un
+log muestreado de consultas lentas con los parámetros ocultos.
+"""
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config import settings
+
+request_logger = logging.getLogger("app.requests")
+slow_query_logger = logging.getLogger("app.sql.slow")
+
+
+class QueryStats:
+    """Consultas y tiempo de base de datos acumulados en una petición"""
+    
+    __slots__ = ("queries", "db_seconds", "slow_queries")
+    
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.slow_queries = 0
+    
+    def server_timing(self, total_seconds: float) -> str:
+        """Valor de la cabecera Server-Timing (duraciones en milisegundos)"""
+        return (
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries", '
+            f"total;dur={total_seconds * 1000:.2f}"
+        )
+
+
+# Estadísticas de la petición en curso (None fuera de una petición)
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("sql_query_stats", default=None)
+
+
+def start_request() -> QueryStats:
+    """Empieza a acumular estadísticas para la petición actual"""
+    stats = QueryStats()
+    _current_stats.set(stats)
+    return stats
+
+
+def current_stats() -> Optional[QueryStats]:
+    """Estadísticas de la petición en curso"""
+    return _current_stats.get()
+
+
+def redact_parameters(parameters) -> object:
+    """
+    Sustituye los valores de los parámetros por su tipo.
+    
+    Así el log de consultas lentas nunca contiene emails, hashes ni tokens.
+    """
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: solo el número de filas y la forma de la primera
+            return {"rows": len(parameters), "first": redact_parameters(parameters[0])}
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def configure_logging() -> None:
+    """Envía los logs de la aplicación (logger "app") a stderr, una línea por evento"""
+    logger = logging.getLogger("app")
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(settings.LOG_LEVEL.upper())
+        logger.propagate = False
+
+
+def instrument_sql(engine: Engine) -> None:
+    """
+    Registra los eventos que miden cada consulta del motor.
+    
+    Args:
+        engine: Motor síncrono (para uno asíncrono, usar .sync_engine)
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+    
+    @event.listens_for(engine, "after_cursor_execute")
+    def end_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+        
+        if elapsed * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+            if stats is not None:
+                stats.slow_queries += 1
+            if random.random() < settings.SLOW_QUERY_SAMPLE_RATE:
+                slow_query_logger.warning(json.dumps({
+                    "event": "slow_query",
+                    "duration_ms": round(elapsed * 1000, 2),
+                    "database": engine.url.database,
+                    "statement": " ".join(statement.split()),
+                    "parameters": redact_parameters(parameters),
+                    "executemany": executemany
+                }, ensure_ascii=False))
+    
+    @event.listens_for(engine, "handle_error")
+    def discard_query(context):
+        # Si la consulta falla no llega after_cursor_execute
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+def route_template(request) -> str:
+    """
+    Ruta de la petición con los parámetros sustituidos por su nombre
+    (/api/products/{product_id}), para agrupar el log por endpoint.
+    """
+    path = request.url.path
+    for name, value in request.path_params.items():
+        path = path.replace(f"/{value}", f"/{{{name}}}", 1)
+    return path
+
+
+def log_request(method: str, path: str, status_code: int, total_seconds: float, stats: QueryStats) -> None:
+    """Escribe la línea estructurada (JSON) de una petición"""
+    request_logger.info(json.dumps({
+        "event": "request",
+        "method": method,
+        "path": path,
+        "status": status_code,
+        "duration_ms": round(total_seconds * 1000, 2),
+        "db_queries": stats.queries,
+        "db_ms": round(stats.db_seconds * 1000, 2),
+        "slow_queries": stats.slow_queries
+    }))
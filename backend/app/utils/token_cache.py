@@ -0,0 +1,58 @@
+"""
+Caché de tokens verificados.
+Evita volver a verificar la firma de un JWT que ya fue validado recientemente.
+"""
+import hashlib
+import time
+from typing import Optional
+from app.utils.ttl_cache import TTLCache
+
+
+class TokenCache(TTLCache):
+    """
+    Caché LRU en memoria de payloads JWT ya verificados.
+    
+    - La clave es un digest SHA-256 del token (nunca se guarda el token en claro)
+    - Cada entrada expira, como muy tarde, en el `exp` del propio token
+    - Tamaño acotado: al llenarse se descarta la entrada menos usada
+    - Lleva contadores de aciertos y fallos para monitoreo
+    """
+    
+    def __init__(self, max_size: int = 10000, ttl_seconds: int = 300):
+        # Reloj de pared: las caducidades se comparan con el `exp` del token
+        super().__init__(max_size, ttl_seconds, clock=time.time)
+    
+    @staticmethod
+    def _key(token: str) -> bytes:
+        """Calcula la clave de caché a partir del token"""
+        return hashlib.sha256(token.encode()).digest()
+    
+    def get(self, token: str) -> Optional[dict]:
+        """
+        Retorna el payload cacheado si existe y no ha expirado.
+        
+        Args:
+            token: Token JWT
+        
+        Returns:
+            Copia del payload o None si no está en caché
+        """
+        payload = super().get(self._key(token))
+        return dict(payload) if payload is not None else None
+    
+    def set(self, token: str, payload: dict) -> None:
+        """
+        Guarda un payload verificado.
+        
+        Args:
+            token: Token JWT ya validado
+            payload: Payload decodificado del token
+        """
+        # Nunca mantener la entrada más allá del `exp` del token
+        exp = payload.get("exp")
+        expires_at = float(exp) if isinstance(exp, (int, float)) else None
+        super().set(self._key(token), dict(payload), expires_at=expires_at)
+    
+    def invalidate(self, token: str) -> None:
+        """Elimina un token de la caché"""
+        super().invalidate(self._key(token))
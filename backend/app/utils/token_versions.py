@@ -0,0 +1,26 @@
+"""
+Mapa de versiones de token por usuario.
+Permite validar access tokens en modo sin estado (STATELESS_AUTH)
+comparando un entero en memoria en lugar de cargar el usuario.
+"""
+from app.config import settings
+from app.utils.ttl_cache import TTLCache
+
+
+class TokenVersionMap(TTLCache):
+    """
+    Caché en memoria {user_id: token_version} con TTL.
+    
+    - El worker que incrementa la versión la actualiza al momento
+    - Los demás workers la releen de la base de datos al caducar la
+      entrada, así que un token invalidado en otro worker puede seguir
+      aceptándose como mucho TOKEN_VERSION_TTL_SECONDS
+    - Tamaño acotado: al llenarse se descarta la entrada menos usada
+    """
+
+
+# Instancia global (ver TOKEN_VERSION_* en la configuración)
+token_versions = TokenVersionMap(
+    max_size=settings.TOKEN_VERSION_MAX_SIZE,
+    ttl_seconds=settings.TOKEN_VERSION_TTL_SECONDS
+)
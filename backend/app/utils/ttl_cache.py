@@ -0,0 +1,100 @@
+"""
+Caché LRU en memoria con TTL.
+Base común de las cachés locales de cada worker (principals, tokens
+verificados, versiones de token e identidades inexistentes).
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Caché LRU en memoria con caducidad por entrada.
+    
+    - Cada entrada caduca al cumplirse el TTL (o antes, si se indica `expires_at`)
+    - Tamaño acotado: al llenarse se descarta la entrada menos usada
+    - Segura entre hilos y con contadores de aciertos, fallos y descartes
+    - `clock` es el reloj de las caducidades: monotonic por defecto, o
+      time.time si se comparan con marcas de tiempo absolutas (como `exp`)
+    """
+    
+    def __init__(self, max_size: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Retorna el valor cacheado o None si no existe o expiró"""
+        now = self.clock()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None) -> None:
+        """
+        Guarda un valor.
+        
+        Args:
+            key: Clave
+            value: Valor (no None: None significa "no está")
+            expires_at: Caducidad máxima según `clock` (nunca más allá del TTL)
+        """
+        now = self.clock()
+        deadline = now + self.ttl_seconds
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        
+        if deadline <= now:
+            return
+        
+        with self._lock:
+            self._entries[key] = (deadline, value)
+            self._entries.move_to_end(key)
+            
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, *keys: Hashable) -> None:
+        """Elimina las claves indicadas"""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+    
+    def clear(self) -> None:
+        """Vacía la caché y reinicia los contadores"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+    
+    def stats(self) -> dict:
+        """Retorna estadísticas de uso de la caché"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0
+            }
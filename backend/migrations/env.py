@@ -0,0 +1,78 @@
+"""
+Entorno de Alembic.
+Conecta las migraciones con la configuración y los modelos de la aplicación.
+"""
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import create_engine
+from app.config import settings
+from app.database import Base
+import app.models  # noqa: F401  (registra todos los modelos en Base.metadata)
+
+config = context.config
+
+# Si se ejecuta desde init_db se recibe la conexión ya abierta
+connection = config.attributes.get("connection")
+
+# Configurar logs solo al usar la CLI de alembic (no pisar los de la aplicación)
+if connection is None and config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def include_object_for(dialect: str):
+    """
+    Filtro de autogenerate: omite los índices exclusivos de otro motor
+    (info={"dialect": ...}, p. ej. el FULLTEXT de MySQL al trabajar con SQLite).
+    """
+    def include_object(obj, name, type_, reflected, compare_to):
+        if type_ == "index" and not reflected:
+            return obj.info.get("dialect", dialect) == dialect
+        return True
+    return include_object
+
+
+def run_migrations_offline() -> None:
+    """Genera el SQL de las migraciones sin conectarse (alembic upgrade --sql)"""
+    context.configure(
+        url=settings.DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        include_object=include_object_for(settings.DATABASE_URL.split(":")[0].split("+")[0]),
+        render_as_batch=settings.DATABASE_URL.startswith("sqlite")
+    )
+    
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Aplica las migraciones sobre la base de datos"""
+    def run(conn) -> None:
+        context.configure(
+            connection=conn,
+            target_metadata=target_metadata,
+            include_object=include_object_for(conn.dialect.name),
+            # SQLite no soporta ALTER TABLE completo: se recrea la tabla por lotes
+            render_as_batch=conn.dialect.name == "sqlite"
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+    
+    if connection is not None:
+        run(connection)
+        return
+    
+    engine = create_engine(settings.DATABASE_URL)
+    try:
+        with engine.connect() as conn:
+            run(conn)
+    finally:
+        engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,60 @@
+"""
+Esquema inicial: tablas users y products.
+
+Es el esquema que creaba Base.metadata.create_all antes de usar Alembic.
+Las bases de datos existentes sin tabla alembic_version se marcan
+directamente en esta revisión (ver app.database.init_db).
+
+Revision ID: 0001
+Revises:
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("username", sa.String(50), nullable=False),
+        sa.Column("hashed_password", sa.String(255), nullable=False),
+        sa.Column("full_name", sa.String(100), nullable=False),
+        sa.Column("role", sa.Enum("USER", "ADMIN", name="userrole"), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column("refresh_token", sa.String(500), nullable=True),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    
+    op.create_table(
+        "products",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("name", sa.String(200), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.Column("stock", sa.Integer(), nullable=False),
+        sa.Column("category", sa.String(100), nullable=True),
+        sa.Column("brand", sa.String(100), nullable=True),
+        sa.Column("sku", sa.String(50), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_products_id", "products", ["id"])
+    op.create_index("ix_products_name", "products", ["name"])
+    op.create_index("ix_products_category", "products", ["category"])
+    op.create_index("ix_products_sku", "products", ["sku"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_table("products")
+    op.drop_table("users")
@@ -0,0 +1,72 @@
+"""
+Autenticación: sesiones por dispositivo, tokens revocados y versión de token.
+
+- Crea user_sessions y revoked_tokens
+- Añade users.token_version
+- Elimina users.refresh_token (sustituido por user_sessions)
+
+Es defensiva: las bases de datos de desarrollo creadas con create_all
+pueden tener ya parte de estos cambios.
+
+Revision ID: 0002
+Revises: 0001
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    
+    if "user_sessions" not in tables:
+        op.create_table(
+            "user_sessions",
+            sa.Column("jti", sa.String(64), primary_key=True),
+            sa.Column(
+                "user_id",
+                sa.Integer(),
+                sa.ForeignKey("users.id", ondelete="CASCADE"),
+                nullable=False
+            ),
+            sa.Column("token_hash", sa.String(64), nullable=False),
+            sa.Column("user_agent", sa.String(255), nullable=True),
+            sa.Column("ip_address", sa.String(45), nullable=True),
+            sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+            sa.Column("last_used_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_user_sessions_user_id", "user_sessions", ["user_id"])
+        op.create_index("ix_user_sessions_expires_at", "user_sessions", ["expires_at"])
+    
+    if "revoked_tokens" not in tables:
+        op.create_table(
+            "revoked_tokens",
+            sa.Column("jti", sa.String(64), primary_key=True),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+            sa.Column("revoked_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        )
+        op.create_index("ix_revoked_tokens_expires_at", "revoked_tokens", ["expires_at"])
+        op.create_index("ix_revoked_tokens_revoked_at", "revoked_tokens", ["revoked_at"])
+    
+    columns = {column["name"] for column in inspector.get_columns("users")}
+    
+    with op.batch_alter_table("users") as batch:
+        if "token_version" not in columns:
+            batch.add_column(sa.Column("token_version", sa.Integer(), server_default="0", nullable=False))
+        if "refresh_token" in columns:
+            batch.drop_column("refresh_token")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch:
+        batch.add_column(sa.Column("refresh_token", sa.String(500), nullable=True))
+        batch.drop_column("token_version")
+    
+    op.drop_table("revoked_tokens")
+    op.drop_table("user_sessions")
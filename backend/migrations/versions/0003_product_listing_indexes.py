@@ -0,0 +1,41 @@
+"""
+Índices compuestos para las consultas del listado de productos.
+
+list_products siempre filtra por is_active y ordena por created_at, price
+o name, opcionalmente filtrando por categoría o marca. Con estos índices
+MySQL recorre el índice en el orden pedido en lugar de ordenar la tabla
+(filesort). InnoDB añade el id a cada índice secundario, así que también
+sirven para desempatar por id.
+
+Revision ID: 0003
+Revises: 0002
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_products_active_created": ["is_active", "created_at"],
+    "ix_products_active_price": ["is_active", "price"],
+    "ix_products_active_name": ["is_active", "name"],
+    "ix_products_active_category_created": ["is_active", "category", "created_at"],
+    "ix_products_active_category_price": ["is_active", "category", "price"],
+    "ix_products_active_brand_created": ["is_active", "brand", "created_at"],
+}
+
+
+def upgrade() -> None:
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("products")}
+    
+    for name, columns in INDEXES.items():
+        if name not in existing:
+            op.create_index(name, "products", columns)
+
+
+def downgrade() -> None:
+    for name in INDEXES:
+        op.drop_index(name, table_name="products")
@@ -0,0 +1,33 @@
+"""
+Índice FULLTEXT de productos (nombre y descripción) para la búsqueda.
+
+Solo en MySQL: con SQLite la búsqueda usa el índice invertido en memoria
+(ver app.services.product_search).
+
+Revision ID: 0004
+Revises: 0003
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "ft_products_name_description"
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "mysql":
+        return
+    
+    existing = {index["name"] for index in sa.inspect(bind).get_indexes("products")}
+    if INDEX_NAME not in existing:
+        op.create_index(INDEX_NAME, "products", ["name", "description"], mysql_prefix="FULLTEXT")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "mysql":
+        op.drop_index(INDEX_NAME, table_name="products")
@@ -0,0 +1,32 @@
+"""
+Versión del catálogo compartida por todos los workers.
+
+- Crea catalog_version con su única fila (version = 0)
+- Los ETags de los listados de productos se derivan de ese contador
+
+Revision ID: 0005
+Revises: 0004
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if "catalog_version" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    
+    table = op.create_table(
+        "catalog_version",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+    )
+    op.bulk_insert(table, [{"id": 1, "version": 0}])
+
+
+def downgrade() -> None:
+    op.drop_table("catalog_version")
@@ -0,0 +1,34 @@
+"""
+Configuración común de las pruebas.
+Usa una base de datos SQLite temporal creada con las migraciones de Alembic.
+"""
+import os
+import tempfile
+
+# Antes de importar la aplicación: la configuración se lee al importar app.config
+_DB_DIR = tempfile.mkdtemp(prefix="api-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ["ASYNC_DATABASE_URL"] = ""
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """Motor de la base de datos de pruebas, con las migraciones aplicadas"""
+    from app.database import engine, init_db
+    
+    init_db()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def conn(engine):
+    """Conexión dentro de una transacción que se deshace al terminar la prueba"""
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        yield connection
+        transaction.rollback()
@@ -0,0 +1,60 @@
+"""
+Pruebas de las consultas del listado de productos sobre SQLite.
+Los planes usan índices y la paginación por cursor no repite ni salta productos.
+"""
+import pytest
+from fastapi import HTTPException
+from app.services.product_diagnostics import PAGINATION_ORDERS, SAMPLE_PRODUCT, ProductDiagnostics
+from app.services.product_service import ProductService
+
+
+@pytest.fixture(scope="module")
+def plans(engine):
+    """Plan de cada consulta del listado (primera página y con cursor)"""
+    with engine.connect() as connection:
+        return ProductDiagnostics.explain_listing(connection)
+
+
+@pytest.mark.parametrize("label", list(ProductDiagnostics.listing_queries()))
+def test_listing_query_uses_index_without_sort(plans, label):
+    lines, problems = plans[label]
+    
+    assert problems == [], "\n".join(lines)
+    assert any("USING INDEX" in line or "USING COVERING INDEX" in line for line in lines), "\n".join(lines)
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 9, 20])
+def test_cursor_pagination_returns_every_product_once(conn, limit):
+    results = ProductDiagnostics.check_pagination(conn, "test-pagination", rows=9, limit=limit)
+    
+    assert set(results) == set(PAGINATION_ORDERS)
+    for (sort_by, order), (expected, seen) in results.items():
+        assert len(expected) == 9
+        assert seen == expected, f"{sort_by} {order}"
+
+
+def test_next_cursor_trims_extra_row_and_stops_on_last_page():
+    rows = [SAMPLE_PRODUCT] * 3
+    
+    assert ProductService.next_cursor(rows, 2, "price", "asc") is not None
+    assert len(rows) == 2
+    assert ProductService.next_cursor(rows, 2, "price", "asc") is None
+
+
+@pytest.mark.parametrize("sort_by, order", [("price", "desc"), ("name", "asc"), ("created_at", "asc")])
+def test_cursor_from_another_order_is_rejected(sort_by, order):
+    cursor = ProductService.encode_cursor(SAMPLE_PRODUCT, "price", "asc")
+    query = ProductService.build_list_query(sort_by=sort_by, order=order)
+    
+    with pytest.raises(HTTPException) as exc_info:
+        ProductService.apply_cursor(query, cursor, sort_by, order)
+    assert exc_info.value.status_code == 400
+
+
+@pytest.mark.parametrize("cursor", ["", "no-es-base64!", "e30", "eyJzIjoicHJpY2UifQ"])
+def test_malformed_cursor_is_rejected(cursor):
+    query = ProductService.build_list_query(sort_by="price", order="asc")
+    
+    with pytest.raises(HTTPException) as exc_info:
+        ProductService.apply_cursor(query, cursor, "price", "asc")
+    assert exc_info.value.status_code == 400